@@ -0,0 +1,193 @@
+'''
+헤드리스 추천 API (Streamlit UI와 별도로 실행)
+필터 조건을 받아 클러스터별 TOP N 차량을 JSON으로 반환
+미리 만든 클러스터 모델과 필터 비트맵 인덱스를 메모리에 두고 응답하며,
+같은 조건의 응답은 LRU 캐시에서 돌려줌
+
+사용법:
+    python api.py --port 8000 [--processes 4] [--clusters kmeans]
+    GET /recommendations?car_size=중형&drivetrain=AWD&brand=Kia&brand=BMW&top_n=5
+    GET /metrics
+'''
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+import tornado.ioloop
+import tornado.netutil
+import tornado.process
+import tornado.web
+from tornado.httpserver import HTTPServer
+
+from clustering_recommendation import CLUSTER_NAMES, FEATURES, SCORE_COLUMNS, get_cluster_model
+from data_store import frame_version, load_catalog
+from filtering import FILTER_COLUMNS, get_filter_index
+from kmeans import KMEANS_MODEL_PATH, kmeans_cluster_model
+
+# 응답 캐시 크기, 지연 시간 기록 개수, top_n 상한
+RESPONSE_CACHE_SIZE = 1024
+LATENCY_WINDOW = 10_000
+MAX_TOP_N = 50
+
+# 클러스터 라벨 방식: 임계값 규칙(assign_clusters) 또는 kmeans.py로 학습한 중심점
+CLUSTER_ENGINES = ['rule', 'kmeans']
+
+
+class RecommendationService:
+    '''카탈로그, 클러스터 모델, 필터 인덱스를 들고 추천 결과를 계산/캐시'''
+    def __init__(self, df, cluster_engine='rule', kmeans_path=KMEANS_MODEL_PATH):
+        self.df = df
+        self.version = frame_version(df)
+        self.cluster_engine = cluster_engine
+        if cluster_engine == 'kmeans':
+            self.model = kmeans_cluster_model(df, kmeans_path)
+            if self.model is None:
+                raise ValueError(f'{kmeans_path}에 이 데이터셋 버전의 k-means 중심점이 없음 '
+                                 '(python kmeans.py로 먼저 학습)')
+        else:
+            self.model = get_cluster_model(df)
+        self.index = get_filter_index(df)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counters = {'requests': 0, 'cache_hit': 0, 'cache_miss': 0}
+
+    @staticmethod
+    def normalize(filters: dict, brands, top_n: int) -> tuple:
+        '''캐시 키용 요청 정규화 (값 순서 무시)'''
+        return (
+            tuple((col, tuple(sorted(set(filters.get(col, []))))) for col in FILTER_COLUMNS),
+            tuple(sorted(set(brands))),
+            top_n,
+        )
+
+    def _compute(self, key) -> dict:
+        filter_zip, brands, top_n = key
+        mask = self.index.mask(list(filter_zip))
+        if brands:
+            mask = mask & self.index.values_mask('brand', brands)
+        matched = len(self.index.positions(mask))
+        clusters = {}
+        for cluster_name, score_col in zip(CLUSTER_NAMES, SCORE_COLUMNS):
+            top = self.model.top_models(cluster_name, top_n, mask=mask) if matched else []
+            clusters[cluster_name] = [
+                {
+                    'rank': rank,
+                    'brand': str(row['brand']),
+                    'model': str(row['model']),
+                    'score': round(float(row[score_col]), 2),
+                    'scores': {col: round(float(row[col]), 2) for col in SCORE_COLUMNS},
+                    'specs': {col: float(row[col]) for col in FEATURES},
+                }
+                for rank, (_, row) in enumerate(top.iterrows() if len(top) else [], 1)
+            ]
+        return {
+            'dataset_version': self.version,
+            'cluster_engine': self.cluster_engine,
+            'filters': {col: list(values) for col, values in filter_zip if values},
+            'brands': list(brands),
+            'matched': matched,
+            'top_n': top_n,
+            'clusters': clusters,
+        }
+
+    def recommend(self, filters: dict, brands, top_n=5) -> str:
+        '''추천 결과 JSON 문자열 (캐시 우선)'''
+        start = time.perf_counter()
+        key = self.normalize(filters, brands, top_n)
+        with self._lock:
+            body = self._cache.get(key)
+            if body is not None:
+                self._cache.move_to_end(key)
+        if body is None:
+            body = json.dumps(self._compute(key), ensure_ascii=False)
+            with self._lock:
+                self._cache[key] = body
+                while len(self._cache) > RESPONSE_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+                self.counters['cache_miss'] += 1
+        else:
+            with self._lock:
+                self.counters['cache_hit'] += 1
+        with self._lock:
+            self.counters['requests'] += 1
+            self.latencies.append(time.perf_counter() - start)
+        return body
+
+    def metrics(self) -> dict:
+        '''요청 수, 캐시 적중, 최근 지연 시간 p50/p99 (ms)'''
+        with self._lock:
+            latencies = np.array(self.latencies)
+            counters = dict(self.counters, cache_entries=len(self._cache))
+        result = {'dataset_version': self.version, 'cluster_engine': self.cluster_engine, **counters}
+        if len(latencies):
+            result['p50_ms'] = round(float(np.percentile(latencies, 50)) * 1000, 3)
+            result['p99_ms'] = round(float(np.percentile(latencies, 99)) * 1000, 3)
+        return result
+
+
+class RecommendationHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    async def get(self):
+        filters = {col: self.get_arguments(col) for col in FILTER_COLUMNS}
+        brands = self.get_arguments('brand')
+        try:
+            top_n = int(self.get_argument('top_n', '5'))
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason='top_n must be an integer')
+        if not 1 <= top_n <= MAX_TOP_N:
+            raise tornado.web.HTTPError(400, reason=f'top_n must be between 1 and {MAX_TOP_N}')
+        # 계산은 스레드 풀에서 실행해 이벤트 루프를 막지 않음
+        body = await tornado.ioloop.IOLoop.current().run_in_executor(
+            None, self.service.recommend, filters, brands, top_n
+        )
+        self.set_header('Content-Type', 'application/json; charset=utf-8')
+        self.write(body)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def initialize(self, service):
+        self.service = service
+
+    def get(self):
+        self.write(self.service.metrics())
+
+
+def make_app(service=None, cluster_engine='rule') -> tornado.web.Application:
+    service = service or RecommendationService(load_catalog(), cluster_engine)
+    return tornado.web.Application([
+        (r'/recommendations', RecommendationHandler, dict(service=service)),
+        (r'/metrics', MetricsHandler, dict(service=service)),
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='전기차 추천 API 서버')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--processes', type=int, default=1, help='프로세스 수 (0이면 CPU 코어 수)')
+    parser.add_argument('--clusters', choices=CLUSTER_ENGINES, default='rule',
+                        help='클러스터 라벨 방식 (kmeans: kmeans.py로 저장한 중심점 사용)')
+    args = parser.parse_args(argv)
+
+    # 포크하기 전에 모델을 준비해 잘못된 설정이면 바로 종료하고, 프로세스들이 같은 메모리를 공유
+    try:
+        service = RecommendationService(load_catalog(), args.clusters)
+    except ValueError as e:
+        parser.error(str(e))
+    sockets = tornado.netutil.bind_sockets(args.port, args.host)
+    if args.processes != 1:
+        # 소켓을 연 뒤 포크해 모든 프로세스가 같은 포트에서 요청을 받음
+        tornado.process.fork_processes(args.processes)
+    server = HTTPServer(make_app(service))
+    server.add_sockets(sockets)
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == '__main__':
+    main()
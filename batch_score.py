@@ -0,0 +1,289 @@
+'''
+배치 점수 계산 CLI
+새 카탈로그 덤프(CSV/Parquet)를 청크 단위로 읽어 점수 3개와 클러스터를 붙인 Parquet 파일로 저장
+전체 데이터를 메모리에 올리지 않도록 여러 번 나눠 읽음
+    1. stats     : 스펙별 최소/최대, 유효 행 수
+    2. histogram : 점수 구간별 개수 (점수 범위가 고정이므로 크기 일정)
+    3. refine    : 백분위수가 걸린 구간의 값만 모아 정확한 임계값 계산
+    4. write     : 점수/클러스터를 계산해 Parquet로 기록
+결과는 prepare_clustering_data를 전체 데이터에 한 번에 적용한 것과 같음
+--approx를 주면 2~3단계 대신 KLL 스케치 한 번으로 임계값을 근사 (순위 오차 --epsilon 이내)
+
+사용법:
+    python batch_score.py catalog.csv --output scored.parquet --chunk-size 100000 --jobs 4
+'''
+import argparse
+import json
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from clustering_recommendation import CLUSTER_NAMES, DEFAULT_WEIGHTS, FEATURES, SCORE_COLUMNS, score, score_arrays
+from streaming_stats import DEFAULT_EPSILON, KLLSketch, MinMax, lerp, sketch_cutoffs
+
+# 결측이면 점수 계산에서 제외되는 컬럼 (prepare_clustering_data와 동일)
+REQUIRED_COLUMNS = FEATURES + ['brand', 'model']
+
+DEFAULT_CHUNK_SIZE = 100_000
+# 점수 히스토그램 구간 수
+HIST_BINS = 2**16
+
+
+def read_chunks(path: str, chunk_size=DEFAULT_CHUNK_SIZE, dtypes=None):
+    '''
+    CSV/Parquet 파일을 chunk_size 행씩 데이터프레임으로 읽음
+    CSV는 청크마다 타입을 따로 추론하므로 dtypes(stats 단계에서 합친 컬럼 타입)를 주면 그대로 고정
+    '''
+    if path.endswith('.parquet'):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtypes)
+
+
+def merge_dtypes(dtypes: dict, other: dict) -> dict:
+    '''
+    지금까지의 컬럼 타입과 다른 청크의 컬럼 타입({컬럼: dtype})을 합침
+    같으면 그대로, 수치끼리 다르면 float64 (정수 청크 + 실수/결측 청크), 그 밖에는 object
+    '''
+    merged = dict(dtypes)
+    for column, dtype in other.items():
+        seen = merged.get(column)
+        if seen is None or seen == dtype:
+            merged[column] = dtype
+        elif seen.kind in 'iuf' and dtype.kind in 'iuf':
+            merged[column] = np.dtype(float)
+        else:
+            merged[column] = np.dtype(object)
+    return merged
+
+
+def _complete(chunk: pd.DataFrame) -> pd.DataFrame:
+    '''점수 계산에 필요한 컬럼이 모두 있는 행만 남김'''
+    return chunk.dropna(subset=REQUIRED_COLUMNS)
+
+
+def _map_chunks(func, chunks, jobs=1, args=()):
+    '''
+    청크마다 func(chunk, *args) 결과를 입력 순서대로 반환
+    jobs > 1이면 프로세스 풀에서 실행하되 동시에 읽어 두는 청크 수는 jobs * 2개로 제한
+    '''
+    if jobs <= 1:
+        for chunk in chunks:
+            yield func(chunk, *args)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk, *args))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _chunk_stats(chunk):
+    '''청크의 (전체 행 수, 스펙별 최소/최대, 컬럼 타입)'''
+    stats = MinMax(len(FEATURES)).update(_complete(chunk)[FEATURES].to_numpy(dtype=float))
+    return len(chunk), stats, chunk.dtypes.to_dict()
+
+
+def _score_matrix(chunk, bounds, weights):
+    '''유효 행의 (n, 3) 점수 행렬'''
+    complete = _complete(chunk)
+    scores = score_arrays({feature: complete[feature].to_numpy() for feature in FEATURES}, weights, bounds)
+    return np.column_stack([scores[col] for col in SCORE_COLUMNS]) if len(complete) else np.empty((0, 3))
+
+
+def _bin_codes(scores, score_ranges):
+    '''점수 → 히스토그램 구간 번호 (범위 밖 값은 양 끝 구간에 포함)'''
+    low, high = score_ranges[:, 0], score_ranges[:, 1]
+    codes = ((scores - low) / (high - low) * HIST_BINS).astype(np.int64)
+    return np.clip(codes, 0, HIST_BINS - 1)
+
+
+def _chunk_histogram(chunk, bounds, weights, score_ranges):
+    '''점수별 구간 개수 (3, HIST_BINS)'''
+    codes = _bin_codes(_score_matrix(chunk, bounds, weights), score_ranges)
+    return np.stack([np.bincount(codes[:, i], minlength=HIST_BINS) for i in range(len(SCORE_COLUMNS))])
+
+
+def _chunk_refine(chunk, bounds, weights, score_ranges, target_bins):
+    '''점수별로 target_bins 구간에 들어간 값의 개수 {구간 번호: {값: 개수}}'''
+    scores = _score_matrix(chunk, bounds, weights)
+    codes = _bin_codes(scores, score_ranges)
+    result = []
+    for i, bins in enumerate(target_bins):
+        found = {}
+        for b in bins:
+            values, counts = np.unique(scores[codes[:, i] == b, i], return_counts=True)
+            found[b] = dict(zip(values.tolist(), counts.tolist()))
+        result.append(found)
+    return result
+
+
+def _chunk_sketches(chunk, bounds, weights, epsilon):
+    '''점수별 KLL 스케치 (부모 프로세스에서 merge)'''
+    scores = _score_matrix(chunk, bounds, weights)
+    return [KLLSketch(epsilon).update(scores[:, i]) for i in range(len(SCORE_COLUMNS))]
+
+
+def _chunk_output(chunk, bounds, weights, cutoffs):
+    '''점수와 클러스터를 붙인 Arrow 테이블'''
+    result = score(_complete(chunk), weights, bounds=bounds, cutoffs=cutoffs)
+    return pa.Table.from_pandas(result, preserve_index=False)
+
+
+def exact_percentile(hist, value_counts, n, percentile):
+    '''
+    히스토그램(구간별 개수)과 대상 구간의 값별 개수로 정확한 백분위수 계산
+    value_counts는 {구간 번호: {값: 개수}}
+    '''
+    position = (n - 1) * (percentile / 100)
+    k = int(np.floor(position))
+    cumulative = np.cumsum(hist)
+
+    def order_statistic(k):
+        b = int(np.searchsorted(cumulative, k, side='right'))
+        rank = k - (int(cumulative[b - 1]) if b else 0)
+        for value, count in sorted(value_counts[b].items()):
+            if rank < count:
+                return value
+            rank -= count
+        raise ValueError('refine 단계 값 개수가 히스토그램과 다름')
+
+    low = order_statistic(k)
+    high = order_statistic(min(k + 1, n - 1))
+    return lerp(low, high, position - k)
+
+
+def target_bins(hist, n, percentile) -> list:
+    '''백분위수 계산에 필요한 두 순서 통계량이 들어 있는 구간 번호'''
+    position = (n - 1) * (percentile / 100)
+    k = int(np.floor(position))
+    cumulative = np.cumsum(hist)
+    return sorted({int(np.searchsorted(cumulative, i, side='right')) for i in (k, min(k + 1, n - 1))})
+
+
+def score_ranges_for(weights) -> np.ndarray:
+    '''점수별 가능한 범위 (정규화 값 0~1 × 가중치 합 × 100)'''
+    return np.array([[0.0, 100.0 * max(sum(weights[col].values()), 1e-12)] for col in SCORE_COLUMNS])
+
+
+def exact_cutoffs(input_path, chunk_size, jobs, bounds, weights, n, percentile) -> np.ndarray:
+    '''히스토그램 + 정밀화 두 번의 읽기로 np.percentile과 같은 임계값 계산'''
+    score_ranges = score_ranges_for(weights)
+
+    # 점수 히스토그램
+    hist = np.zeros((len(SCORE_COLUMNS), HIST_BINS), dtype=np.int64)
+    for chunk_hist in _map_chunks(_chunk_histogram, read_chunks(input_path, chunk_size), jobs,
+                                  (bounds, weights, score_ranges)):
+        hist += chunk_hist
+
+    # 백분위수가 걸린 구간의 값만 모아 정확한 임계값 계산
+    bins = [target_bins(hist[i], n, percentile) for i in range(len(SCORE_COLUMNS))]
+    value_counts = [{b: Counter() for b in col_bins} for col_bins in bins]
+    for chunk_values in _map_chunks(_chunk_refine, read_chunks(input_path, chunk_size), jobs,
+                                    (bounds, weights, score_ranges, bins)):
+        for merged, found in zip(value_counts, chunk_values):
+            for b, counts in found.items():
+                merged[b].update(counts)
+    return np.array([exact_percentile(hist[i], value_counts[i], n, percentile) for i in range(len(SCORE_COLUMNS))])
+
+
+def approx_cutoffs(input_path, chunk_size, jobs, bounds, weights, percentile, epsilon) -> np.ndarray:
+    '''청크별 KLL 스케치를 합쳐 임계값 근사 (읽기 한 번)'''
+    merged = None
+    for sketches in _map_chunks(_chunk_sketches, read_chunks(input_path, chunk_size), jobs,
+                                (bounds, weights, epsilon)):
+        merged = sketches if merged is None else [a.merge(b) for a, b in zip(merged, sketches)]
+    return sketch_cutoffs(merged, percentile)
+
+
+def batch_score(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, jobs=1, weights=None, percentile=70,
+                approx=False, epsilon=DEFAULT_EPSILON) -> dict:
+    '''입력 파일을 청크 단위로 점수 계산해 output_path(Parquet)에 저장하고 요약 반환'''
+    weights = weights or DEFAULT_WEIGHTS
+    started = time.perf_counter()
+
+    # 1. 스펙별 최소/최대, 이후 단계에서 모든 청크에 같이 쓸 컬럼 타입
+    total_rows, minmax, dtypes = 0, MinMax(len(FEATURES)), {}
+    for rows, stats, chunk_dtypes in _map_chunks(_chunk_stats, read_chunks(input_path, chunk_size), jobs):
+        total_rows += rows
+        minmax.merge(stats)
+        dtypes = merge_dtypes(dtypes, chunk_dtypes)
+    n = minmax.count
+    if n == 0:
+        raise ValueError(f'점수를 계산할 수 있는 행이 없음: {input_path}')
+    bounds = minmax.bounds(FEATURES)
+
+    # 2~3. 클러스터 임계값
+    if approx:
+        cutoffs = approx_cutoffs(input_path, chunk_size, jobs, bounds, weights, percentile, epsilon)
+    else:
+        cutoffs = exact_cutoffs(input_path, chunk_size, jobs, bounds, weights, n, percentile)
+
+    # 4. 점수/클러스터 기록 (실패하면 쓰던 임시 파일 삭제)
+    writer, schema = None, None
+    cluster_counts = Counter()
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    try:
+        try:
+            for table in _map_chunks(_chunk_output, read_chunks(input_path, chunk_size, dtypes), jobs,
+                                     (bounds, weights, cutoffs)):
+                if table.num_rows == 0:
+                    continue
+                if writer is None:
+                    # 첫 청크에서 전부 비어 있던 컬럼은 문자열로 고정
+                    schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                        for field in table.schema])
+                    writer = pq.ParquetWriter(tmp_path, schema)
+                writer.write_table(table.cast(schema))
+                cluster_counts.update(table.column('cluster').to_pylist())
+        finally:
+            if writer is not None:
+                writer.close()
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        'input': input_path,
+        'output': output_path,
+        'rows': total_rows,
+        'scored': n,
+        'dropped': total_rows - n,
+        'bounds': bounds,
+        'cutoffs': dict(zip(CLUSTER_NAMES.tolist(), cutoffs.tolist())),
+        'approx': approx,
+        'clusters': {name: cluster_counts.get(name, 0) for name in CLUSTER_NAMES},
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='전기차 카탈로그 배치 점수 계산')
+    parser.add_argument('input', help='입력 CSV 또는 Parquet 파일')
+    parser.add_argument('--output', help='출력 Parquet 파일 (기본: <입력>.scored.parquet)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--jobs', type=int, default=1, help='청크를 병렬 처리할 프로세스 수')
+    parser.add_argument('--percentile', type=float, default=70, help='클러스터 임계값 백분위수')
+    parser.add_argument('--approx', action='store_true', help='KLL 스케치로 임계값 근사 (읽기 횟수 감소)')
+    parser.add_argument('--epsilon', type=float, default=DEFAULT_EPSILON, help='근사 임계값의 순위 오차')
+    args = parser.parse_args(argv)
+
+    output = args.output or f'{os.path.splitext(args.input)[0]}.scored.parquet'
+    summary = batch_score(args.input, output, args.chunk_size, args.jobs, percentile=args.percentile,
+                          approx=args.approx, epsilon=args.epsilon)
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
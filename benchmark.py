@@ -0,0 +1,253 @@
+'''
+데이터 로드 / 점수 계산 / 클러스터링 / 필터링 / 추천 조인 / k-means / 유사 차량 검색 구간 벤치마크
+Streamlit 없이 실행되며 단계별 결과를 JSON Lines로 출력
+
+사용법:
+    python benchmark.py --sizes 1k,100k,1m --output bench.jsonl
+'''
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import data_store
+from clustering_recommendation import (CLUSTER_NAMES, SCORE_COLUMNS, ClusterModel, assign_clusters,
+                                       calculate_scores, compute_cutoffs, prepare_clustering_data)
+from filtering import FilterIndex, return_filtered_df
+from kmeans import agreement, fit, score_vectors
+from similarity import SimilarityEngine, nearest_center
+from streaming_stats import KLLSketch, sketch_cutoffs
+
+SIZE_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+CAR_SIZES = ['소형', '준중형', '준대형', '중형', '대형', '승합차', '초소형', '스포츠카']
+DRIVETRAINS = ['FWD', 'RWD', 'AWD']
+BODY_TYPES = ['세단', 'SUV', '승합차', '스포츠카']
+PORTS = ['CCS', 'CHAdeMO']
+
+# 벤치마크에서 쓰는 대표 필터 조합
+SAMPLE_FILTERS = [('car_size', ['중형', '대형']), ('drivetrain', ['AWD']), ('car_body_type', [])]
+
+# 스케치 임계값 비교에 쓰는 청크 수와 순위 오차
+SKETCH_CHUNKS = 16
+SKETCH_EPSILON = 0.01
+
+# k-means 재시작 횟수
+KMEANS_RESTARTS = 4
+
+# 유사 차량 검색 질의 수와 이웃 수
+SIMILAR_QUERIES = 100
+SIMILAR_K = 10
+
+
+def parse_size(text: str) -> int:
+    '''"100k", "1m" 같은 크기 표기를 정수로 변환'''
+    text = text.strip().lower()
+    if text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def synthetic_catalog(n_rows: int, seed: int = 0):
+    '''
+    dropped_df_processed_encoded.csv와 같은 스키마의 가상 카탈로그 생성
+    (메인, hover, 이미지) 데이터프레임 3개 반환
+    '''
+    rng = np.random.default_rng(seed)
+    brands = np.array([f'Brand{i:02d}' for i in range(60)], dtype=object)
+    brand = brands[rng.integers(0, len(brands), n_rows)]
+    model = np.char.add('Model ', np.arange(n_rows).astype(str)).astype(object)
+    battery = np.round(rng.uniform(20, 120, n_rows), 1)
+    efficiency = rng.integers(130, 300, n_rows)
+    main = pd.DataFrame({
+        'brand': brand,
+        'model': model,
+        'top_speed_kmh': rng.integers(120, 330, n_rows),
+        'battery_capacity_kWh': battery,
+        'efficiency_wh_per_km': efficiency,
+        'range_km': (battery * 1000 / efficiency).astype(int),
+        'acceleration_0_100_s': np.round(rng.uniform(2.0, 15.0, n_rows), 1),
+        'fast_charging_power_kw_dc': rng.integers(30, 350, n_rows),
+        'fast_charge_port': rng.choice(PORTS, n_rows),
+        'cargo_volume_l': rng.integers(100, 900, n_rows),
+        'seats': rng.integers(2, 9, n_rows),
+        'drivetrain': rng.choice(DRIVETRAINS, n_rows),
+        'car_body_type': rng.choice(BODY_TYPES, n_rows),
+        'car_size': rng.choice(CAR_SIZES, n_rows),
+    })
+    hover = pd.DataFrame({
+        'length_mm': rng.integers(3000, 5500, n_rows),
+        'width_mm': rng.integers(1500, 2100, n_rows),
+        'height_mm': rng.integers(1200, 2000, n_rows),
+        'torque_nm': np.round(rng.uniform(100, 1200, n_rows), 1),
+        'battery_type': 'Lithium-ion',
+        'seats': main['seats'],
+    })
+    image = pd.DataFrame({
+        'model': model,
+        'image_url': np.char.add('https://example.invalid/thumb/', np.arange(n_rows).astype(str)).astype(object),
+    })
+    return main, hover, image
+
+
+def write_sources(n_rows: int, directory: str, seed: int = 0) -> list:
+    '''가상 카탈로그를 원본 CSV 3개로 저장하고 경로 목록 반환'''
+    main, hover, image = synthetic_catalog(n_rows, seed)
+    paths = [os.path.join(directory, name) for name in ('main.csv', 'hover.csv', 'image.csv')]
+    for frame, path in zip((main, hover, image), paths):
+        frame.to_csv(path, index=False)
+    return paths
+
+
+def measure(stage: str, n_rows: int, func, *args, **kwargs):
+    '''
+    한 단계의 실행 시간과 최대 메모리 측정
+    tracemalloc은 할당마다 기록 비용이 들어 시간을 부풀리므로, 시간은 추적 없이 한 번 재고
+    최대 메모리는 같은 호출을 한 번 더 실행해 잼 (측정 대상 함수는 결과를 캐시하지 않음)
+    (결과 레코드, 시간 측정 실행의 반환값) 반환
+    '''
+    start = time.perf_counter()
+    value = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    record = {
+        'stage': stage,
+        'rows': n_rows,
+        'seconds': round(seconds, 6),
+        'rows_per_second': round(n_rows / seconds) if seconds > 0 else None,
+        'peak_traced_mb': round(peak / 2**20, 3),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    return record, value
+
+
+def chunked_sketch_cutoffs(scored: pd.DataFrame, n_chunks=SKETCH_CHUNKS, epsilon=SKETCH_EPSILON):
+    '''점수를 청크로 나눠 청크별 KLL 스케치를 만들고 합쳐 임계값 계산 (워커 분산 처리 모사)'''
+    merged = None
+    for chunk in np.array_split(scored[SCORE_COLUMNS].to_numpy(dtype=float), n_chunks):
+        sketches = [KLLSketch(epsilon).update(chunk[:, i]) for i in range(len(SCORE_COLUMNS))]
+        merged = sketches if merged is None else [a.merge(b) for a, b in zip(merged, sketches)]
+    return sketch_cutoffs(merged)
+
+
+def sketch_agreement(scored: pd.DataFrame, cutoffs) -> dict:
+    '''스케치 임계값과 정확한 임계값의 클러스터 라벨 일치율, 임계값의 순위 오차'''
+    exact = compute_cutoffs(scored)
+    agreement = float(np.mean(assign_clusters(scored, cutoffs) == assign_clusters(scored, exact)))
+    rank_error = max(
+        abs(float(np.mean(scored[col].to_numpy() <= cutoff)) - float(np.mean(scored[col].to_numpy() <= exact_cutoff)))
+        for col, cutoff, exact_cutoff in zip(SCORE_COLUMNS, cutoffs, exact)
+    )
+    return {'epsilon': SKETCH_EPSILON, 'label_agreement': round(agreement, 6), 'max_rank_error': round(rank_error, 6)}
+
+
+def similar_queries(engine: SimilarityEngine, queries) -> list:
+    '''질의 차량(벡터 위치)별 이웃 위치 목록'''
+    return [engine.neighbors(position, SIMILAR_K)[0] for position in queries]
+
+
+def similar_stats(record: dict, results, exact_results) -> dict:
+    '''질의당 지연 시간과 정확한 k-NN 대비 재현율'''
+    recall = np.mean([len(np.intersect1d(found, exact)) / SIMILAR_K
+                      for found, exact in zip(results, exact_results)])
+    return {'query_ms': round(record['seconds'] / len(results) * 1000, 4), 'k': SIMILAR_K,
+            'recall': round(float(recall), 6)}
+
+
+def run_size(n_rows: int, workdir: str, seed: int = 0):
+    '''크기 하나에 대해 전체 구간을 순서대로 측정'''
+    paths = write_sources(n_rows, workdir, seed)
+    catalog_path = os.path.join(workdir, 'catalog.arrow')
+
+    record, df = measure('read_csv_join', n_rows, data_store.load_sources, *paths)
+    yield record
+    record, _ = measure('build_catalog', n_rows, data_store.build_catalog, catalog_path, paths)
+    yield record
+    record, df = measure('read_data', n_rows, data_store.load_catalog, catalog_path, paths)
+    yield record
+
+    record, scores = measure('calculate_scores', n_rows, calculate_scores, df)
+    yield record
+    scored = pd.DataFrame(dict(zip(['speed_score', 'battery_score', 'charging_score'], scores)))
+    record, _ = measure('assign_clusters', n_rows, assign_clusters, scored)
+    yield record
+    record, cutoffs = measure('sketch_cutoffs', n_rows, chunked_sketch_cutoffs, scored)
+    record.update(sketch_agreement(scored, cutoffs))
+    yield record
+
+    record, filtered_df = measure('return_filtered_df', n_rows, return_filtered_df, df, SAMPLE_FILTERS)
+    yield record
+    record, filter_index = measure('build_filter_index', n_rows, FilterIndex, df)
+    yield record
+    record, _ = measure('bitmap_filter', n_rows,
+                        lambda: filter_index.take(df, filter_index.mask(SAMPLE_FILTERS)))
+    yield record
+
+    record, model = measure('build_cluster_model', n_rows,
+                            lambda frame: ClusterModel(prepare_clustering_data(frame)), df)
+    yield record
+    record, _ = measure('recommend_join', n_rows,
+                        lambda: [model.top_models(name, 5, filtered_df) for name in CLUSTER_NAMES])
+    yield record
+    vectors = score_vectors(model)
+    record, (centers, inertia) = measure('kmeans_fit', n_rows, fit, vectors, restarts=KMEANS_RESTARTS, seed=seed)
+    rule_codes = pd.Categorical(model.data['cluster'], categories=CLUSTER_NAMES).codes
+    rate, _ = agreement(nearest_center(vectors, centers), rule_codes, len(centers))
+    record.update({'restarts': KMEANS_RESTARTS, 'inertia': round(inertia, 6), 'rule_agreement': round(rate, 6)})
+    yield record
+
+    mask = filter_index.mask(SAMPLE_FILTERS)
+    record, _ = measure('recommend_topk', n_rows,
+                        lambda: [model.top_models(name, 5, mask=mask) for name in CLUSTER_NAMES])
+    yield record
+
+    record, exact_engine = measure('similarity_exact_build', n_rows, SimilarityEngine, df, approx=False)
+    yield record
+    record, ivf_engine = measure('similarity_ivf_build', n_rows, SimilarityEngine, df, approx=True, seed=seed)
+    yield record
+    n_vectors = len(exact_engine.vectors)
+    queries = np.random.default_rng(seed).choice(n_vectors, min(SIMILAR_QUERIES, n_vectors), replace=False)
+    record, exact_results = measure('similar_exact', n_rows, similar_queries, exact_engine, queries)
+    record.update(similar_stats(record, exact_results, exact_results))
+    yield record
+    record, results = measure('similar_ivf', n_rows, similar_queries, ivf_engine, queries)
+    record.update(similar_stats(record, results, exact_results))
+    yield record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='전기차 추천 앱 핫패스 벤치마크')
+    parser.add_argument('--sizes', default='1k,100k,1m', help='쉼표로 구분한 행 수 (예: 1k,100k,1m,10m)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='결과를 저장할 JSONL 경로 (기본: 표준 출력)')
+    args = parser.parse_args(argv)
+
+    meta = {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__}
+    out = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for n_rows in map(parse_size, args.sizes.split(',')):
+            with tempfile.TemporaryDirectory() as workdir:
+                for record in run_size(n_rows, workdir, args.seed):
+                    record.update(meta)
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,519 @@
+'''
+카탈로그 증분 갱신 (전체 재계산 없이 차량 추가/수정)
+(brand, model) 키로 차량을 upsert하고 델타 세그먼트(ev_catalog.delta.arrow.*.seg)에 기록
+스펙 최소/최대와 점수 백분위수는 정렬 배열 + 델타 구조로 갱신하고,
+임계값이 움직인 구간에 점수가 걸친 차량만 다시 분류
+정규화 범위(스펙 최소/최대)가 바뀌면 모든 점수가 바뀌므로 그때만 전체 재계산
+
+갱신 상태(키 순서, 스펙/점수/라벨, 정렬 배열)는 ev_catalog.state.arrow에 저장해 두고 메모리 맵으로 열기 때문에
+갱신 한 번의 비용은 카탈로그 크기가 아니라 바뀐 차량 수에 비례
+저장할 때도 바뀐 행만 델타/모델 세그먼트로 덧붙이고, 세그먼트가 쌓이면 한 번에 합침
+
+사용법:
+    python catalog_update.py new_models.csv [--top-n 5]
+'''
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from clustering_recommendation import (CLUSTER_MODEL_PATH, CLUSTER_NAMES, DEFAULT_WEIGHTS, FEATURES,
+                                       SCORE_COLUMNS, cluster_codes, model_chain, score_arrays, write_model_file,
+                                       write_model_segment)
+from data_store import (CATALOG_PATH, DELTA_PATH, SOURCE_FILES, combined_version, dataset_version, dedupe_keys,
+                        delta_parts, load_catalog, read_arrow, read_delta, segment_paths, table_metadata,
+                        write_arrow, write_delta, write_delta_segment)
+from streaming_stats import SortedDelta
+
+# 갱신 상태 파일 (세그먼트를 합칠 때 기록)
+STATE_PATH = './ev_catalog.state.arrow'
+
+# 세그먼트가 이만큼 쌓이면 저장할 때 델타/모델/상태 파일을 한 번에 다시 씀
+MAX_SEGMENTS = 16
+
+# 보고서에 나열할 재분류 차량 최대 개수
+MAX_REPORTED = 50
+
+
+def _array(table: pa.Table, name: str) -> np.ndarray:
+    '''메모리 맵 테이블의 컬럼을 가능하면 복사 없이 numpy 배열로'''
+    column = table.column(name)
+    return column.chunk(0).to_numpy() if column.num_chunks == 1 else column.to_numpy()
+
+
+def _settings(weights, percentile) -> str:
+    '''상태 파일을 다시 쓸 수 있는지 확인할 점수 설정'''
+    return json.dumps({'weights': weights, 'percentile': percentile}, sort_keys=True)
+
+
+class RowStore:
+    '''
+    행 위치 → 값 k개
+    기본 컬럼(읽기 전용, 메모리 맵 가능)은 그대로 두고 바뀐 행만 dict에 보관
+    '''
+    def __init__(self, columns, fill):
+        self.columns = list(columns)
+        self.fill = fill
+        self.changed = {}
+        self.dtype = np.result_type(*self.columns)
+
+    def get(self, rows) -> np.ndarray:
+        '''rows 위치의 (len(rows), k) 값'''
+        rows = np.asarray(rows, dtype=np.int64)
+        result = np.full((len(rows), len(self.columns)), self.fill, dtype=self.dtype)
+        in_base = rows < len(self.columns[0])
+        for j, column in enumerate(self.columns):
+            result[in_base, j] = column[rows[in_base]]
+        if self.changed:
+            for i, row in enumerate(rows.tolist()):
+                value = self.changed.get(row)
+                if value is not None:
+                    result[i] = value
+        return result
+
+    def set(self, rows, values):
+        for row, value in zip(np.asarray(rows).tolist(), np.asarray(values).tolist()):
+            self.changed[row] = value
+
+    def full(self, n: int) -> np.ndarray:
+        '''0 ~ n-1 위치 전체의 (n, k) 값'''
+        result = np.full((n, len(self.columns)), self.fill, dtype=self.dtype)
+        for j, column in enumerate(self.columns):
+            result[:len(column), j] = column[:n]
+        for row, value in self.changed.items():
+            result[row] = value
+        return result
+
+
+class KeyIndex:
+    '''
+    (brand, model) → 행 위치
+    기본 키는 정렬 순서(order)로 이진 탐색하고, 그 뒤에 추가된 키와 결측 키만 dict에 보관
+    '''
+    def __init__(self, brands: pa.Array, models: pa.Array, order=None):
+        self.brands, self.models = brands, models
+        self.order = self.sort_order(brands, models) if order is None else order
+        self.added = {}
+        self.added_keys = []
+        if brands.null_count or models.null_count:
+            # 결측 키는 문자열과 비교할 수 없으므로 이진 탐색 대신 dict로 찾음
+            nulls = np.flatnonzero(brands.is_null().to_numpy(zero_copy_only=False)
+                                   | models.is_null().to_numpy(zero_copy_only=False))
+            self.added.update((self.key(row), row) for row in nulls.tolist())
+
+    @staticmethod
+    def sort_order(brands: pa.Array, models: pa.Array) -> np.ndarray:
+        '''결측이 없는 키의 정렬 순서 (같은 키가 여러 번 있으면 행 순서)'''
+        brand_codes, _ = pd.factorize(brands.to_pandas(), sort=True)
+        model_codes, _ = pd.factorize(models.to_pandas(), sort=True)
+        order = np.lexsort((model_codes, brand_codes))
+        return order[(brand_codes[order] >= 0) & (model_codes[order] >= 0)].astype(np.int64)
+
+    def __len__(self):
+        return len(self.brands) + len(self.added_keys)
+
+    def key(self, row: int) -> tuple:
+        if row < len(self.brands):
+            return self.brands[row].as_py(), self.models[row].as_py()
+        return self.added_keys[row - len(self.brands)]
+
+    def _bisect(self, key) -> int:
+        '''정렬 순서에서 key보다 큰 첫 위치'''
+        low, high = 0, len(self.order)
+        while low < high:
+            mid = (low + high) // 2
+            if key < self.key(int(self.order[mid])):
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    def get(self, key):
+        '''key의 행 위치 (없으면 None)'''
+        row = self.added.get(key)
+        if row is not None or None in key:
+            return row
+        # 바로 앞이 같은 키인지 확인 (같은 키가 여러 번이면 마지막 행)
+        index = self._bisect(key)
+        if index and self.key(int(self.order[index - 1])) == key:
+            return int(self.order[index - 1])
+        return None
+
+    def add(self, key) -> int:
+        '''key의 행 위치 (없으면 뒤에 추가)'''
+        key = tuple(part if isinstance(part, str) else None for part in key)
+        row = self.get(key)
+        if row is None:
+            row = len(self)
+            self.added[key] = row
+            self.added_keys.append(key)
+        return row
+
+    def merged_order(self) -> np.ndarray:
+        '''추가된 키까지 포함한 정렬 순서 (기존 순서에 새 키만 끼워 넣음)'''
+        added = sorted((key, row) for key, row in self.added.items() if row >= len(self.brands) and None not in key)
+        return np.insert(self.order, [self._bisect(key) for key, _ in added], [row for _, row in added])
+
+    def arrays(self):
+        '''전체 키 (brand 배열, model 배열)'''
+        if not self.added_keys:
+            return self.brands, self.models
+        brands, models = zip(*self.added_keys)
+        return (pa.concat_arrays([self.brands, pa.array(brands, type=self.brands.type)]),
+                pa.concat_arrays([self.models, pa.array(models, type=self.models.type)]))
+
+
+class CatalogUpdater:
+    '''
+    카탈로그 점수/클러스터 상태를 들고 upsert를 반영
+    행 위치는 load_catalog가 델타를 적용한 순서(기존 차량은 제자리, 새 차량은 뒤)와 같음
+    '''
+    def __init__(self, df, base_version=None, weights=None, percentile=70):
+        '''카탈로그 데이터프레임 전체로 상태 계산 (상태 파일이 없을 때)'''
+        brands = pa.array(df['brand'].astype(object), type=pa.string())
+        models = pa.array(df['model'].astype(object), type=pa.string())
+        features = df[FEATURES].to_numpy(dtype=float)
+        valid = ~np.isnan(features).any(axis=1) & df['brand'].notna().to_numpy() & df['model'].notna().to_numpy()
+        self._setup(list(df.columns), base_version or df.attrs.get('dataset_version'),
+                    df.attrs.get('dataset_version'), weights, percentile)
+        self.n = len(df)
+        self.keys = KeyIndex(brands, models)
+        self.features = RowStore(features.T, np.nan)
+        self.valid = RowStore([valid.astype(np.int8)], 0)
+        rows = np.flatnonzero(valid)
+        self.feature_stats = [SortedDelta(features[rows, j], rows) for j in range(len(FEATURES))]
+        self.bounds = self._current_bounds()
+        self._rescore_all()
+        # 상태 파일이 없으므로 다음 저장 때 전체를 기록
+        self._compact = True
+
+    def _setup(self, columns, base_version, version, weights, percentile):
+        self.columns = columns
+        self.base_version = base_version
+        self.version = version or base_version
+        self.weights = weights or DEFAULT_WEIGHTS
+        self.percentile = percentile
+        self.delta_path = DELTA_PATH
+        self.state_path = STATE_PATH
+        self._pending = []
+        self._changed = set()
+        self._compact = False
+
+    @classmethod
+    def from_state(cls, table: pa.Table, weights=None, percentile=70):
+        '''상태 파일(메모리 맵)로 계산 없이 상태 생성'''
+        updater = cls.__new__(cls)
+        updater._setup(json.loads(table_metadata(table, 'columns')), table_metadata(table, 'base_version'),
+                       table_metadata(table, 'dataset_version'), weights, percentile)
+        updater.n = table.num_rows
+        updater.keys = KeyIndex(table.column('brand').combine_chunks(), table.column('model').combine_chunks(),
+                                _array(table, 'key_order'))
+        updater.features = RowStore([_array(table, feature) for feature in FEATURES], np.nan)
+        updater.valid = RowStore([_array(table, 'valid')], 0)
+        updater.scores = RowStore([_array(table, col) for col in SCORE_COLUMNS], np.nan)
+        updater.labels = RowStore([_array(table, 'cluster')], -1)
+
+        counts = json.loads(table_metadata(table, 'sorted_counts'))
+        def stored(name):
+            count = counts[name]
+            return SortedDelta(_array(table, f'sorted_{name}')[:count], _array(table, f'sorted_{name}_row')[:count],
+                               presorted=True)
+        updater.feature_stats = [stored(feature) for feature in FEATURES]
+        updater.score_stats = [stored(col) for col in SCORE_COLUMNS]
+        updater.rankings = [stored(f'rank_{name}') for name in CLUSTER_NAMES]
+        updater.cutoffs = np.array(json.loads(table_metadata(table, 'cutoffs')))
+        updater.bounds = updater._current_bounds()
+        return updater
+
+    @classmethod
+    def open(cls, catalog_path=CATALOG_PATH, sources=SOURCE_FILES, delta_path=DELTA_PATH, state_path=STATE_PATH,
+             weights=None, percentile=70):
+        '''
+        상태 파일 + 그 뒤에 저장된 델타 세그먼트로 상태 생성
+        상태 파일이 없거나 원본/설정이 바뀌었으면 카탈로그 전체로 계산
+        '''
+        base_version = dataset_version(sources)
+        delta_base, parts = delta_parts(delta_path)
+        if delta_base != base_version:
+            # 원본 CSV가 바뀌었으면 이전 델타는 무시 (load_catalog와 같음)
+            parts = []
+        versions = [base_version] + [version for _, version in parts]
+
+        state = read_arrow(state_path)
+        usable = (state is not None and table_metadata(state, 'base_version') == base_version
+                  and table_metadata(state, 'settings') == _settings(weights or DEFAULT_WEIGHTS, percentile)
+                  and table_metadata(state, 'dataset_version') in versions)
+        if usable:
+            updater = cls.from_state(state, weights, percentile)
+            # 상태 파일 이후에 저장된 세그먼트만 다시 적용 (모델 파일에는 이미 반영되어 있음)
+            for frame, version in parts[versions.index(updater.version):]:
+                updater.upsert(frame)
+                updater.version = version
+            updater._pending = []
+            updater._changed = set()
+        else:
+            updater = cls(load_catalog(catalog_path, sources, delta_path), base_version, weights, percentile)
+        updater.delta_path = delta_path
+        updater.state_path = state_path
+        return updater
+
+    def _current_bounds(self) -> dict:
+        return {feature: (stats.min(), stats.max()) if len(stats) else (np.nan, np.nan)
+                for feature, stats in zip(FEATURES, self.feature_stats)}
+
+    def _current_cutoffs(self) -> np.ndarray:
+        return np.array([stats.percentile(self.percentile) if len(stats) else np.nan for stats in self.score_stats])
+
+    def _score(self, features: np.ndarray) -> np.ndarray:
+        '''(n, 6) 스펙 → (n, 3) 점수 (현재 정규화 범위 기준)'''
+        scores = score_arrays(dict(zip(FEATURES, features.T)), self.weights, self.bounds)
+        return np.column_stack([scores[col] for col in SCORE_COLUMNS])
+
+    def _label(self, scores: np.ndarray) -> np.ndarray:
+        '''(n, 3) 점수 → 라벨 코드 (현재 임계값 기준)'''
+        return cluster_codes(scores, self.cutoffs).astype(np.int8)
+
+    def _rescore_all(self):
+        '''모든 유효 차량의 점수, 임계값, 라벨, 순위 재계산'''
+        rows = np.flatnonzero(self.valid.full(self.n)[:, 0])
+        scores = np.full((self.n, len(SCORE_COLUMNS)), np.nan)
+        scores[rows] = self._score(self.features.get(rows))
+        self.score_stats = [SortedDelta(scores[rows, i], rows) for i in range(len(SCORE_COLUMNS))]
+        self.cutoffs = self._current_cutoffs()
+        labels = np.full(self.n, -1, dtype=np.int8)
+        labels[rows] = self._label(scores[rows])
+        self.scores = RowStore(scores.T, np.nan)
+        self.labels = RowStore([labels], -1)
+        # ClusterModel과 같은 순서 (점수 내림차순, 동점이면 행 순서)
+        self.rankings = []
+        for code in range(len(CLUSTER_NAMES)):
+            members = rows[labels[rows] == code]
+            self.rankings.append(SortedDelta(-scores[members, code], members))
+
+    def _rank(self, rows, codes, scores, add=True):
+        '''rows 차량을 codes 클러스터 순위에 넣거나(add) 뺌'''
+        for code, ranking in enumerate(self.rankings):
+            selected = codes == code
+            (ranking.add if add else ranking.remove)(-scores[selected, code], rows[selected])
+
+    def top(self, top_n=5) -> dict:
+        '''클러스터별 상위 차량 키 목록'''
+        return {name: [self.keys.key(row) for row in ranking.smallest(top_n).tolist()]
+                for name, ranking in zip(CLUSTER_NAMES, self.rankings)}
+
+    def upsert(self, rows: pd.DataFrame, top_n=5) -> dict:
+        '''
+        차량 추가/수정 반영 후 보고서 반환
+        (모드, 추가/수정 수, 임계값 변화, 재분류 차량, 바뀐 추천 목록)
+        '''
+        started = time.perf_counter()
+        rows = dedupe_keys(rows)
+        before = self.top(top_n)
+
+        # 키 → 행 위치 (새 차량은 뒤에 붙임)
+        positions = np.array([self.keys.add(key) for key in zip(rows['brand'].astype(object),
+                                                                rows['model'].astype(object))], dtype=np.int64)
+        inserted = int((positions >= self.n).sum())
+        self.n = len(self.keys)
+
+        # 이전 값 제거
+        was_valid = self.valid.get(positions)[:, 0].astype(bool)
+        old_rows = positions[was_valid]
+        old_features, old_scores = self.features.get(old_rows), self.scores.get(old_rows)
+        old_labels = self.labels.get(positions)[:, 0]
+        for j, stats in enumerate(self.feature_stats):
+            stats.remove(old_features[:, j], old_rows)
+        for i, stats in enumerate(self.score_stats):
+            stats.remove(old_scores[:, i], old_rows)
+        self._rank(old_rows, old_labels[was_valid], old_scores, add=False)
+
+        # 새 값 반영
+        values = rows.reindex(columns=FEATURES).to_numpy(dtype=float)
+        valid = ~np.isnan(values).any(axis=1) & rows['brand'].notna().to_numpy() & rows['model'].notna().to_numpy()
+        self.features.set(positions, values)
+        self.valid.set(positions, valid[:, None].astype(np.int8))
+        self.scores.set(positions, np.full((len(positions), len(SCORE_COLUMNS)), np.nan))
+        self.labels.set(positions, np.full((len(positions), 1), -1))
+        new_rows = positions[valid]
+        for j, stats in enumerate(self.feature_stats):
+            stats.add(values[valid, j], new_rows)
+
+        old_cutoffs = self.cutoffs
+        bounds = self._current_bounds()
+        if bounds != self.bounds:
+            # 정규화 범위가 바뀌면 모든 점수가 바뀜
+            mode = 'full'
+            self.bounds = bounds
+            previous = self.labels.full(self.n)[:, 0]
+            previous[positions] = old_labels
+            self._rescore_all()
+            relabeled = np.flatnonzero((previous >= 0) & (previous != self.labels.columns[0]))
+            # 모든 행이 바뀌었으므로 저장할 때 전체를 다시 씀
+            self._compact = True
+        else:
+            mode = 'incremental'
+            new_scores = self._score(values[valid])
+            self.scores.set(new_rows, new_scores)
+            for i, stats in enumerate(self.score_stats):
+                stats.add(new_scores[:, i], new_rows)
+            self.cutoffs = self._current_cutoffs()
+            # 임계값 이상/미만이 바뀔 수 있는 차량: 점수가 이전 ~ 새 임계값 사이
+            candidates = [new_rows]
+            for i, stats in enumerate(self.score_stats):
+                if self.cutoffs[i] != old_cutoffs[i]:
+                    low, high = sorted((old_cutoffs[i], self.cutoffs[i]))
+                    candidates.append(stats.positions_between(low, high))
+            candidates = np.unique(np.concatenate(candidates)).astype(np.int64)
+            candidate_scores = self.scores.get(candidates)
+            previous = self.labels.get(candidates)[:, 0]
+            labels = self._label(candidate_scores)
+            self.labels.set(candidates, labels[:, None])
+            # 라벨이 바뀐 차량과 새 값 차량만 순위를 옮김 (새 값 차량의 이전 라벨은 위에서 -1로 둠)
+            moved = previous != labels
+            stayed = moved & (previous >= 0)
+            self._rank(candidates[stayed], previous[stayed], candidate_scores[stayed], add=False)
+            self._rank(candidates[moved], labels[moved], candidate_scores[moved])
+            changed = candidates[moved]
+            self._changed.update(changed.tolist())
+            relabeled = np.concatenate([
+                np.setdiff1d(changed, positions),
+                positions[(old_labels >= 0) & (old_labels != self.labels.get(positions)[:, 0])],
+            ])
+        self._changed.update(positions.tolist())
+
+        # 델타 세그먼트는 save에서 한 번에 기록
+        self._pending.append(rows.reindex(columns=self.columns))
+        after = self.top(top_n)
+        relabeled_codes = self.labels.get(relabeled[:MAX_REPORTED])[:, 0].tolist()
+        report = {
+            'mode': mode,
+            'inserted': inserted,
+            'updated': len(positions) - inserted,
+            'cutoffs': {name: [float(old), float(new)]
+                        for name, old, new in zip(CLUSTER_NAMES, old_cutoffs, self.cutoffs)},
+            'relabeled_count': int(len(relabeled)),
+            'relabeled': [
+                dict(zip(('brand', 'model'), self.keys.key(row)), cluster=CLUSTER_NAMES[code] if code >= 0 else None)
+                for row, code in zip(relabeled[:MAX_REPORTED].tolist(), relabeled_codes)
+            ],
+            'recommendations': {
+                name: {
+                    'entered': [list(key) for key in after[name] if key not in before[name]],
+                    'left': [list(key) for key in before[name] if key not in after[name]],
+                    'top': [list(key) for key in after[name]],
+                }
+                for name in CLUSTER_NAMES if before[name] != after[name]
+            },
+            'update_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+        return report
+
+    def save(self, delta_path=None, model_path=CLUSTER_MODEL_PATH, state_path=None) -> str:
+        '''
+        델타와 클러스터 모델 저장, 새 데이터셋 버전 반환
+        평소에는 이번에 바뀐 행만 세그먼트로 덧붙이고, 전체 재계산 뒤나 세그먼트가 MAX_SEGMENTS개 쌓이면
+        델타/모델/상태 파일 전체를 다시 씀
+        앱/API는 다음 로드 때 델타를 적용하고 모델 파일을 계산 없이 읽음
+        '''
+        delta_path = delta_path or self.delta_path
+        state_path = state_path or self.state_path
+        previous = self.version
+        pending = dedupe_keys(pd.concat(self._pending, ignore_index=True)) if self._pending else None
+        table, segments = model_chain(model_path)
+        model_version = table_metadata(([table] + segments)[-1], 'dataset_version') if table is not None else None
+
+        if self._compact or len(segment_paths(delta_path)) >= MAX_SEGMENTS:
+            delta, delta_base, _ = read_delta(delta_path)
+            if delta_base != self.base_version:
+                delta = None
+            if pending is not None:
+                self.version = write_delta(
+                    pending if delta is None else dedupe_keys(pd.concat([delta, pending], ignore_index=True)),
+                    self.base_version, delta_path, combined_version(previous, pending))
+            elif delta is not None:
+                write_delta(delta, self.base_version, delta_path, previous)
+            # 상태 파일을 먼저 쓰면서 정렬 배열의 델타를 합쳐 두면 모델 순위는 그대로 잘라 쓰면 됨
+            self.write_state(state_path)
+            self._write_model(model_path)
+        else:
+            if pending is not None:
+                self.version = write_delta_segment(pending, self.base_version, previous, delta_path)
+            if model_version != previous:
+                # 모델 파일이 이 상태의 이전 버전이 아니면 이어 붙일 수 없으므로 전체 기록
+                self._write_model(model_path)
+            elif self.version != previous:
+                changed = np.array(sorted(self._changed), dtype=np.int64)
+                write_model_segment(model_path, previous, self.version, changed, self.scores.get(changed),
+                                    self.labels.get(changed)[:, 0], dict(zip(CLUSTER_NAMES, self.cutoffs)))
+        self._pending = []
+        self._changed = set()
+        self._compact = False
+        return self.version
+
+    def _write_model(self, model_path):
+        '''현재 상태 전체를 클러스터 모델 파일로 기록'''
+        valid = self.valid.full(self.n)[:, 0].astype(bool)
+        rows = np.flatnonzero(valid)
+        # 카탈로그 행 위치 → 모델 데이터(유효 행) 위치
+        data_position = np.cumsum(valid) - 1
+        ranked = {}
+        for name, ranking in zip(CLUSTER_NAMES, self.rankings):
+            ranked[name] = data_position[ranking.smallest(len(ranking))]
+        write_model_file(model_path, self.version, rows, self.scores.full(self.n)[rows],
+                         self.labels.full(self.n)[rows, 0], ranked, dict(zip(CLUSTER_NAMES, self.cutoffs)))
+
+    def write_state(self, path=STATE_PATH):
+        '''
+        다음 open이 계산 없이 메모리 맵으로 읽을 상태 파일 기록
+        정렬 배열은 델타를 합친 뒤 행 수(n) 길이로 채워 저장 (실제 길이는 메타데이터)
+        '''
+        brands, models = self.keys.arrays()
+        columns = {'brand': brands, 'model': models, 'key_order': self.keys.merged_order()}
+        features = self.features.full(self.n)
+        scores = self.scores.full(self.n)
+        for j, feature in enumerate(FEATURES):
+            columns[feature] = features[:, j]
+        columns['valid'] = self.valid.full(self.n)[:, 0]
+        for i, col in enumerate(SCORE_COLUMNS):
+            columns[col] = scores[:, i]
+        columns['cluster'] = self.labels.full(self.n)[:, 0]
+
+        counts = {}
+        stats = (list(zip(FEATURES, self.feature_stats)) + list(zip(SCORE_COLUMNS, self.score_stats))
+                 + [(f'rank_{name}', ranking) for name, ranking in zip(CLUSTER_NAMES, self.rankings)])
+        for name, sorted_delta in stats:
+            sorted_delta.compact()
+            counts[name] = len(sorted_delta)
+            values = np.full(self.n, np.nan)
+            positions = np.full(self.n, -1, dtype=np.int64)
+            values[:counts[name]], positions[:counts[name]] = sorted_delta.base, sorted_delta.base_positions
+            columns[f'sorted_{name}'], columns[f'sorted_{name}_row'] = values, positions
+
+        table = pa.table(columns).replace_schema_metadata({
+            'base_version': self.base_version,
+            'dataset_version': self.version,
+            'settings': _settings(self.weights, self.percentile),
+            'columns': json.dumps(self.columns),
+            'cutoffs': json.dumps(self.cutoffs.tolist()),
+            'sorted_counts': json.dumps(counts),
+        })
+        write_arrow(table, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='전기차 카탈로그 증분 갱신')
+    parser.add_argument('input', help='추가/수정할 차량 CSV (brand, model 필수)')
+    parser.add_argument('--top-n', type=int, default=5, help='변경 여부를 확인할 추천 순위 수')
+    args = parser.parse_args(argv)
+
+    updater = CatalogUpdater.open()
+    report = updater.upsert(pd.read_csv(args.input), args.top_n)
+    report['dataset_version'] = updater.save()
+    print(json.dumps(report, ensure_ascii=False, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,68 +1,131 @@
-import streamlit as st
+import json
+import threading
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 
-def calculate_scores(data):
-    """각 차량에 대해 3파트별 점수 계산 - 균형잡힌 분포"""
-    
-    # 정규화 함수 (0-1 범위로 변환)
-    def normalize(series):
-        return (series - series.min()) / (series.max() - series.min())
-    
+import perf
+from data_store import (frame_version, next_segment_path, read_arrow, remove_segments, segment_paths, table_metadata,
+                        write_arrow)
+from filtering import bitmap_contains
+from streaming_stats import sorted_percentile
+
+# 클러스터 이름 (배열 순서가 동점 시 우선순위)
+CLUSTER_NAMES = np.array(['speed', 'battery', 'charging'], dtype=object)
+SCORE_COLUMNS = ['speed_score', 'battery_score', 'charging_score']
+
+# 미리 계산해 두는 클러스터 모델 파일 (Arrow IPC, 워커 프로세스들이 메모리 맵으로 공유)
+# 증분 갱신은 바뀐 행만 <CLUSTER_MODEL_PATH>.<번호>.seg 세그먼트로 덧붙임
+CLUSTER_MODEL_PATH = './cluster_model.arrow'
+
+# 필터 안 TOP N 탐색 시 한 번에 확인하는 최소 순위 블록 크기
+TOPK_BLOCK = 64
+
+# 점수 계산에 쓰는 스펙 컬럼
+FEATURES = ['top_speed_kmh', 'acceleration_0_100_s', 'battery_capacity_kWh', 
+            'efficiency_wh_per_km', 'range_km', 'fast_charging_power_kw_dc']
+
+# 낮을수록 좋은 스펙 (역순 정규화)
+INVERTED_FEATURES = ['acceleration_0_100_s', 'efficiency_wh_per_km']
+
+# 점수별 스펙 가중치
+DEFAULT_WEIGHTS = {
     # 1. 속도 점수 (가속성능에 더 큰 가중치)
-    # 제로백이 낮을수록 좋으므로 역순 정규화
-    speed_norm = normalize(data['top_speed_kmh']) * 0.4
-    accel_norm = normalize(data['acceleration_0_100_s'].max() - data['acceleration_0_100_s']) * 0.6
-    speed_score = (speed_norm + accel_norm) * 100
-    
+    'speed_score': {'top_speed_kmh': 0.4, 'acceleration_0_100_s': 0.6},
     # 2. 배터리 성능 점수 (효율성에 더 큰 가중치)
-    battery_norm = normalize(data['battery_capacity_kWh']) * 0.3
-    range_norm = normalize(data['range_km']) * 0.3
-    # 효율성은 낮을수록 좋으므로 역순 정규화
-    efficiency_norm = normalize(data['efficiency_wh_per_km'].max() - data['efficiency_wh_per_km']) * 0.4
-    battery_score = (battery_norm + range_norm + efficiency_norm) * 100
-    
+    'battery_score': {'battery_capacity_kWh': 0.3, 'range_km': 0.3, 'efficiency_wh_per_km': 0.4},
     # 3. 충전 속도 점수 (급속충전에 집중)
-    charging_norm = normalize(data['fast_charging_power_kw_dc']) * 0.9
-    battery_capacity_norm = normalize(data['battery_capacity_kWh']) * 0.1
-    charging_score = (charging_norm + battery_capacity_norm) * 100
-    
-    return speed_score, battery_score, charging_score
+    'charging_score': {'fast_charging_power_kw_dc': 0.9, 'battery_capacity_kWh': 0.1},
+}
+
+def normalize(values, inverted=False, bounds=None):
+    """
+    0-1 범위로 정규화 (inverted이면 낮을수록 1에 가까움)
+    bounds=(최소, 최대)를 주면 values 대신 전체 데이터 기준 범위 사용 (청크 단위 계산용)
+    """
+    values = np.asarray(values, dtype=float)
+    if bounds is not None:
+        low, high = bounds
+        if inverted:
+            return (high - values) / (high - low)
+        return (values - low) / (high - low)
+    if inverted:
+        values = np.nanmax(values) - values
+    return (values - np.nanmin(values)) / (np.nanmax(values) - np.nanmin(values))
+
+def score_arrays(columns, weights=None, bounds=None):
+    """
+    스펙 배열(컬럼명 → ndarray)로 3파트별 점수 배열 계산
+    weights를 주지 않으면 DEFAULT_WEIGHTS 사용
+    bounds(컬럼명 → (최소, 최대))를 주면 그 범위로 정규화
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    normalized = {}
+    scores = {}
+    for score_col in SCORE_COLUMNS:
+        total = 0
+        for feature, weight in weights[score_col].items():
+            if feature not in normalized:
+                normalized[feature] = normalize(columns[feature], feature in INVERTED_FEATURES,
+                                                bounds[feature] if bounds else None)
+            total = total + normalized[feature] * weight
+        scores[score_col] = total * 100
+    return scores
+
+def calculate_scores(data, weights=None):
+    """각 차량에 대해 3파트별 점수 계산 - 균형잡힌 분포"""
+    scores = score_arrays({feature: data[feature].to_numpy() for feature in FEATURES}, weights)
+    return tuple(pd.Series(scores[col], index=data.index) for col in SCORE_COLUMNS)
 
-def assign_clusters(data):
-    """임계값 기반 클러스터 분류"""
+def compute_cutoffs(data, percentile=70):
+    """클러스터별 점수 임계값 계산 (기본 상위 30%)"""
+    scores = np.column_stack([np.asarray(data[col], dtype=float) for col in SCORE_COLUMNS])
+    return np.percentile(scores, percentile, axis=0)
+
+def assign_clusters(data, cutoffs=None):
+    """임계값 기반 클러스터 분류 (NumPy 벡터 연산)"""
+    
+    # (n, 3) 점수 행렬 - 열 순서가 동점일 때의 우선순위 (speed > battery > charging)
+    scores = np.column_stack([np.asarray(data[col], dtype=float) for col in SCORE_COLUMNS])
+    if len(scores) == 0:
+        return np.array([], dtype=object)
     
     # 임계값 설정 (상위 30%)
-    speed_cutoff = np.percentile(data['speed_score'], 70)
-    battery_cutoff = np.percentile(data['battery_score'], 70) 
-    charging_cutoff = np.percentile(data['charging_score'], 70)
+    if cutoffs is None:
+        cutoffs = compute_cutoffs(data)
     
-    clusters = []
-    for _, row in data.iterrows():
-        # 임계값 이상인 점수들만 후보로 선정
-        candidates = []
-        if row['speed_score'] >= speed_cutoff:
-            candidates.append(('speed', row['speed_score']))
-        if row['battery_score'] >= battery_cutoff:
-            candidates.append(('battery', row['battery_score']))
-        if row['charging_score'] >= charging_cutoff:
-            candidates.append(('charging', row['charging_score']))
-        
-        if len(candidates) == 0:
-            # 임계값을 넘지 못한 경우 가장 높은 점수의 클러스터로 배정
-            max_score = max(row['speed_score'], row['battery_score'], row['charging_score'])
-            if max_score == row['speed_score']:
-                clusters.append('speed')
-            elif max_score == row['battery_score']:
-                clusters.append('battery')
-            else:
-                clusters.append('charging')
-        else:
-            # 임계값을 넘은 점수 중 가장 높은 것으로 분류
-            candidates.sort(key=lambda x: x[1], reverse=True)
-            clusters.append(candidates[0][0])
+    return CLUSTER_NAMES[cluster_codes(scores, cutoffs)]
+
+def cluster_codes(scores, cutoffs):
+    """(n, 3) 점수 행렬 → 클러스터 번호 (CLUSTER_NAMES 순서)"""
+    
+    # 결측 점수는 어떤 비교에서도 선택되지 않도록 -inf 처리
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    
+    # 임계값 이상인 점수들만 후보로 선정
+    above = scores >= cutoffs
+    candidate_scores = np.where(above, scores, -np.inf)
     
-    return clusters
+    # 후보가 있으면 후보 중 최고점, 없으면 세 점수 중 최고점으로 배정
+    # argmax는 동점일 때 앞쪽 열을 고르므로 기존 정렬 순서와 동일
+    return np.where(above.any(axis=1), candidate_scores.argmax(axis=1), scores.argmax(axis=1))
+
+def score(frame, weights=None, percentile=70, bounds=None, cutoffs=None):
+    """
+    배치 점수 계산 API
+    스펙 컬럼이 있는 데이터프레임을 받아 점수 3개와 클러스터 컬럼을 붙인 새 데이터프레임 반환
+    청크 단위로 계산할 때는 전체 데이터 기준 bounds(정규화 범위)와 cutoffs(임계값)를 넘김
+    """
+    columns = {feature: frame[feature].to_numpy() for feature in FEATURES}
+    result = frame.copy()
+    for col, values in score_arrays(columns, weights, bounds).items():
+        result[col] = values
+    if cutoffs is None and len(result):
+        cutoffs = compute_cutoffs(result, percentile)
+    result['cluster'] = assign_clusters(result, cutoffs) if len(result) else []
+    return result
 
 def get_top_models_by_cluster(data, cluster_name, score_column, top_n=5):
     """클러스터별 상위 모델 선정"""
@@ -97,114 +160,327 @@ def generate_web_comment(cluster_name):
     }
     return comments.get(cluster_name, {})
 
-def prepare_clustering_data(df):
+def prepare_clustering_data(df, weights=None):
     """클러스터링을 위한 데이터 준비"""
-    # 필요한 컬럼 정의
-    features = ['top_speed_kmh', 'acceleration_0_100_s', 'battery_capacity_kWh', 
-                'efficiency_wh_per_km', 'range_km', 'fast_charging_power_kw_dc']
-    
     # 결측치 제거
-    df_clean = df[features + ['brand', 'model']].dropna()
-    X = df_clean[features].copy()
-    
-    # 점수 계산
-    speed_scores, battery_scores, charging_scores = calculate_scores(X)
-    
-    X['speed_score'] = speed_scores
-    X['battery_score'] = battery_scores  
-    X['charging_score'] = charging_scores
-    X['brand'] = df_clean['brand'].values
-    X['model'] = df_clean['model'].values
-    
-    # 클러스터 분류
-    X['cluster'] = assign_clusters(X)
-    
-    return X
-
-def display_cluster_recommendations_streamlit(cluster_data, filtered_df):
-    """Streamlit용 클러스터별 추천 결과 출력"""
-    clusters_info = [
-        ('speed', 'speed_score', '속도'),
-        ('battery', 'battery_score', '배터리'), 
-        ('charging', 'charging_score', '충전')
-    ]
-    
-    st.markdown("## 🤖 AI 추천 시스템")
-    st.markdown("---")
+    df_clean = df[FEATURES + ['brand', 'model']].dropna()
     
-    for cluster_name, score_col, display_name in clusters_info:
-        cluster_info = generate_web_comment(cluster_name)
-        
-        # 전체 클러스터에서 TOP 5 선정
-        top_models = get_top_models_by_cluster(cluster_data, cluster_name, score_col, 5)
-        
-        # 필터링된 데이터와 교집합 (brand, model 기준)
-        if len(filtered_df) > 0:
-            # brand, model을 기준으로 필터링된 데이터와 매칭
-            filtered_top = top_models[
-                top_models.apply(lambda row: 
-                    any((filtered_df['brand'] == row['brand']) & 
-                        (filtered_df['model'] == row['model'])), axis=1)
-            ]
-        else:
-            filtered_top = top_models
-        
-        if len(filtered_top) > 0:
-            with st.expander(f"{cluster_info.get('title', f'{display_name} 클러스터')} - {len(filtered_top)}대 추천", expanded=True):
-                st.markdown(f"**{cluster_info.get('subtitle', '')}**")
-                st.markdown(f"💬 {cluster_info.get('description', '')}")
-                st.markdown(f"🎯 **추천 대상**: {cluster_info.get('target', '')}")
-                
-                st.markdown(f"### 🏆 {display_name} 클러스터 TOP {len(filtered_top)}")
-                
-                for idx, (_, model_row) in enumerate(filtered_top.iterrows(), 1):
-                    if cluster_name == 'speed':
-                        st.markdown(f"""
-                        **{idx}. {model_row['brand']} {model_row['model']}** (속도점수: {model_row['speed_score']:.1f}점)
-                        - 최고속도: {model_row['top_speed_kmh']:.0f}km/h, 제로백: {model_row['acceleration_0_100_s']:.1f}초
-                        """)
-                    elif cluster_name == 'battery':
-                        st.markdown(f"""
-                        **{idx}. {model_row['brand']} {model_row['model']}** (배터리점수: {model_row['battery_score']:.1f}점)
-                        - 배터리: {model_row['battery_capacity_kWh']:.1f}kWh, 주행거리: {model_row['range_km']:.0f}km
-                        - 효율성: {model_row['efficiency_wh_per_km']:.0f}Wh/km
-                        """)
-                    elif cluster_name == 'charging':
-                        st.markdown(f"""
-                        **{idx}. {model_row['brand']} {model_row['model']}** (충전점수: {model_row['charging_score']:.1f}점)
-                        - 급속충전: {model_row['fast_charging_power_kw_dc']:.0f}kW, 배터리: {model_row['battery_capacity_kWh']:.1f}kWh
-                        """)
+    # 점수 계산 및 클러스터 분류
+    return score(df_clean, weights)
+
+def write_model_file(path, version, rows, scores, codes, ranked, cutoffs):
+    """
+    클러스터 모델 파일 기록 (ClusterModel.load가 읽는 형식)
+    rows: 카탈로그 행 번호, scores: (n, 3) 점수, codes: CLUSTER_NAMES 기준 라벨 코드,
+    ranked: 클러스터 이름 → rows 기준 위치 (점수 내림차순)
+    """
+    columns = {'row': rows}
+    for i, col in enumerate(SCORE_COLUMNS):
+        columns[col] = scores[:, i]
+    columns['cluster'] = codes
+    table = pa.table(columns)
+    table = table.append_column('ranked', pa.array(np.concatenate(
+        [ranked[name] for name in CLUSTER_NAMES]).astype(np.int64)))
+    table = table.replace_schema_metadata({
+        'dataset_version': version or '',
+        'cutoffs': json.dumps({name: float(value) for name, value in cutoffs.items()}),
+        'ranked_counts': json.dumps([len(ranked[name]) for name in CLUSTER_NAMES]),
+    })
+    write_arrow(table, path)
+    # 전체 모델을 새로 썼으므로 이전 세그먼트는 필요 없음
+    remove_segments(path)
+
+def write_model_segment(path, previous_version, version, rows, scores, codes, cutoffs):
+    """
+    바뀐 행만 담은 모델 세그먼트 기록 (ClusterModel.load가 모델 파일에 이어서 적용)
+    rows: 카탈로그 행 번호, codes가 -1인 행은 모델에서 빠짐 (스펙 결측)
+    """
+    columns = {'row': np.asarray(rows, dtype=np.int64)}
+    for i, col in enumerate(SCORE_COLUMNS):
+        columns[col] = scores[:, i]
+    columns['cluster'] = np.asarray(codes, dtype=np.int8)
+    table = pa.table(columns).replace_schema_metadata({
+        'previous_version': previous_version,
+        'dataset_version': version,
+        'cutoffs': json.dumps({name: float(value) for name, value in cutoffs.items()}),
+    })
+    write_arrow(table, next_segment_path(path))
+
+def model_chain(path=CLUSTER_MODEL_PATH):
+    """
+    모델 파일과 그 버전에 차례로 이어지는 세그먼트 목록 (파일이 없으면 (None, []))
+    이어지지 않는 세그먼트(합친 뒤 아직 지우지 못한 것 등)는 건너뜀
+    """
+    table = read_arrow(path)
+    if table is None:
+        return None, []
+    current = table_metadata(table, 'dataset_version')
+    segments = []
+    for segment_path in segment_paths(path):
+        segment = read_arrow(segment_path)
+        if segment is None or table_metadata(segment, 'previous_version') != current:
+            continue
+        segments.append(segment)
+        current = table_metadata(segment, 'dataset_version')
+    return table, segments
+
+def read_model_file(path, version):
+    """
+    모델 파일 + version까지 이어지는 세그먼트를 읽어 (rows, scores, codes, ranked, cutoffs) 반환
+    세그먼트를 적용했으면 ranked는 None (순위는 다시 정렬), version에 닿지 못하면 None
+    """
+    table, segments = model_chain(path)
+    if table is None:
+        return None
+    versions = [table_metadata(part, 'dataset_version') for part in [table] + segments]
+    if version not in versions:
+        return None
+    segments = segments[:versions.index(version)]
+    metadata = table.schema.metadata
+    rows = table['row'].to_numpy()
+    scores = np.column_stack([table[col].to_numpy() for col in SCORE_COLUMNS])
+    codes = table['cluster'].to_numpy()
+    cutoffs = json.loads(metadata[b'cutoffs'])
+    if not segments:
+        counts = json.loads(metadata[b'ranked_counts'])
+        ranked = dict(zip(CLUSTER_NAMES, np.split(table['ranked'].to_numpy(), np.cumsum(counts)[:-1])))
+        return rows, scores, codes, ranked, cutoffs
+
+    # 카탈로그 행 번호 기준 배열에 세그먼트를 차례로 덮어씀
+    size = max([rows.max(initial=-1)] + [segment['row'].to_numpy().max(initial=-1) for segment in segments]) + 1
+    all_scores = np.full((size, len(SCORE_COLUMNS)), np.nan)
+    all_codes = np.full(size, -1, dtype=np.int8)
+    all_scores[rows], all_codes[rows] = scores, codes
+    for segment in segments:
+        changed = segment['row'].to_numpy()
+        all_scores[changed] = np.column_stack([segment[col].to_numpy() for col in SCORE_COLUMNS])
+        all_codes[changed] = segment['cluster'].to_numpy()
+    rows = np.flatnonzero(all_codes >= 0)
+    cutoffs = json.loads(table_metadata(segments[-1], 'cutoffs'))
+    return rows, all_scores[rows], all_codes[rows], None, cutoffs
+
+class ClusterModel:
+    """
+    데이터셋 버전별로 한 번만 만드는 클러스터 모델
+    점수, 임계값, 클러스터 라벨, 클러스터별 점수 내림차순 인덱스를 보관
+    """
+    def __init__(self, data, version=None, cutoffs=None, ranked=None, key_index=None):
+        self.version = version
+        self.data = data
+        if cutoffs is None:
+            cutoffs = dict(zip(CLUSTER_NAMES, compute_cutoffs(data))) if len(data) else {}
+        self.cutoffs = cutoffs
+        # (brand, model) 키 → 행 위치 해시 인덱스 (같은 행 구성이면 다른 모델의 인덱스 재사용)
+        if key_index is None:
+            key_index = pd.MultiIndex.from_arrays([data['brand'], data['model']])
+        self.key_index = key_index
+        if ranked is None:
+            ranked = {}
+            labels = data['cluster'].to_numpy()
+            for cluster_name, score_col in zip(CLUSTER_NAMES, SCORE_COLUMNS):
+                positions = np.flatnonzero(labels == cluster_name)
+                # nlargest와 같은 순서 (동점이면 원래 순서 유지)
+                order = np.argsort(-data[score_col].to_numpy()[positions], kind='stable')
+                ranked[cluster_name] = positions[order]
+        self.ranked = ranked
+        # 행 위치 → 카탈로그 행 번호 (필터 비트맵 조회용)
+        self.rows = data.index.to_numpy(dtype=np.int64)
+
+    def save(self, path=CLUSTER_MODEL_PATH):
+        """
+        점수, 라벨, 클러스터별 순위를 Arrow 파일로 저장
+        스펙/브랜드/모델 컬럼은 카탈로그에 있으므로 행 번호만 기록
+        """
+        write_model_file(
+            path, self.version, self.data.index.to_numpy(dtype=np.int64),
+            np.column_stack([self.data[col].to_numpy(dtype=float) for col in SCORE_COLUMNS]),
+            pd.Categorical(self.data['cluster'], categories=CLUSTER_NAMES).codes,
+            self.ranked, self.cutoffs,
+        )
+
+    @classmethod
+    def load(cls, df, path=CLUSTER_MODEL_PATH):
+        """
+        저장된 모델(+ 증분 갱신 세그먼트)을 메모리 맵으로 읽어 카탈로그(df)와 연결
+        파일이 없거나 데이터셋 버전까지 이어지지 않으면 None
+        """
+        version = frame_version(df)
+        stored = read_model_file(path, version)
+        if stored is None:
+            return None
+        rows, scores, codes, ranked, cutoffs = stored
+        # 결측치로 빠진 행이 없으면 카탈로그 컬럼을 복사 없이 그대로 사용
+        full = len(rows) == len(df) and (rows == np.arange(len(df))).all()
+        base = df if full else df.iloc[rows]
+        columns = {col: base[col] for col in FEATURES + ['brand', 'model']}
+        for i, col in enumerate(SCORE_COLUMNS):
+            columns[col] = pd.Series(scores[:, i], index=base.index)
+        columns['cluster'] = pd.Series(CLUSTER_NAMES[codes], index=base.index)
+        data = pd.DataFrame(columns, copy=False)
+        return cls(data, version, cutoffs, ranked)
+
+    def filter_mask(self, filtered_df):
+        """필터링된 데이터에 포함된 차량 여부 (brand, model 해시 조인)"""
+        keys = pd.MultiIndex.from_arrays([filtered_df['brand'], filtered_df['model']])
+        positions = self.key_index.get_indexer_for(keys)
+        mask = np.zeros(len(self.data), dtype=bool)
+        mask[positions[positions >= 0]] = True
+        return mask
+
+    def top_positions(self, cluster_name, top_n, mask):
+        """
+        필터 비트맵(카탈로그 행 기준) 안에서 클러스터 상위 top_n개의 위치
+        점수 내림차순 배열을 앞에서부터 블록 단위로 훑으며 비트맵을 확인하고 top_n개를 찾으면 멈춤
+        (비용은 카탈로그 크기가 아니라 top_n / 필터 선택 비율에 비례)
+        """
+        ranked = self.ranked.get(cluster_name, np.array([], dtype=int))
+        found, count = [], 0
+        start, step = 0, max(TOPK_BLOCK, top_n * 2)
+        while start < len(ranked) and count < top_n:
+            block = ranked[start:start + step]
+            block = block[bitmap_contains(mask, self.rows[block])]
+            found.append(block)
+            count += len(block)
+            # 선택 비율이 낮으면 블록을 키워 반복 횟수를 줄임
+            start, step = start + step, step * 2
+        return np.concatenate(found)[:top_n] if found else ranked[:0]
+
+    def top_models(self, cluster_name, top_n=5, filtered_df=None, mask=None):
+        """
+        클러스터별 상위 모델 (필터가 있으면 필터 안에서의 상위 모델)
+        mask(FilterIndex 비트맵)를 주면 조기 종료 탐색, filtered_df만 주면 (brand, model) 조인
+        """
+        if mask is not None:
+            ranked = self.top_positions(cluster_name, top_n, mask)
         else:
-            with st.expander(f"{cluster_info.get('title', f'{display_name} 클러스터')} - 조건에 맞는 차량 없음"):
-                st.warning(f"현재 필터 조건에서는 {display_name} 클러스터에 해당하는 차량이 없습니다.")
+            ranked = self.ranked.get(cluster_name, np.array([], dtype=int))
+            if filtered_df is not None:
+                ranked = ranked[self.filter_mask(filtered_df)[ranked]]
+        if len(ranked) == 0:
+            return pd.DataFrame()
+        return self.data.iloc[ranked[:top_n]]
+
+_model_cache = {}
+_model_lock = threading.Lock()
+
+def build_cluster_model(df, version=None):
+    """클러스터 모델 생성 (필터와 무관한 계산을 한 번에 수행)"""
+    return ClusterModel(prepare_clustering_data(df), version)
+
+def get_cluster_model(df):
+    """데이터셋 버전 기준으로 메모이즈된 클러스터 모델 반환"""
+    version = frame_version(df)
+    with _model_lock:
+        model = _model_cache.get(version)
+        perf.count('cluster_model', hit=model is not None)
+        if model is None:
+            # 미리 저장된 모델 파일이 있으면 읽고, 없으면 계산
+            model = ClusterModel.load(df) or build_cluster_model(df, version)
+            # 데이터셋이 바뀌면 이전 버전 모델은 버림
+            _model_cache.clear()
+            _model_cache[version] = model
+    return model
+
+# 가중치별 점수/정렬 순서 캐시 크기 (슬라이더를 앞뒤로 움직일 때 재사용)
+SCORER_CACHE_SIZE = 8
+
+def normalize_weights(weights):
+    """점수별 가중치 합을 1로 맞춤 (점수 범위 0~100 유지, 합이 0이면 기본 가중치)"""
+    result = {}
+    for score_col in SCORE_COLUMNS:
+        total = sum(weights.get(score_col, {}).values())
+        result[score_col] = ({feature: weight / total for feature, weight in weights[score_col].items()}
+                             if total > 0 else dict(DEFAULT_WEIGHTS[score_col]))
+    return result
 
-# 사용 예시 함수
-def add_clustering_to_streamlit_app(df, filtered_df):
+class WeightScorer:
     """
-    기존 Streamlit 앱에 클러스터링 추천 기능을 추가하는 함수
-    
-    Parameters:
-    df: 전체 데이터프레임
-    filtered_df: 필터링된 데이터프레임
-    
-    사용법:
-    from clustering_recommendation import add_clustering_to_streamlit_app
-    add_clustering_to_streamlit_app(df, filtered_df)
+    가중치/임계값 조정(what-if)용 점수 계산기
+    정규화된 스펙 행렬을 한 번 만들어 두고, 가중치가 바뀌면 행렬 곱 한 번으로 전체 점수를 다시 계산
+    가중치별 점수 정렬 순서를 캐시해 두어 임계값만 바뀌면 정렬 없이 재분류
     """
-    # 클러스터링 데이터 준비
-    cluster_data = prepare_clustering_data(df)
-    
-    # AI 추천 시스템 표시
-    display_cluster_recommendations_streamlit(cluster_data, filtered_df)
+    def __init__(self, base_model):
+        self.base = base_model
+        data = base_model.data
+        # (n, 스펙 수) 정규화 행렬
+        self.normalized = np.column_stack([
+            normalize(data[feature].to_numpy(), feature in INVERTED_FEATURES) for feature in FEATURES
+        ]) if len(data) else np.empty((0, len(FEATURES)))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def weight_matrix(weights):
+        """가중치 dict → (스펙 수, 점수 수) 행렬"""
+        matrix = np.zeros((len(FEATURES), len(SCORE_COLUMNS)))
+        for j, score_col in enumerate(SCORE_COLUMNS):
+            for feature, weight in weights[score_col].items():
+                matrix[FEATURES.index(feature), j] = weight
+        return matrix
+
+    def _scored(self, weights):
+        """가중치별 (점수 행렬, 점수별 내림차순 순서, 점수별 오름차순 정렬 값)"""
+        matrix = self.weight_matrix(weights)
+        key = matrix.tobytes()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                return entry
+        scores = self.normalized @ matrix * 100
+        # 동점이면 원래 순서 유지 (ClusterModel 순위와 같은 규칙)
+        orders = np.argsort(-scores, axis=0, kind='stable')
+        sorted_scores = np.take_along_axis(scores, orders[::-1], axis=0)
+        entry = (scores, orders, sorted_scores)
+        with self._lock:
+            self._cache[key] = entry
+            while len(self._cache) > SCORER_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return entry
+
+    def model(self, weights=None, percentile=70):
+        """
+        조정한 가중치/백분위수로 만든 클러스터 모델
+        기본값이면 기존 모델을 그대로 반환
+        """
+        weights = normalize_weights(weights or DEFAULT_WEIGHTS)
+        if weights == normalize_weights(DEFAULT_WEIGHTS) and percentile == 70:
+            return self.base
+        scores, orders, sorted_scores = self._scored(weights)
+        data = self.base.data
+        if len(data) == 0:
+            return self.base
+        cutoffs = np.array([sorted_percentile(sorted_scores[:, j], percentile) for j in range(len(SCORE_COLUMNS))])
+        codes = cluster_codes(scores, cutoffs)
+        # 점수 내림차순 순서에서 해당 클러스터 행만 남기면 클러스터별 순위
+        ranked = {name: orders[:, j][codes[orders[:, j]] == j] for j, name in enumerate(CLUSTER_NAMES)}
+        columns = {col: data[col] for col in FEATURES + ['brand', 'model']}
+        for j, col in enumerate(SCORE_COLUMNS):
+            columns[col] = pd.Series(scores[:, j], index=data.index)
+        columns['cluster'] = pd.Series(CLUSTER_NAMES[codes], index=data.index)
+        return ClusterModel(pd.DataFrame(columns, copy=False), None, dict(zip(CLUSTER_NAMES, cutoffs)),
+                            ranked, self.base.key_index)
+
+_scorer_cache = {}
+_scorer_lock = threading.Lock()
+
+def get_weight_scorer(df):
+    """데이터셋 버전 기준으로 메모이즈된 what-if 점수 계산기"""
+    version = frame_version(df)
+    with _scorer_lock:
+        scorer = _scorer_cache.get(version)
+        if scorer is None:
+            scorer = WeightScorer(get_cluster_model(df))
+            _scorer_cache.clear()
+            _scorer_cache[version] = scorer
+    return scorer
 
 if __name__ == "__main__":
-    # 테스트용 코드
-    st.title("전기차 클러스터링 추천 시스템 테스트")
+    # 배치 실행 예시: 카탈로그 전체 점수 계산 후 클러스터별 TOP 5 출력
+    from data_store import load_catalog
     
-    # 샘플 데이터 로드 (실제 사용 시에는 실제 데이터 경로로 변경)
-    try:
-        df = pd.read_csv('./dropped_df_processed.csv')
-        cluster_data = prepare_clustering_data(df)
-        display_cluster_recommendations_streamlit(cluster_data, df)
-    except FileNotFoundError:
-        st.error("데이터 파일을 찾을 수 없습니다. 파일 경로를 확인해주세요.")
+    cluster_model = get_cluster_model(load_catalog())
+    for cluster_name in CLUSTER_NAMES:
+        top = cluster_model.top_models(cluster_name, 5)
+        print(f"[{cluster_name}]")
+        print(top[['brand', 'model'] + SCORE_COLUMNS].to_string(index=False))
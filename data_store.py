@@ -0,0 +1,372 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+# 앱이 읽어들이는 원본 데이터 파일
+MAIN_CSV = './dropped_df_processed_encoded.csv'
+HOVER_CSV = './hover_df_processed_encoded_ver2.csv'
+IMAGE_CSV = './이미지주소.csv'
+SOURCE_FILES = [MAIN_CSV, HOVER_CSV, IMAGE_CSV]
+
+# 원본 CSV를 합쳐 만든 컬럼형 카탈로그 (Arrow IPC, 메모리 맵으로 읽음)
+CATALOG_PATH = './ev_catalog.arrow'
+# 카탈로그 생성 방식 버전 (load_sources/build_catalog의 결과가 바뀌면 올려서 기존 카탈로그를 재빌드)
+#   1: CSV 3개 단순 합치기
+#   2: 키 기준 이미지 조인, 조인 검증 결과(load_report) 메타데이터
+CATALOG_FORMAT_VERSION = 2
+# 카탈로그 이후 추가/수정된 차량 (catalog_update.py가 기록, 원본 CSV가 바뀌면 무시됨)
+# 갱신마다 바뀐 차량만 <DELTA_PATH>.<번호>.seg 세그먼트로 덧붙이고, 가끔 이 파일 하나로 합침
+DELTA_PATH = './ev_catalog.delta.arrow'
+
+# 차량 식별 키
+KEY_COLUMNS = ['brand', 'model']
+# 로드 보고서에 남길 문제 행 예시 개수
+REPORT_EXAMPLES = 20
+
+# 반복 값이 많은 문자열 컬럼은 범주형(dictionary)으로 저장
+CATEGORICAL_COLUMNS = ['brand', 'drivetrain', 'car_body_type', 'car_size', 'fast_charge_port', 'battery_type']
+
+
+def dataset_version(paths=SOURCE_FILES) -> str:
+    '''
+    원본 CSV 내용 + 카탈로그 생성 방식 버전 기반 해시 (데이터셋 버전 키)
+    파일 내용이나 CATALOG_FORMAT_VERSION이 바뀌면 버전이 바뀌어 카탈로그와 캐시된 모델이 재생성됨
+    '''
+    digest = hashlib.sha256(f'catalog-format-{CATALOG_FORMAT_VERSION}'.encode())
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def frame_version(df: pd.DataFrame) -> str:
+    '''
+    데이터프레임의 데이터셋 버전 반환
+    load_catalog에서 붙인 버전이 없으면 내용 해시로 대체
+    '''
+    version = df.attrs.get('dataset_version')
+    if version:
+        return version
+    row_hash = pd.util.hash_pandas_object(df, index=True).values
+    return hashlib.sha256(row_hash.tobytes()).hexdigest()[:16]
+
+
+def _fill_text(df: pd.DataFrame) -> pd.DataFrame:
+    '''문자열 컬럼의 결측치만 빈 문자열로 채움 (숫자 컬럼 dtype 유지)'''
+    text_columns = df.select_dtypes(include='object').columns
+    df[text_columns] = df[text_columns].fillna('')
+    return df
+
+
+def _categorize(df: pd.DataFrame) -> pd.DataFrame:
+    '''반복 값이 많은 문자열 컬럼을 범주형으로 변환'''
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def image_brands(urls: pd.Series, brands) -> pd.Series:
+    '''
+    이미지 URL 경로(/img/auto/<Brand>_<Model>/)의 첫 토큰으로 브랜드 추정
+    대소문자를 무시하고 비교하며, 토큰이 없거나 여러 브랜드에 해당하면 결측
+    '''
+    by_token = {}
+    for brand in brands:
+        by_token.setdefault(re.split(r'[ _-]', str(brand))[0].lower(), []).append(brand)
+    unique = {token: names[0] for token, names in by_token.items() if len(names) == 1}
+    tokens = urls.str.extract(r'/img/auto/([^/_-]+)', expand=False).str.lower()
+    return tokens.map(unique)
+
+
+def _lookup(index: pd.Index, values) -> np.ndarray:
+    '''values의 index 내 위치 (해시 조회, 없거나 index에서 중복된 값이면 -1)'''
+    unique = ~index.duplicated(keep=False)
+    found = index[unique].get_indexer(values)
+    return np.where(found >= 0, np.flatnonzero(unique)[np.maximum(found, 0)], -1)
+
+
+def join_images(df: pd.DataFrame, image_df: pd.DataFrame, report: dict) -> pd.Series:
+    '''
+    이미지 행을 메인 행에 다대일로 연결해 메인 행 순서의 image_url 반환
+    1. (URL에서 추정한 브랜드, model) 키로 해시 조인
+    2. 브랜드를 추정하지 못한 행은 메인 데이터에서 유일한 model일 때만 model로 연결
+    한 메인 행에 이미지가 여러 개 연결되면 첫 번째만 사용
+    '''
+    keys = pd.MultiIndex.from_frame(df[KEY_COLUMNS].astype(object))
+    image_keys = pd.MultiIndex.from_arrays([image_brands(image_df['image_url'], df['brand'].unique()).astype(object),
+                                           image_df['model'].astype(object)])
+    positions = _lookup(keys, image_keys)
+    by_key = positions >= 0
+    positions = np.where(by_key, positions, _lookup(pd.Index(df['model']), image_df['model']))
+
+    matched = positions >= 0
+    duplicated = matched & pd.Series(positions).duplicated(keep='first').to_numpy()
+    urls = pd.Series(np.nan, index=df.index, dtype=object)
+    keep = matched & ~duplicated
+    urls.iloc[positions[keep]] = image_df['image_url'].to_numpy()[keep]
+
+    report['image_rows'] = len(image_df)
+    report['image_matched_by_key'] = int((keep & by_key).sum())
+    report['image_matched_by_model'] = int((keep & ~by_key).sum())
+    report['image_unmatched'] = int((~matched).sum())
+    report['image_duplicates'] = int(duplicated.sum())
+    report['image_examples'] = image_df.loc[~matched | duplicated, 'model'].head(REPORT_EXAMPLES).tolist()
+    report['rows_without_image'] = int(urls.isna().sum())
+    return urls
+
+
+def load_sources(main_csv=MAIN_CSV, hover_csv=HOVER_CSV, image_csv=IMAGE_CSV, report=None) -> pd.DataFrame:
+    '''
+    원본 CSV 3개를 읽어 하나의 데이터프레임으로 합침
+    결과 행 수는 항상 메인 CSV 행 수와 같음 (조인으로 행이 늘거나 줄지 않음)
+    report(dict)를 주면 조인 검증 결과를 기록
+    '''
+    report = {} if report is None else report
+    df = pd.read_csv(main_csv)
+    report['main_rows'] = len(df)
+    duplicate_keys = df.duplicated(KEY_COLUMNS, keep=False)
+    report['duplicate_keys'] = int(duplicate_keys.sum())
+    report['duplicate_key_examples'] = df.loc[duplicate_keys, KEY_COLUMNS].head(REPORT_EXAMPLES).values.tolist()
+
+    # hover 파일에는 키가 없어 행 순서로 맞춤 - 행 수와 중복 컬럼(seats)으로 정렬 상태 검증
+    hover_df = pd.read_csv(hover_csv)
+    report['hover_rows'] = len(hover_df)
+    if len(hover_df) != len(df):
+        raise ValueError(f'{hover_csv} 행 수({len(hover_df)})가 {main_csv} 행 수({len(df)})와 다름')
+    if 'seats' in hover_df.columns:
+        mismatch = hover_df['seats'].to_numpy() != df['seats'].to_numpy()
+        if mismatch.any():
+            raise ValueError(f'{hover_csv}와 {main_csv}의 seats가 {mismatch.sum()}개 행에서 다름 (행 순서 불일치)')
+        hover_df = hover_df.drop(columns='seats')
+    df = df.join(hover_df.set_axis(df.index))
+
+    image_df = pd.read_csv(image_csv)
+    df['image_url'] = join_images(df, image_df, report)
+    df = _fill_text(df)
+    return _categorize(df)
+
+
+def build_catalog(path=CATALOG_PATH, sources=SOURCE_FILES) -> str:
+    '''
+    원본 CSV를 타입이 지정된 Arrow 파일 하나로 컴파일
+    스키마 메타데이터에 데이터셋 버전과 조인 검증 결과를 기록하고 버전을 반환
+    '''
+    version = dataset_version(sources)
+    report = {}
+    df = load_sources(*sources, report=report)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'dataset_version'] = version.encode()
+    metadata[b'load_report'] = json.dumps(report, ensure_ascii=False).encode()
+    table = table.replace_schema_metadata(metadata)
+    # 압축하지 않아야 메모리 맵으로 복사 없이 읽을 수 있음
+    # 다른 프로세스가 기존 파일을 메모리 맵으로 읽고 있을 수 있으므로 제자리에서 덮어쓰지 않고
+    # 프로세스별 임시 파일에 쓴 뒤 교체 (동시에 재빌드해도 서로의 임시 파일을 건드리지 않음)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with ipc.new_file(tmp_path, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    return version
+
+
+def open_catalog(path=CATALOG_PATH) -> pa.Table:
+    '''Arrow 카탈로그를 메모리 맵으로 열기'''
+    source = pa.memory_map(path, 'r')
+    return ipc.open_file(source).read_all()
+
+
+def dedupe_keys(frame: pd.DataFrame) -> pd.DataFrame:
+    '''
+    같은 (brand, model) 키가 여러 번 나오면 마지막 값만 남김
+    순서는 키가 처음 나온 순서를 유지 (새 차량의 행 위치가 입력 순서대로 정해지도록)
+    '''
+    codes, _ = pd.factorize(pd.MultiIndex.from_frame(frame[KEY_COLUMNS].astype(object)))
+    last = ~pd.Series(codes).duplicated(keep='last').to_numpy()
+    return frame[last].iloc[np.argsort(codes[last], kind='stable')]
+
+
+def apply_delta(df: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    '''
+    (brand, model) 키 기준 upsert
+    이미 있는 차량은 같은 위치에서 값을 바꾸고, 새 차량은 delta 순서대로 뒤에 붙임
+    '''
+    as_text = {col: object for col in CATEGORICAL_COLUMNS if col in df.columns}
+    result = df.astype(as_text)
+    delta = dedupe_keys(delta).reindex(columns=df.columns).astype(as_text)
+    keys = pd.MultiIndex.from_frame(result[KEY_COLUMNS])
+    positions = keys.get_indexer(pd.MultiIndex.from_frame(delta[KEY_COLUMNS]))
+    existing = positions >= 0
+    for i, col in enumerate(result.columns):
+        result.iloc[positions[existing], i] = delta[col].to_numpy()[existing]
+    result = pd.concat([result, delta[~existing]], ignore_index=True)
+    return _categorize(_fill_text(result))
+
+
+def combined_version(base_version: str, delta: pd.DataFrame) -> str:
+    '''기본 카탈로그 버전 + 델타 내용 기반 버전'''
+    digest = hashlib.sha256(base_version.encode())
+    digest.update(pd.util.hash_pandas_object(delta.astype(str), index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def write_arrow(table: pa.Table, path: str):
+    '''
+    Arrow 파일 저장 (압축 없이, 메모리 맵으로 읽을 수 있는 형식)
+    다른 프로세스가 기존 파일을 읽고 있을 수 있으므로 프로세스별 임시 파일에 쓴 뒤 교체
+    '''
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with ipc.new_file(tmp_path, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_arrow(path: str):
+    '''Arrow 파일을 메모리 맵으로 읽기 (없거나 읽을 수 없으면 None)'''
+    try:
+        return ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+
+
+def segment_paths(path: str) -> list:
+    '''path 파일 뒤에 덧붙인 세그먼트(<path>.<번호>.seg) 목록 (기록 순서)'''
+    return sorted(glob.glob(f'{glob.escape(path)}.*.seg'))
+
+
+def next_segment_path(path: str) -> str:
+    '''path에 덧붙일 다음 세그먼트 경로'''
+    segments = segment_paths(path)
+    number = int(segments[-1].rsplit('.', 2)[1]) + 1 if segments else 1
+    return f'{path}.{number:06d}.seg'
+
+
+def remove_segments(path: str):
+    '''path에 합쳐진 세그먼트 삭제'''
+    for segment in segment_paths(path):
+        try:
+            os.remove(segment)
+        except FileNotFoundError:
+            pass
+
+
+def table_metadata(table: pa.Table, key: str) -> str:
+    '''Arrow 테이블 메타데이터 값 (없으면 빈 문자열)'''
+    return (table.schema.metadata or {}).get(key.encode(), b'').decode()
+
+
+def delta_parts(path=DELTA_PATH):
+    '''
+    델타 파일과 세그먼트를 기록 순서대로 읽어 (기본 카탈로그 버전, [(데이터프레임, 적용 후 버전)]) 반환
+    세그먼트는 앞 부분의 버전에 이어질 때만 포함 (합친 뒤 아직 지우지 못한 세그먼트 등은 건너뜀)
+    '''
+    base_version, version, parts = None, None, []
+    table = read_arrow(path)
+    if table is not None:
+        base_version, version = table_metadata(table, 'base_version'), table_metadata(table, 'dataset_version')
+        parts.append((table.to_pandas(), version))
+    for segment in segment_paths(path):
+        table = read_arrow(segment)
+        if table is None:
+            continue
+        segment_base, previous = table_metadata(table, 'base_version'), table_metadata(table, 'previous_version')
+        if version is None:
+            # 델타 파일 없이 기본 카탈로그에서 바로 이어지는 세그먼트
+            if previous != segment_base:
+                continue
+            base_version = segment_base
+        elif segment_base != base_version or previous != version:
+            continue
+        version = table_metadata(table, 'dataset_version')
+        parts.append((table.to_pandas(), version))
+    return base_version, parts
+
+
+def read_delta(path=DELTA_PATH):
+    '''
+    저장된 델타 전체 (데이터프레임, 기본 카탈로그 버전, 델타 적용 후 버전)
+    없으면 (None, None, None)
+    '''
+    base_version, parts = delta_parts(path)
+    if not parts:
+        return None, None, None
+    frames = [frame for frame, _ in parts]
+    delta = frames[0] if len(frames) == 1 else dedupe_keys(pd.concat(frames, ignore_index=True))
+    return delta, base_version, parts[-1][1]
+
+
+def write_delta(delta: pd.DataFrame, base_version: str, path=DELTA_PATH, version=None) -> str:
+    '''
+    델타 전체를 파일 하나로 저장하고 합쳐진 세그먼트 삭제, 델타 적용 후의 데이터셋 버전 반환
+    version을 주지 않으면 기본 카탈로그 버전 + 델타 내용으로 계산
+    '''
+    version = version or combined_version(base_version, delta)
+    table = pa.Table.from_pandas(delta, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           b'base_version': base_version.encode(),
+                                           b'dataset_version': version.encode()})
+    write_arrow(table, path)
+    remove_segments(path)
+    return version
+
+
+def write_delta_segment(rows: pd.DataFrame, base_version: str, previous_version: str, path=DELTA_PATH) -> str:
+    '''
+    이번에 추가/수정한 차량만 세그먼트로 덧붙임 (델타 전체를 다시 쓰지 않음)
+    previous_version(직전 데이터셋 버전)에 이어지는 새 버전 반환
+    '''
+    version = combined_version(previous_version, rows)
+    table = pa.Table.from_pandas(rows, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           b'base_version': base_version.encode(),
+                                           b'previous_version': previous_version.encode(),
+                                           b'dataset_version': version.encode()})
+    write_arrow(table, next_segment_path(path))
+    return version
+
+
+def load_catalog(path=CATALOG_PATH, sources=SOURCE_FILES, delta_path=DELTA_PATH) -> pd.DataFrame:
+    '''
+    메모리 맵 카탈로그를 데이터프레임으로 반환
+    카탈로그가 없거나 원본 CSV가 바뀌었으면 다시 빌드
+    같은 카탈로그 버전의 델타가 있으면 적용
+    '''
+    version = dataset_version(sources)
+    try:
+        table = open_catalog(path)
+        stale = (table.schema.metadata or {}).get(b'dataset_version') != version.encode()
+    except (FileNotFoundError, pa.ArrowInvalid):
+        stale = True
+    if stale:
+        build_catalog(path, sources)
+        table = open_catalog(path)
+    # split_blocks: 숫자 컬럼을 합치지 않고 메모리 맵 버퍼를 그대로 사용
+    df = table.to_pandas(split_blocks=True)
+    delta, base_version, delta_version = read_delta(delta_path) if delta_path else (None, None, None)
+    if delta is not None and base_version == version:
+        df = apply_delta(df, delta)
+        version = delta_version
+    df.attrs['dataset_version'] = version
+    return df
+
+
+def load_report(path=CATALOG_PATH) -> dict:
+    '''카탈로그를 빌드할 때 기록한 조인 검증 결과'''
+    metadata = open_catalog(path).schema.metadata or {}
+    return json.loads(metadata.get(b'load_report', b'{}'))
+
+
+if __name__ == '__main__':
+    # 사용법: python data_store.py [출력 경로]
+    out = sys.argv[1] if len(sys.argv) > 1 else CATALOG_PATH
+    print(f'{out} 빌드 완료 (버전 {build_catalog(out)})')
+    print(json.dumps(load_report(out), ensure_ascii=False, indent=2))
@@ -0,0 +1,266 @@
+'''
+Plotly 그림 생성 (Streamlit 비의존)
+행 수에 따라 SVG → WebGL → 밀도 보존 다운샘플링 순으로 렌더 모드를 바꿔
+브라우저로 보내는 그림 크기를 일정 수준 이하로 유지
+'''
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+import perf
+from data_store import frame_version
+
+# 이 행 수를 넘으면 WebGL(scattergl)로 렌더링
+WEBGL_THRESHOLD = 5_000
+# 이 행 수를 넘으면 밀도 보존 다운샘플링 후 렌더링
+DOWNSAMPLE_THRESHOLD = 50_000
+# 다운샘플링 후 남길 최대 점 수와 밀도 계산용 격자 크기
+MAX_POINTS = 20_000
+GRID_SIZE = 100
+
+# 그림 캐시 메모리 상한 (추정 JSON 크기 기준)과 최대 항목 수
+FIGURE_CACHE_MAX_BYTES = 64 * 2**20
+FIGURE_CACHE_MAX_ENTRIES = 256
+# 그림 크기 추정용: 레이아웃, trace당, 데이터 값 하나당 JSON 바이트 (실측 기반 근사)
+FIGURE_BASE_BYTES = 2_000
+FIGURE_TRACE_BYTES = 700
+FIGURE_VALUE_BYTES = 8
+# trace에서 데이터 배열이 들어 있는 속성
+TRACE_ARRAYS = ('x', 'y', 'customdata', 'text', 'hovertext')
+# 히스토그램 구간 경계 캐시 최대 항목 수 (데이터셋 버전 × 컬럼 × 구간 수)
+EDGES_CACHE_SIZE = 128
+
+
+def _grid_bins(values, grid_size):
+    '''축 값을 0 ~ grid_size-1 격자 번호로 변환 (숫자가 아니면 범주 코드 사용)'''
+    if not pd.api.types.is_numeric_dtype(values):
+        codes, _ = pd.factorize(values)
+        return np.clip(codes, 0, None) % grid_size
+    values = np.asarray(values, dtype=float)
+    low, high = np.nanmin(values), np.nanmax(values)
+    if not high > low:
+        return np.zeros(len(values), dtype=np.int64)
+    bins = ((values - low) / (high - low) * grid_size).astype(np.int64, copy=False)
+    return np.clip(bins, 0, grid_size - 1)
+
+
+def density_downsample(df: pd.DataFrame, x: str, y: str, max_points=MAX_POINTS, grid_size=GRID_SIZE, seed=0) -> pd.DataFrame:
+    '''
+    x/y 격자 칸마다 점 개수에 비례해 표본 추출 (밀도 분포 유지)
+    점이 적은 칸도 최소 1개는 남겨 이상치가 사라지지 않도록 함
+    (결과 점 수 ≤ max_points + 점이 있는 칸 수)
+    '''
+    n_rows = len(df)
+    if n_rows <= max_points:
+        return df
+    cells = _grid_bins(df[x], grid_size) * grid_size + _grid_bins(df[y], grid_size)
+    rng = np.random.default_rng(seed)
+    # 칸 번호 → 무작위 순서로 정렬해 칸 안에서의 순위 계산
+    order = np.lexsort((rng.random(n_rows), cells))
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    counts = np.diff(np.r_[starts, n_rows])
+    rank = np.arange(n_rows) - np.repeat(starts, counts)
+    quota = np.maximum(1, np.round(counts * (max_points / n_rows))).astype(np.int64)
+    keep = order[rank < np.repeat(quota, counts)]
+    return df.iloc[np.sort(keep)]
+
+
+def scatter_figure(df: pd.DataFrame, x: str, y: str, color='brand', hover_data=None,
+                   webgl_threshold=WEBGL_THRESHOLD, downsample_threshold=DOWNSAMPLE_THRESHOLD,
+                   max_points=MAX_POINTS):
+    '''
+    행 수에 맞는 렌더 모드로 산점도 생성
+    (그림, 렌더 정보 dict) 반환 - 렌더 정보에는 모드, 전체/표시 점 수가 들어 있음
+    '''
+    n_rows = len(df)
+    mode = 'svg'
+    if n_rows > webgl_threshold:
+        mode = 'webgl'
+    if n_rows > downsample_threshold:
+        # hover 데이터도 표시되는 점에 대해서만 포함됨
+        df = density_downsample(df, x, y, max_points)
+        mode = 'webgl+downsample'
+    fig = px.scatter(
+        df,
+        x=x,
+        y=y,
+        color=color,
+        hover_data=hover_data,
+        render_mode='svg' if mode == 'svg' else 'webgl',
+    )
+    fig.update_traces(
+        marker=dict(size=11 if mode == 'svg' else 6)  # 점이 많으면 크기를 줄임
+    )
+    return fig, {'mode': mode, 'rows': n_rows, 'points': len(df)}
+
+
+_edges_cache = OrderedDict()
+_edges_lock = threading.Lock()
+
+
+def bin_edges(df: pd.DataFrame, column: str, nbins=6):
+    '''
+    축 컬럼의 히스토그램 구간 경계 (데이터셋 버전별로 한 번 계산)
+    브랜드/필터가 바뀌어도 구간이 같도록 전체 카탈로그를 넘겨야 함
+    숫자가 아닌 컬럼이면 None
+    '''
+    if not pd.api.types.is_numeric_dtype(df[column]):
+        return None
+    # iloc으로 고른 부분 집합도 데이터셋 버전을 그대로 물려받으므로 행 수까지 키에 포함
+    key = (frame_version(df), len(df), column, nbins)
+    with _edges_lock:
+        edges = _edges_cache.get(key)
+        if edges is not None:
+            _edges_cache.move_to_end(key)
+    if edges is None:
+        values = df[column].to_numpy(dtype=float)
+        edges = np.histogram_bin_edges(values[~np.isnan(values)], bins=nbins)
+        with _edges_lock:
+            _edges_cache[key] = edges
+            # 이전 데이터셋 버전의 경계가 쌓이지 않도록 오래 쓰지 않은 항목부터 제거
+            while len(_edges_cache) > EDGES_CACHE_SIZE:
+                _edges_cache.popitem(last=False)
+    return edges
+
+
+def binned_counts(df: pd.DataFrame, column: str, edges=None) -> pd.DataFrame:
+    '''
+    브랜드 × 구간별 차량 수 집계 (행 수와 무관하게 브랜드 수 × 구간 수 크기)
+    edges가 None이면 범주형 컬럼으로 보고 값별로 집계
+    '''
+    brand_codes, brands = pd.factorize(df['brand'])
+    if edges is None:
+        bin_codes, bins = pd.factorize(df[column])
+        n_bins = len(bins)
+    else:
+        values = df[column].to_numpy(dtype=float)
+        # np.histogram과 같이 마지막 구간은 오른쪽 끝을 포함
+        bin_codes = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+        bin_codes[np.isnan(values) | (values < edges[0]) | (values > edges[-1])] = -1
+        n_bins = len(edges) - 1
+    valid = (brand_codes >= 0) & (bin_codes >= 0)
+    counts = np.bincount(
+        brand_codes[valid] * n_bins + bin_codes[valid], minlength=len(brands) * n_bins
+    ).reshape(len(brands), n_bins)
+
+    if edges is None:
+        centers, ranges = list(bins), [str(b) for b in bins]
+    else:
+        centers = (edges[:-1] + edges[1:]) / 2
+        ranges = [f'{low:g} ~ {high:g}' for low, high in zip(edges[:-1], edges[1:])]
+    brand_index = np.repeat(np.arange(len(brands)), n_bins)
+    bin_index = np.tile(np.arange(n_bins), len(brands))
+    agg = pd.DataFrame({
+        'brand': np.asarray(brands, dtype=object)[brand_index],
+        column: np.asarray(centers, dtype=object)[bin_index] if edges is None else centers[bin_index],
+        'range': np.asarray(ranges, dtype=object)[bin_index],
+        'count': counts.ravel(),
+    })
+    return agg[agg['count'] > 0]
+
+
+def brand_histogram(df: pd.DataFrame, column: str, label: str, nbins=6, edges=None):
+    '''
+    브랜드별 분포 히스토그램
+    서버에서 구간별로 집계한 개수만 그림에 담음 (원본 행은 보내지 않음)
+    edges를 주지 않으면 df 자체의 값 범위로 구간을 나눔
+    '''
+    if edges is None:
+        edges = bin_edges(df, column, nbins)
+    agg = binned_counts(df, column, edges)
+    fig = px.bar(
+        agg,
+        x=column,
+        y='count',
+        color='brand',
+        hover_data=['range'],
+        title=f'Brand Distribution by {label}',
+        labels={
+            column: label,
+            'count': '차량 수',
+            'brand': '브랜드',
+            'range': '구간'
+        },
+    )
+    if edges is not None:
+        # 막대 폭을 구간 폭에 맞추고 간격 없이 쌓아 히스토그램처럼 표시
+        fig.update_traces(width=float(np.diff(edges)[0]))
+        fig.update_xaxes(tickvals=edges, ticktext=[f'{edge:g}' for edge in edges])
+    fig.update_layout(
+        barmode='relative',
+        bargap=0,
+        xaxis_tickangle=-45,
+        height=500
+    )
+    fig.update_traces(
+        marker_line_width=1,
+        marker_line_color='white'
+    )
+    return fig
+
+
+def view_key(dataset_version: str, filter_zip: list, brands) -> tuple:
+    '''
+    그림 캐시 키용 화면 상태 정규화
+    선택 순서와 빈 필터는 결과에 영향이 없으므로 정렬하고 제외
+    '''
+    filters = tuple(sorted((col, tuple(sorted(values))) for col, values in filter_zip if values))
+    return (dataset_version, filters, tuple(sorted(brands)))
+
+
+def _figure_bytes(value) -> int:
+    '''
+    캐시 항목 크기 추정 (JSON 직렬화 없이 trace 수와 데이터 값 개수로 계산)
+    캐시에는 go.Figure를 두므로 st.plotly_chart가 리런마다 그림을 직렬화하는 비용은 그대로 남음
+    (캐시로 아끼는 것은 그림 생성 비용이고, 크기 추정 때문에 직렬화가 한 번 더 일어나지 않도록 함)
+    '''
+    fig = value[0] if isinstance(value, tuple) else value
+    n_values = sum(
+        np.size(array) for trace in fig.data for name in TRACE_ARRAYS
+        if (array := getattr(trace, name, None)) is not None
+    )
+    return FIGURE_BASE_BYTES + FIGURE_TRACE_BYTES * len(fig.data) + FIGURE_VALUE_BYTES * n_values
+
+
+class FigureCache:
+    '''
+    프로세스 전체에서 공유하는 LRU 그림 캐시
+    같은 화면 상태(필터, 브랜드, 축)면 Plotly 그림 생성을 건너뜀
+    '''
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES, max_entries=FIGURE_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        '''캐시에 있으면 반환, 없으면 builder()로 만들어 저장'''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        perf.count('figure_cache', hit=entry is not None)
+        if entry is not None:
+            return entry[0]
+
+        value = builder()
+        size = _figure_bytes(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self.total_bytes += size
+            # 메모리 상한 또는 항목 수를 넘으면 가장 오래 쓰지 않은 그림부터 제거
+            while self._entries and (self.total_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+        return value
+
+
+figure_cache = FigureCache()
@@ -0,0 +1,93 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import perf
+from data_store import frame_version
+
+# 사이드 필터로 쓰는 범주형 컬럼
+FILTER_COLUMNS = ['car_size', 'drivetrain', 'car_body_type']
+
+# 비트맵 인덱스를 만드는 컬럼 (사이드 필터 + 브랜드 선택)
+INDEXED_COLUMNS = FILTER_COLUMNS + ['brand']
+
+
+def return_filtered_df(df: pd.DataFrame, filter_zip: list) -> pd.DataFrame:
+    '''
+    (컬럼, 선택값 목록) 쌍으로 데이터 필터링
+    선택값이 비어 있는 컬럼은 필터하지 않음
+    '''
+    for col, selected_values in filter_zip:
+        if selected_values:
+            df = df[df[col].isin(selected_values)]
+    return df
+
+
+class FilterIndex:
+    '''
+    범주형 컬럼의 값별 비트맵 인덱스 (np.packbits로 8행을 1바이트에 저장)
+    같은 컬럼 안의 선택값은 OR, 컬럼 사이는 AND로 합쳐 한 번에 행을 선택
+    '''
+    def __init__(self, df: pd.DataFrame, columns=INDEXED_COLUMNS):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        for col in columns:
+            codes, uniques = pd.factorize(df[col])
+            self.bitmaps[col] = {
+                value: np.packbits(codes == code) for code, value in enumerate(uniques)
+            }
+        self._all = np.packbits(np.ones(self.n_rows, dtype=bool))
+        self._none = np.zeros_like(self._all)
+
+    def mask(self, filter_zip: list) -> np.ndarray:
+        '''
+        return_filtered_df와 같은 조건의 비트맵 반환
+        선택값이 비어 있는 컬럼은 필터하지 않음
+        '''
+        result = self._all
+        for col, selected_values in filter_zip:
+            if not selected_values:
+                continue
+            result = result & self.values_mask(col, selected_values)
+        return result
+
+    def values_mask(self, col: str, values) -> np.ndarray:
+        '''한 컬럼에서 values 중 하나와 일치하는 행의 비트맵 (values가 비면 빈 비트맵)'''
+        bitmaps = self.bitmaps[col]
+        column_mask = self._none
+        for value in values:
+            column_mask = column_mask | bitmaps.get(value, self._none)
+        return column_mask
+
+    def positions(self, mask: np.ndarray) -> np.ndarray:
+        '''비트맵에서 선택된 행 위치'''
+        return np.flatnonzero(np.unpackbits(mask, count=self.n_rows))
+
+    def take(self, df: pd.DataFrame, mask: np.ndarray) -> pd.DataFrame:
+        '''비트맵으로 선택된 행만 한 번에 추출'''
+        return df.iloc[self.positions(mask)]
+
+
+def bitmap_contains(mask: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    '''비트맵에서 rows 위치 행의 선택 여부 (펼치지 않고 해당 바이트의 비트만 확인)'''
+    # np.packbits는 바이트 안에서 앞 행이 상위 비트
+    return ((mask[rows >> 3] >> (7 - (rows & 7))) & 1).astype(bool)
+
+
+_index_cache = {}
+_index_lock = threading.Lock()
+
+
+def get_filter_index(df: pd.DataFrame) -> FilterIndex:
+    '''데이터셋 버전 기준으로 메모이즈된 필터 인덱스 반환'''
+    version = frame_version(df)
+    with _index_lock:
+        index = _index_cache.get(version)
+        perf.count('filter_index', hit=index is not None)
+        if index is None:
+            index = FilterIndex(df)
+            # 데이터셋이 바뀌면 이전 버전 인덱스는 버림
+            _index_cache.clear()
+            _index_cache[version] = index
+    return index
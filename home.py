@@ -1,131 +1,18 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 import numpy as np
 from streamlit_carousel import carousel
-
-# 클러스터링 관련 함수들
-def calculate_scores(data):
-    """각 차량에 대해 3파트별 점수 계산 - 균형잡힌 분포"""
-    
-    # 정규화 함수 (0-1 범위로 변환)
-    def normalize(series):
-        return (series - series.min()) / (series.max() - series.min())
-    
-    # 1. 속도 점수 (가속성능에 더 큰 가중치)
-    # 제로백이 낮을수록 좋으므로 역순 정규화
-    speed_norm = normalize(data['top_speed_kmh']) * 0.4
-    accel_norm = normalize(data['acceleration_0_100_s'].max() - data['acceleration_0_100_s']) * 0.6
-    speed_score = (speed_norm + accel_norm) * 100
-    
-    # 2. 배터리 성능 점수 (효율성에 더 큰 가중치)
-    battery_norm = normalize(data['battery_capacity_kWh']) * 0.3
-    range_norm = normalize(data['range_km']) * 0.3
-    # 효율성은 낮을수록 좋으므로 역순 정규화
-    efficiency_norm = normalize(data['efficiency_wh_per_km'].max() - data['efficiency_wh_per_km']) * 0.4
-    battery_score = (battery_norm + range_norm + efficiency_norm) * 100
-    
-    # 3. 충전 속도 점수 (급속충전에 집중)
-    charging_norm = normalize(data['fast_charging_power_kw_dc']) * 0.9
-    battery_capacity_norm = normalize(data['battery_capacity_kWh']) * 0.1
-    charging_score = (charging_norm + battery_capacity_norm) * 100
-    
-    return speed_score, battery_score, charging_score
-
-def assign_clusters(data):
-    """임계값 기반 클러스터 분류"""
-    
-    # 임계값 설정 (상위 30%)
-    speed_cutoff = np.percentile(data['speed_score'], 70)
-    battery_cutoff = np.percentile(data['battery_score'], 70) 
-    charging_cutoff = np.percentile(data['charging_score'], 70)
-    
-    clusters = []
-    for _, row in data.iterrows():
-        # 임계값 이상인 점수들만 후보로 선정
-        candidates = []
-        if row['speed_score'] >= speed_cutoff:
-            candidates.append(('speed', row['speed_score']))
-        if row['battery_score'] >= battery_cutoff:
-            candidates.append(('battery', row['battery_score']))
-        if row['charging_score'] >= charging_cutoff:
-            candidates.append(('charging', row['charging_score']))
-        
-        if len(candidates) == 0:
-            # 임계값을 넘지 못한 경우 가장 높은 점수의 클러스터로 배정
-            max_score = max(row['speed_score'], row['battery_score'], row['charging_score'])
-            if max_score == row['speed_score']:
-                clusters.append('speed')
-            elif max_score == row['battery_score']:
-                clusters.append('battery')
-            else:
-                clusters.append('charging')
-        else:
-            # 임계값을 넘은 점수 중 가장 높은 것으로 분류
-            candidates.sort(key=lambda x: x[1], reverse=True)
-            clusters.append(candidates[0][0])
-    
-    return clusters
-
-def get_top_models_by_cluster(data, cluster_name, score_column, top_n=5):
-    """클러스터별 상위 모델 선정"""
-    cluster_data = data[data['cluster'] == cluster_name]
-    if len(cluster_data) == 0:
-        return pd.DataFrame()
-    
-    top_indices = cluster_data[score_column].nlargest(min(top_n, len(cluster_data))).index
-    return data.loc[top_indices]
-
-def generate_web_comment(cluster_name):
-    """웹페이지용 코멘트 생성"""
-    comments = {
-        'speed': {
-            'title': '🏎️ 스피드 매니아를 위한 전기차',
-            'subtitle': '짜릿한 가속과 최고속도를 자랑하는 퍼포먼스 전기차',
-            'description': '드라이빙의 재미와 스포티한 성능을 중시하는 당신을 위해 선별된 전기차들입니다. 강력한 모터와 뛰어난 가속력으로 도로 위의 스릴을 만끽하세요.',
-            'target': '스포츠카 애호가, 퍼포먼스 중시 운전자'
-        },
-        'battery': {
-            'title': '🔋 장거리 여행의 최적 파트너',
-            'subtitle': '효율성과 주행거리가 뛰어난 실용성 전기차',
-            'description': '한 번의 충전으로 더 멀리, 더 경제적으로 이동하고 싶은 당신을 위한 전기차들입니다. 넉넉한 배터리 용량과 뛰어난 에너지 효율로 여행의 자유를 선사합니다.',
-            'target': '장거리 통근자, 여행 애호가, 경제성 중시 운전자'
-        },
-        'charging': {
-            'title': '⚡ 빠른 충전의 혁신',
-            'subtitle': '급속충전으로 시간을 절약하는 편의성 전기차',
-            'description': '바쁜 일상 속에서도 빠른 충전으로 시간을 절약하고 싶은 당신을 위한 전기차들입니다. 최신 급속충전 기술로 짧은 시간에 충분한 에너지를 공급받으세요.',
-            'target': '바쁜 직장인, 시간 효율성 중시 운전자'
-        }
-    }
-    return comments.get(cluster_name, {})
-
-def prepare_clustering_data(df):
-    """클러스터링을 위한 데이터 준비"""
-    # 필요한 컬럼 정의
-    features = ['top_speed_kmh', 'acceleration_0_100_s', 'battery_capacity_kWh', 
-                'efficiency_wh_per_km', 'range_km', 'fast_charging_power_kw_dc']
-    
-    # 결측치 제거
-    df_clean = df[features + ['brand', 'model']].dropna()
-    X = df_clean[features].copy()
-    
-    # 점수 계산
-    speed_scores, battery_scores, charging_scores = calculate_scores(X)
-    
-    X['speed_score'] = speed_scores
-    X['battery_score'] = battery_scores  
-    X['charging_score'] = charging_scores
-    X['brand'] = df_clean['brand'].values
-    X['model'] = df_clean['model'].values
-    
-    # 클러스터 분류
-    X['cluster'] = assign_clusters(X)
-    
-    return X
-
-def display_cluster_recommendations_streamlit(cluster_data, filtered_df):
-    """Streamlit용 클러스터별 추천 결과 출력"""
+from clustering_recommendation import DEFAULT_WEIGHTS, generate_web_comment, get_weight_scorer
+from filtering import FILTER_COLUMNS, get_filter_index
+from figures import bin_edges, brand_histogram, figure_cache, scatter_figure, view_key
+from data_store import frame_version
+from image_cache import get_image_cache
+from relationships import describe_correlation, get_relationship_stats, relationship_tip
+from similarity import get_similarity_engine, similar_options
+import perf
+
+# 클러스터링 추천 결과 출력 (점수 계산과 분류는 clustering_recommendation 엔진에서 수행)
+def display_cluster_recommendations_streamlit(cluster_model, filtered_df, filter_mask=None):
+    """Streamlit용 클러스터별 추천 결과 출력 (filter_mask: 필터 비트맵)"""
     clusters_info = [
         ('speed', 'speed_score', '속도'),
         ('battery', 'battery_score', '배터리'), 
@@ -138,19 +25,12 @@ def display_cluster_recommendations_streamlit(cluster_data, filtered_df):
     for cluster_name, score_col, display_name in clusters_info:
         cluster_info = generate_web_comment(cluster_name)
         
-        # 전체 클러스터에서 TOP 5 선정
-        top_models = get_top_models_by_cluster(cluster_data, cluster_name, score_col, 5)
-        
-        # 필터링된 데이터와 교집합 (brand, model 기준)
+        # 필터링된 데이터 안에서 TOP 5 선정 (점수순 배열을 필터 비트맵과 대조, 5대를 찾으면 중단)
+        # 필터 결과가 없으면 전체 클러스터에서 선정
         if len(filtered_df) > 0:
-            # brand, model을 기준으로 필터링된 데이터와 매칭
-            filtered_top = top_models[
-                top_models.apply(lambda row: 
-                    any((filtered_df['brand'] == row['brand']) & 
-                        (filtered_df['model'] == row['model'])), axis=1)
-            ]
+            filtered_top = cluster_model.top_models(cluster_name, 5, filtered_df, filter_mask)
         else:
-            filtered_top = top_models
+            filtered_top = cluster_model.top_models(cluster_name, 5)
         
         if len(filtered_top) > 0:
             with st.expander(f"{cluster_info.get('title', f'{display_name} 클러스터')} - {len(filtered_top)}대 추천", expanded=True):
@@ -181,6 +61,126 @@ def display_cluster_recommendations_streamlit(cluster_data, filtered_df):
             with st.expander(f"{cluster_info.get('title', f'{display_name} 클러스터')} - 조건에 맞는 차량 없음"):
                 st.warning(f"현재 필터 조건에서는 {display_name} 클러스터에 해당하는 차량이 없습니다.")
 
+# 스펙이 비슷한 차량 검색 결과 출력
+def display_similar_vehicles(df, filtered_df, view):
+    """선택한 차량과 스펙 벡터가 가까운 차량 (필터 결과 안의 차량 중에서 선택, view: 필터 화면 상태)"""
+    st.markdown("## 🔎 비슷한 차량 찾기")
+    candidates = filtered_df if len(filtered_df) > 0 else df
+    keys, positions = similar_options(view, candidates)
+    # 선택지는 (brand, model) 키 자체이므로 필터가 바뀌어도 다른 차량을 가리키지 않음
+    # 고른 차량이 새 선택지에도 있으면 그 차량을 기본값으로 유지
+    index = positions.get(st.session_state.get("similar_choice"), 0)
+    col_pick, col_hover = st.columns([3, 1])
+    with col_pick:
+        choice = st.selectbox("기준 차량", keys, index=index, format_func=lambda key: f"{key[0]} {key[1]}",
+                              key="similar_base")
+        st.session_state["similar_choice"] = choice
+    with col_hover:
+        include_hover = st.checkbox("크기/토크 포함", value=False, key="similar_hover")
+    if choice is None:
+        return
+    try:
+        similar = get_similarity_engine(df, include_hover).similar(*choice, k=5)
+    except KeyError:
+        st.warning("스펙 정보가 부족해 비슷한 차량을 찾을 수 없습니다.")
+        return
+    for idx, (_, row) in enumerate(similar.iterrows(), 1):
+        st.markdown(f"""
+        **{idx}. {row['brand']} {row['model']}** (거리: {row['distance']:.3f})
+        - 최고속도: {row['top_speed_kmh']:.0f}km/h, 배터리: {row['battery_capacity_kWh']:.1f}kWh, 주행거리: {row['range_km']:.0f}km
+        """)
+
+# 축 조합의 상관계수 (데이터셋 버전별로 한 번 계산한 행렬에서 조회)
+def correlation_note(df, axis_column, x_axis, y_axis):
+    """Tip 상자에 붙이는 현재 카탈로그 기준 상관계수 설명 (범주형 축이면 빈 문자열)"""
+    stats = get_relationship_stats(df, axis_column).pair(x_axis, y_axis)
+    if stats is None or np.isnan(stats["pearson"]):
+        return ""
+    return (f"📊 현재 카탈로그 상관계수 r = {stats['pearson']:.2f} ({describe_correlation(stats['pearson'])}, "
+            f"순위 상관 {stats['spearman']:.2f}, {stats['n']}대 기준)")
+
+# 추천 기준 조정 (가중치/임계 백분위수) 기본값
+DEFAULT_PERCENTILE = 70
+
+def reset_weight_controls():
+    """추천 기준 슬라이더를 기본값으로 되돌림"""
+    for score_col, weights in DEFAULT_WEIGHTS.items():
+        for feature, weight in weights.items():
+            st.session_state[f"weight_{score_col}_{feature}"] = weight
+    st.session_state["cutoff_percentile"] = DEFAULT_PERCENTILE
+
+def weight_controls(labels):
+    """
+    추천 기준 조정 UI → (가중치 dict, 임계 백분위수)
+    가중치는 점수별로 합이 1이 되도록 엔진에서 다시 맞춤 (모두 0이면 기본 가중치, 경고 표시)
+    """
+    score_names = {'speed_score': '속도 점수', 'battery_score': '배터리 점수', 'charging_score': '충전 점수'}
+    weights = {}
+    with st.expander("⚙️ 추천 기준 조정"):
+        columns = st.columns(len(DEFAULT_WEIGHTS))
+        for column, (score_col, defaults) in zip(columns, DEFAULT_WEIGHTS.items()):
+            with column:
+                st.markdown(f"**{score_names[score_col]}**")
+                weights[score_col] = {
+                    feature: st.slider(labels.get(feature, feature), 0.0, 1.0, default, 0.05,
+                                       key=f"weight_{score_col}_{feature}")
+                    for feature, default in defaults.items()
+                }
+                # 합이 0이면 엔진이 기본 가중치로 되돌리므로 화면에도 알림
+                if sum(weights[score_col].values()) == 0:
+                    st.warning(f"{score_names[score_col]} 가중치가 모두 0이라 기본 가중치로 계산합니다.")
+        percentile = st.slider("클러스터 임계 백분위수 (높을수록 엄격)", 50, 95, DEFAULT_PERCENTILE, 5,
+                               key="cutoff_percentile")
+        st.button("기본값으로", key="weight_reset", on_click=reset_weight_controls)
+    return weights, percentile
+
+# 캐러셀 한 페이지에 담는 차량 수 (다음 페이지는 썸네일만 미리 적재)
+CAROUSEL_PAGE_SIZE = 12
+
+def display_carousel_window(brand_filtered_df, view):
+    """
+    이미지가 있는 차량을 페이지 단위로 나눠 현재 페이지만 캐러셀에 전달
+    선택된 차량 수와 무관하게 한 번에 만드는 항목은 CAROUSEL_PAGE_SIZE개
+    """
+    image_urls = brand_filtered_df["image_url"].to_numpy()
+    positions = np.flatnonzero(image_urls != "")
+    if len(positions) == 0:
+        return
+    
+    # 필터/브랜드 선택이 바뀌면 첫 페이지부터
+    if st.session_state.get("carousel_view") != view:
+        st.session_state["carousel_view"] = view
+        st.session_state["carousel_page"] = 0
+    n_pages = (len(positions) - 1) // CAROUSEL_PAGE_SIZE + 1
+    page = min(st.session_state.get("carousel_page", 0), n_pages - 1)
+    
+    start = page * CAROUSEL_PAGE_SIZE
+    
+    if n_pages > 1:
+        # 버튼 콜백은 다음 리런 전에 실행되므로 페이지 상태가 항상 화면과 일치
+        def shift_page(step):
+            st.session_state["carousel_page"] = page + step
+        
+        col_prev, col_info, col_next = st.columns([1, 3, 1])
+        with col_prev:
+            st.button("◀ 이전", disabled=page == 0, key="carousel_prev", on_click=shift_page, args=(-1,))
+        with col_next:
+            st.button("다음 ▶", disabled=page == n_pages - 1, key="carousel_next", on_click=shift_page, args=(1,))
+        with col_info:
+            st.caption(f"{start + 1}-{min(start + CAROUSEL_PAGE_SIZE, len(positions))} / 총 {len(positions)}대")
+    
+    window = brand_filtered_df.iloc[positions[start:start + CAROUSEL_PAGE_SIZE]]
+    # 썸네일은 로컬 캐시에서 제공 (캐시에 없으면 원본 URL, 백그라운드로 적재)
+    image_store = get_image_cache()
+    items = [
+        dict(title=model, text=brand, img=image_store.proxy_url(image_url))
+        for model, brand, image_url in window[["model", "brand", "image_url"]].values.tolist()
+    ]
+    # 다음 페이지 썸네일은 미리 캐시에 적재
+    for image_url in image_urls[positions[start + CAROUSEL_PAGE_SIZE:start + 2 * CAROUSEL_PAGE_SIZE]]:
+        image_store.proxy_url(image_url)
+    carousel(items=items, key=f"carousel_{page}")
+
 def app(df):
     st.set_page_config(layout="wide")  # 전체 화면 폭 사용
     st.title("🔍 나에게 맞는 전기차 찾기")
@@ -220,7 +220,7 @@ def app(df):
     "battery_type": "배터리 종류"
     }
 
-    filter_column = ['car_size', 'drivetrain', 'car_body_type']
+    filter_column = FILTER_COLUMNS
     car_column = ['brand', 'model']
     hover_column = ["length_mm", "width_mm", "height_mm", "torque_nm", "battery_type", "seats"]
     image1 = ["image_url"]
@@ -236,12 +236,6 @@ def app(df):
             filtered_variable.append((filter_element, selected))
         return filtered_variable
 
-    def return_filtered_df(df: pd.DataFrame, filter_zip: list) -> pd.DataFrame:
-        for col, selected_values in filter_zip:
-            if selected_values:
-                df = df[df[col].isin(selected_values)]
-        return df
-
     def select_checkbox(axis_column):
         axis_options = ["-- 축을 선택하세요 --"] + axis_column
         x = st.selectbox("X축 변수", axis_options, key="x_axis")
@@ -252,111 +246,17 @@ def app(df):
         #     return None, None
         return x, y
     
-    def get_ev_spec_relationship(x_axis: str, y_axis: str) -> str:
-    # 두 변수의 조합을 세트로 정규화하여 순서 무관하게 비교
-        pair = frozenset([x_axis, y_axis])
-
-        # 사전 정의된 관계 설명 매핑
-        descriptions = {
-            frozenset(["top_speed_kmh", "acceleration_0_100_s"]): 
-                "일반적으로 최고 속도가 높은 차량은 고출력 모터를 탑재해 정지 상태에서의 가속 성능도 뛰어납니다. 특히 스포츠 성향의 전기차는 이 두 지표에서 모두 높은 수치를 보입니다. 빠른 출발과 고속 주행이 모두 필요하다면 두 지표를 함께 확인하세요.",
-
-            frozenset(["top_speed_kmh", "range_km"]): 
-                "고속 주행이 가능한 차량은 일반적으로 대형 배터리를 탑재한 경우가 많아 장거리 운행도 가능하지만, 고속 주행 시 전비 저하로 실 주행거리는 줄어들 수 있습니다. 고속 주행 빈도에 따라 이 둘의 균형을 보는 것이 중요합니다.",
-
-            frozenset(["top_speed_kmh", "efficiency_wh_per_km"]): 
-                "고속 주행은 전력 소모가 커서 일반적으로 전비는 낮아지지만, 최신 고성능 EV 중에는 에너지 회생 제동과 고효율 모터 설계를 통해 고속 + 고효율을 동시에 갖춘 모델도 존재합니다.",
-
-            frozenset(["top_speed_kmh", "fast_charging_power_kw_dc"]): 
-                "고성능 차량일수록 대형 배터리를 빠르게 충전하기 위해 높은 출력의 급속 충전 기능을 탑재하는 경우가 많습니다. 주행 성능과 충전 효율을 동시에 고려한 결과입니다.",
-
-            frozenset(["top_speed_kmh", "cargo_volume_l"]): 
-                "최고 속도가 높은 차량은 보통 낮고 슬림한 형태로 적재 공간이 제한적인 경우가 많습니다. 실용성과 퍼포먼스를 동시에 원한다면 중형 SUV 계열의 EV를 추천합니다.",
-
-            frozenset(["top_speed_kmh", "fast_charge_port"]): 
-                "고속 주행 성능을 가진 차량이라도 DC 급속 충전 포트가 없다면 장거리 운행 시 불편함을 겪을 수 있습니다. 차량의 성능과 더불어 충전 인프라 호환성도 함께 확인하세요.",
-
-            frozenset(["efficiency_wh_per_km", "range_km"]): 
-                "높은 효율성을 가진 차량이라도 배터리 용량이 작다면 주행거리는 제한적일 수 있습니다. 전비와 함께 배터리 용량 또는 주행거리를 함께 고려해야 정확한 차량 성능을 이해할 수 있습니다.",
-
-            frozenset(["efficiency_wh_per_km", "acceleration_0_100_s"]): 
-                "일반적으로 빠른 가속을 위해 강한 출력을 사용하는 차량은 더 많은 전기를 소비하게 되어 전비가 낮아집니다. 효율 중심의 주행을 원한다면 가속 스펙은 어느 정도 타협이 필요합니다.",
-
-            frozenset(["efficiency_wh_per_km", "cargo_volume_l"]): 
-                "크고 무거운 차량일수록 에너지 소비가 많아 전비가 낮아질 가능성이 큽니다. 하지만 최신 경량화 기술로 이러한 트렌드를 극복한 EV도 일부 존재합니다.",
-
-            frozenset(["efficiency_wh_per_km", "fast_charging_power_kw_dc"]): 
-                "전비와 충전 속도는 직접적인 상관관계는 없습니다. 다만 프리미엄 전기차의 경우 두 항목 모두 우수한 스펙을 갖추는 경향이 있어 가격 대비 성능 비교가 필요합니다.",
-
-            frozenset(["efficiency_wh_per_km", "fast_charge_port"]): 
-                "에너지 효율이 좋은 차량이라도 구형 모델의 경우 DC 급속 충전이 안 될 수 있습니다. 충전 편의성을 고려한다면 전비뿐만 아니라 포트 지원 여부도 확인해야 합니다.",
-
-            frozenset(["range_km", "acceleration_0_100_s"]): 
-                "퍼포먼스 중심의 차량은 전력 소모가 커서 동일 배터리 용량 대비 주행거리가 짧을 수 있습니다. 고성능과 긴 거리 모두를 원할 경우 대용량 배터리 탑재 여부를 확인하세요.",
-
-            frozenset(["range_km", "cargo_volume_l"]): 
-                "차량 무게가 증가하면 주행거리는 줄어들 수 있습니다. 실사용 조건에서의 테스트 결과나 WLTP 인증거리 외에 소비자 리뷰도 함께 참고하는 것이 좋습니다.",
-
-            frozenset(["range_km", "fast_charging_power_kw_dc"]): 
-                "장거리용 차량은 급속충전 성능도 중요한 요소입니다. 배터리 용량이 크기 때문에 고출력 충전이 없으면 충전 시간이 길어져 실용성이 떨어질 수 있습니다.",
-
-            frozenset(["range_km", "fast_charge_port"]): 
-                "주행거리가 길어도 충전 인프라 호환성이 낮다면 장거리 운행에서 치명적입니다. DC 급속 충전 지원 여부는 꼭 확인해야 할 체크포인트입니다.",
-
-            frozenset(["acceleration_0_100_s", "cargo_volume_l"]): 
-                "적재 공간이 넓은 차량은 일반적으로 무거워서 가속 성능이 떨어지는 경향이 있지만, 전기차는 토크가 즉각 전달되어 무게 대비 빠른 반응성을 보이는 경우도 있습니다.",
-
-            frozenset(["acceleration_0_100_s", "fast_charging_power_kw_dc"]): 
-                "퍼포먼스 EV는 보통 대용량 배터리 탑재로 고속충전을 지원합니다. 다만 엔트리급 모델 중엔 가속력은 빠르지만 충전 속도가 느린 모델도 있으니 사양을 꼭 확인하세요.",
-
-            frozenset(["acceleration_0_100_s", "fast_charge_port"]): 
-                "일부 고성능 차량도 DC 포트를 생략한 경우가 있으며, 이는 여행이나 외부 이동이 잦은 사용자에겐 불편할 수 있습니다.",
-
-            frozenset(["fast_charging_power_kw_dc", "fast_charge_port"]): 
-                "출력이 높아도 차량에 DC 포트가 없다면 해당 속도로 충전할 수 없습니다. 출력과 포트 지원 여부를 함께 확인하세요.",
-
-            frozenset(["fast_charging_power_kw_dc", "cargo_volume_l"]): 
-                "화물이나 다인승 모델은 충전 효율이 중요해 고속 충전 기능을 갖춘 경우가 많습니다. 이는 실사용 효율성과 연결됩니다.",
-
-            frozenset(["fast_charge_port", "cargo_volume_l"]): 
-                "넓은 실내를 가진 전기 밴이나 SUV 중에서도 DC 급속 포트가 없는 모델이 존재합니다. 외부 활동이나 여행 시 꼭 필요한 기능이므로 꼼꼼히 확인해야 합니다.",
-
-            frozenset(["battery_capacity_kWh", "range_km"]): 
-                "일반적으로 배터리 용량이 큰 차량은 더 긴 주행거리를 자랑합니다. 하지만 모터 효율, 공기저항, 차량 무게 등의 요소도 주행거리에 영향을 미치므로, 같은 배터리 용량에서도 주행 가능 거리에 차이가 발생할 수 있습니다.",
-
-            frozenset(["battery_capacity_kWh", "efficiency_wh_per_km"]): 
-                "큰 배터리를 탑재한 차량은 일반적으로 무겁고 고출력인 경우가 많아 전비(Wh/km)는 낮을 수 있습니다. 하지만 고효율 플랫폼을 적용한 일부 고급 전기차는 높은 효율과 큰 배터리를 동시에 갖추고 있어, 효율성은 모델별로 반드시 비교가 필요합니다.",
-
-            frozenset(["battery_capacity_kWh", "acceleration_0_100_s"]): 
-                "배터리 용량이 크면 전압과 출력이 안정적으로 공급되어 가속 성능이 우수할 가능성이 있습니다. 하지만 고성능 구성이 부족한 대용량 저가 차량은 빠른 가속을 보장하지 않을 수 있어, 실제 성능을 확인하는 것이 중요합니다.",
-
-            frozenset(["battery_capacity_kWh", "fast_charging_power_kw_dc"]): 
-                "고용량 배터리를 가진 차량은 일반적으로 더 높은 급속 충전 성능을 갖추는 경향이 있습니다. 다만 충전 속도는 배터리 자체뿐 아니라 배터리 관리 시스템(BMS)의 설계에도 좌우되므로 스펙을 꼼꼼히 살펴야 합니다.",
-
-            frozenset(["battery_capacity_kWh", "fast_charge_port"]): 
-                "배터리 용량이 크더라도 DC 급속 충전 포트를 지원하지 않으면 충전 시간이 상당히 길어집니다. 장거리 주행을 고려한다면 단순한 배터리 크기보다 충전 포트 유무가 더 핵심적인 조건이 될 수 있습니다.",
-
-            frozenset(["battery_capacity_kWh", "cargo_volume_l"]): 
-                "SUV나 밴처럼 실내 공간이 넓은 차량은 종종 대형 배터리도 함께 장착하지만, 소형 차량도 바닥 공간을 활용해 중형급 배터리를 탑재할 수 있습니다. 따라서 적재 공간과 배터리 용량은 차량 유형에 따라 유연하게 설계됩니다.",
-
-            frozenset(["battery_capacity_kWh", "top_speed_kmh"]): 
-                "대용량 배터리는 고속에서도 지속적으로 높은 출력을 공급할 수 있어 최고 속도 성능 향상에 기여합니다. 하지만 최고속도는 차량 설계 철학에 따라 제한될 수 있어, 빠른 속도를 중시한다면 별도 확인이 필요합니다."
-
-        }
-
-        # 결과 반환
-        return descriptions.get(pair, "해당 조합에 대한 정보가 없습니다.")
-
-
-
-
     # 🎛️ 대시보드 구조로 레이아웃 나누기
     col_filter, col_control, col_output = st.columns([1.5, 1.2, 3.3])
 
     with col_filter:
         st.markdown("### 🚗 필터 ①")
-        selected_filters = generate_multiselect_filter(df, filter_column)
-        filtered_df = return_filtered_df(df, selected_filters)
+        with perf.span('filter'):
+            selected_filters = generate_multiselect_filter(df, filter_column)
+            # 로드 시 만든 비트맵 인덱스로 필터를 한 번에 적용
+            filter_index = get_filter_index(df)
+            filter_mask = filter_index.mask(selected_filters)
+            filtered_df = filter_index.take(df, filter_mask)
         # st.write("적용된 필터:")
         # st.dataframe(filtered_df, use_container_width=True, height=300)
         st.markdown("### 📊 축 선택 ②")
@@ -376,24 +276,34 @@ def app(df):
 
     with col_output:
         st.markdown("### 📈 시각화 ③")
-        brand_filtered_df = filtered_df[filtered_df["brand"].isin(selected_brands)]
+        with perf.span('filter.brand'):
+            # 브랜드를 하나도 고르지 않으면 빈 결과
+            brand_mask = filter_mask & filter_index.values_mask("brand", selected_brands)
+            brand_filtered_df = filter_index.take(df, brand_mask)
+            # 그림 캐시 키 (데이터셋 버전 + 정규화된 필터/브랜드 선택)
+            current_view = view_key(frame_version(df), selected_filters, selected_brands)
         if len(filtered_df) > 0 and axis_column and x_axis and y_axis and x_axis != "-- 축을 선택하세요 --" and y_axis != "-- 축을 선택하세요 --":
 
             if len(selected_brands) == 0 or len(brand_filtered_df) == 0:
                 st.warning("선택된 브랜드가 없습니다. 하나 이상 선택해주세요.")
 
             else:
-                fig = px.scatter(
-                    brand_filtered_df,
-                    x=x_axis,
-                    y=y_axis,
-                    color="brand",
-                    hover_data=car_column + hover_column
-                )
-                fig.update_traces(
-                    marker=dict(size=11)  # 모든 점 크기를 10으로 고정
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                with perf.span('chart.scatter'):
+                    # 점이 많으면 WebGL / 밀도 보존 다운샘플링으로 전환
+                    # 같은 화면 상태면 캐시된 그림 재사용
+                    fig, render_info = figure_cache.get_or_build(
+                        ("scatter", current_view, x_axis, y_axis),
+                        lambda: scatter_figure(
+                            brand_filtered_df,
+                            x=x_axis,
+                            y=y_axis,
+                            color="brand",
+                            hover_data=car_column + hover_column
+                        )
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+                    if render_info["points"] < render_info["rows"]:
+                        st.caption(f"전체 {render_info['rows']:,}대 중 밀도 분포를 유지한 {render_info['points']:,}대를 표시합니다.")
                 st.markdown(
                     f"""
                     <div style="
@@ -403,12 +313,13 @@ def app(df):
                         border-radius: 8px;
                         margin-bottom: 20px;
                         ">
-                        <strong>💡 Tip:\n{get_ev_spec_relationship(x_axis, y_axis)}</strong><br>
+                        <strong>💡 Tip:\n{relationship_tip(x_axis, y_axis)}</strong><br>
+                        {correlation_note(df, axis_column, x_axis, y_axis)}
                     </div>
                     """,
                     unsafe_allow_html=True
                 )
-                # st.write(get_ev_spec_relationship("range_km", "acceleration_0_100_s"))
+                # st.write(relationship_tip("range_km", "acceleration_0_100_s"))
 
 
         else:
@@ -417,58 +328,25 @@ def app(df):
     if len(filtered_df) > 0 and axis_column and x_axis and x_axis != "-- 축을 선택하세요 --":
       
         # 4. 시각화
-        fig2 = px.histogram(
-            brand_filtered_df,
-            x=x_axis,
-            color='brand',
-            nbins=6,
-            title=f'Brand Distribution by {eng_to_kor.get(x_axis, x_axis)}',
-            labels={
-                x_axis: f"{eng_to_kor.get(x_axis, x_axis)}",
-                'count': '차량 수',
-                'brand': '브랜드'
-            },
-            # hover_data=brand_filtered_df.columns
-        )
-
-        fig2.update_layout(
-            xaxis_tickangle=-45,
-            height=500
-        )
-        fig2.update_traces(
-            marker_line_width=1,
-            marker_line_color='white'
-        )
-        st.plotly_chart(fig2, use_container_width=True)
+        with perf.span('chart.hist_x'):
+            fig2 = figure_cache.get_or_build(
+                ("histogram", current_view, x_axis),
+                lambda: brand_histogram(brand_filtered_df, x_axis, eng_to_kor.get(x_axis, x_axis),
+                                        edges=bin_edges(df, x_axis))
+            )
+            st.plotly_chart(fig2, use_container_width=True)
 
 
     if len(filtered_df) > 0 and axis_column and y_axis and y_axis != "-- 축을 선택하세요 --":
-        fig3 = px.histogram(
-            brand_filtered_df,
-            x=y_axis,
-            color='brand',
-            nbins=6,
-            title=f'Brand Distribution by {eng_to_kor.get(y_axis, y_axis)}',
-            labels={
-                x_axis: f"{eng_to_kor.get(y_axis, y_axis)}",
-                'count': '차량 수',
-                'brand': '브랜드'
-            },
-            # hover_data=brand_filtered_df.columns
-        )
-
-        fig3.update_layout(
-            xaxis_tickangle=-45,
-            height=500
-        )
-        fig3.update_traces(
-            marker_line_width=1,
-            marker_line_color='white'
-        )
-        st.plotly_chart(fig3, use_container_width=True)
+        with perf.span('chart.hist_y'):
+            fig3 = figure_cache.get_or_build(
+                ("histogram", current_view, y_axis),
+                lambda: brand_histogram(brand_filtered_df, y_axis, eng_to_kor.get(y_axis, y_axis),
+                                        edges=bin_edges(df, y_axis))
+            )
+            st.plotly_chart(fig3, use_container_width=True)
         
     st.markdown("### 📈 차량 이미지 ④")
-    brand_filtered_df = filtered_df[filtered_df["brand"].isin(selected_brands)]
     # if len(filtered_df) > 0 and axis_column and x_axis and y_axis and x_axis != "-- 축을 선택하세요 --" and y_axis != "-- 축을 선택하세요 --":
 
     #     if len(selected_brands) == 0 or len(brand_filtered_df) == 0:
@@ -480,14 +358,21 @@ def app(df):
     #         #     index = st.slider("차량 이미지 넘기기", 0, len(images) - 1, 0)
     #         #     st.image(images[index], use_column_width=True)
 
-    carousel(items=[dict(title=model, text=brand, img=image_url) for model, brand, image_url in brand_filtered_df[['model', 'brand', 'image_url']].values.tolist() if image_url != ''])
+    with perf.span('carousel'):
+        display_carousel_window(brand_filtered_df, current_view)
     
     # AI 추천 시스템 추가 (전체 데이터로 클러스터링, 필터된 데이터로 추천)
-    try:
-        cluster_data = prepare_clustering_data(df)
-        display_cluster_recommendations_streamlit(cluster_data, filtered_df)
-    except Exception as e:
-        st.error(f"추천 시스템 오류: {str(e)}")
+    with perf.span('recommendation'):
+        try:
+            weights, percentile = weight_controls(eng_to_kor)
+            # 정규화된 스펙 행렬은 데이터셋당 한 번만 만들고, 조정할 때마다 행렬 곱으로 재계산
+            cluster_model = get_weight_scorer(df).model(weights, percentile)
+            display_cluster_recommendations_streamlit(cluster_model, filtered_df, filter_mask)
+        except Exception as e:
+            st.error(f"추천 시스템 오류: {str(e)}")
+
+    with perf.span('similar'):
+        display_similar_vehicles(df, filtered_df, view_key(frame_version(df), selected_filters, ()))
 
     with st.sidebar:
         st.markdown("### 🚗 필터링된 차량 목록")
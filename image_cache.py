@@ -0,0 +1,241 @@
+'''
+캐러셀 썸네일 로컬 캐시
+외부 썸네일을 한 번만 받아 캐러셀 크기의 WebP로 다시 인코딩하고,
+내용 해시 이름으로 static/thumbs에 저장해 Streamlit 정적 파일로 제공
+
+사용법:
+    python image_cache.py                      # 카탈로그 전체 썸네일 미리 받기
+    EV_IMAGE_FIXTURES=./fixtures python image_cache.py   # 네트워크 없이 로컬 파일에서 적재
+'''
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+import perf
+
+# 캐시 저장 위치와 브라우저에서 접근하는 경로 (.streamlit/config.toml의 enableStaticServing 필요)
+IMAGE_CACHE_DIR = os.environ.get('EV_IMAGE_CACHE_DIR', './static/thumbs')
+STATIC_URL_PREFIX = os.environ.get('EV_IMAGE_URL_PREFIX', '/app/static/thumbs/')
+# 네트워크 대신 썸네일을 읽을 로컬 디렉터리 (테스트/오프라인용, fixture_name(url) 파일로 찾음)
+FIXTURE_DIR = os.environ.get('EV_IMAGE_FIXTURES')
+
+# 캐시 전체 크기 상한과 캐러셀 표시 크기
+MAX_CACHE_BYTES = 200 * 2**20
+THUMB_SIZE = (640, 400)
+WEBP_QUALITY = 80
+FETCH_TIMEOUT = 5
+
+# 받지 못한 URL의 재시도 대기 시간 (실패할 때마다 두 배, 최대 하루)
+RETRY_BACKOFF = 60
+MAX_RETRY_BACKOFF = 24 * 3600
+
+
+def fixture_name(url: str) -> str:
+    '''
+    fixture 디렉터리에서 url의 원본 이미지 파일명 (URL 전체의 해시)
+    URL 파일명은 서로 다른 차량끼리 겹치는 경우가 많아 키로 쓸 수 없음
+    '''
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+
+class ImageCache:
+    '''
+    URL → 내용 해시 파일명 인덱스를 가진 썸네일 저장소
+    용량 상한을 넘으면 가장 오래 쓰지 않은 파일부터 삭제
+    받지 못한 URL도 인덱스에 기록해 두고 대기 시간이 지나기 전에는 다시 받지 않음
+    '''
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_bytes=MAX_CACHE_BYTES,
+                 fixture_dir=FIXTURE_DIR, url_prefix=STATIC_URL_PREFIX):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.fixture_dir = fixture_dir
+        self.url_prefix = url_prefix
+        self.index_path = os.path.join(directory, 'index.json')
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._executor = None
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            stored = {}
+        if 'thumbs' not in stored:
+            # 실패 기록이 없던 이전 형식 (URL → 파일명)
+            stored = {'thumbs': stored, 'failed': {}}
+        self._index = stored['thumbs']
+        # URL → {'count': 연속 실패 횟수, 'retry_at': 다시 받아도 되는 시각}
+        self._failed = stored['failed']
+
+    def _save_index(self):
+        tmp_path = f'{self.index_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'thumbs': self._index, 'failed': self._failed}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def record_failure(self, url: str):
+        '''받지 못한 URL의 실패 횟수를 늘리고 다음 재시도 시각 기록'''
+        with self._lock:
+            count = self._failed.get(url, {}).get('count', 0) + 1
+            backoff = min(RETRY_BACKOFF * 2 ** (count - 1), MAX_RETRY_BACKOFF)
+            self._failed[url] = {'count': count, 'retry_at': time.time() + backoff}
+            self._save_index()
+
+    def backing_off(self, url: str) -> bool:
+        '''최근에 받지 못해 아직 재시도하지 않을 URL인지'''
+        failure = self._failed.get(url)
+        return failure is not None and time.time() < failure['retry_at']
+
+    def fetch(self, url: str) -> bytes:
+        '''원본 이미지 바이트 (fixture 디렉터리가 있으면 네트워크를 쓰지 않음)'''
+        if self.fixture_dir:
+            with open(os.path.join(self.fixture_dir, fixture_name(url)), 'rb') as f:
+                return f.read()
+        response = requests.get(url, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+
+    @staticmethod
+    def encode(data: bytes) -> bytes:
+        '''캐러셀 크기에 맞춰 줄이고 WebP로 다시 인코딩'''
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            image.thumbnail(THUMB_SIZE)
+            out = io.BytesIO()
+            image.save(out, format='WEBP', quality=WEBP_QUALITY)
+            return out.getvalue()
+
+    def ingest(self, url: str, data: bytes = None) -> str:
+        '''
+        이미지를 받아(또는 주어진 바이트로) 캐시에 저장하고 파일명 반환
+        같은 내용의 이미지는 파일 하나를 공유
+        '''
+        if data is None:
+            data = self.fetch(url)
+        encoded = self.encode(data)
+        name = hashlib.sha256(encoded).hexdigest()[:32] + '.webp'
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._index[url] = name
+            self._failed.pop(url, None)
+            self._evict()
+            self._save_index()
+        return name
+
+    def _evict(self):
+        '''용량 상한을 넘으면 접근 시각이 오래된 파일부터 삭제 (잠금 안에서 호출)'''
+        files = []
+        for name in set(self._index.values()):
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        evicted = set()
+        for _, size, name in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            evicted.add(name)
+            total -= size
+        if evicted:
+            self._index = {url: name for url, name in self._index.items() if name not in evicted}
+
+    def lookup(self, url: str):
+        '''캐시된 썸네일의 제공 경로 (없으면 None), 접근 시각을 갱신해 LRU 순서 유지'''
+        name = self._index.get(url)
+        if name is None:
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return self.url_prefix + name
+
+    def _ingest_background(self, url: str):
+        try:
+            self.ingest(url)
+        except Exception:
+            # 받지 못한 이미지는 원본 URL로 계속 표시하고, 대기 시간 동안은 다시 받지 않음
+            self.record_failure(url)
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def proxy_url(self, url: str) -> str:
+        '''
+        캐러셀에 넘길 이미지 주소
+        캐시에 있으면 로컬 경로, 없으면 백그라운드로 받아 두고 이번에는 원본 URL 사용
+        (최근에 받지 못한 URL은 재시도 시각 전까지 리런마다 다시 요청하지 않음)
+        '''
+        if not url:
+            return url
+        served = self.lookup(url)
+        perf.count('image_cache', hit=served is not None)
+        if served is not None:
+            return served
+        if self.backing_off(url):
+            return url
+        with self._lock:
+            if url not in self._pending:
+                self._pending.add(url)
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='image-cache')
+                self._executor.submit(self._ingest_background, url)
+        return url
+
+    def ingest_all(self, urls, workers=8) -> dict:
+        '''여러 URL을 병렬로 적재하고 {성공, 실패, 재시도 대기} 개수 반환'''
+        urls = [url for url in dict.fromkeys(urls) if url and url not in self._index]
+        waiting = {url for url in urls if self.backing_off(url)}
+        urls = [url for url in urls if url not in waiting]
+        result = {'ingested': 0, 'failed': 0, 'backing_off': len(waiting)}
+
+        def run(url):
+            try:
+                self.ingest(url)
+                return True
+            except Exception:
+                self.record_failure(url)
+                return False
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for ok in executor.map(run, urls):
+                result['ingested' if ok else 'failed'] += 1
+        return result
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> ImageCache:
+    '''프로세스 공용 썸네일 캐시'''
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ImageCache()
+    return _cache
+
+
+if __name__ == '__main__':
+    from data_store import load_catalog
+
+    urls = load_catalog()['image_url'].tolist()
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    print(get_image_cache().ingest_all(urls, workers))
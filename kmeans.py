@@ -0,0 +1,268 @@
+'''
+K-means 클러스터링 (임계값 규칙 assign_clusters와 별도로 동작)
+점수 공간(speed/battery/charging 점수, 0-1)에서 k-means++ 초기화 + Lloyd 반복,
+큰 카탈로그는 미니배치 k-means로 학습하고, 재시작은 프로세스 풀에서 병렬 실행
+학습한 중심점은 Arrow 파일로 저장해 서빙에서는 가장 가까운 중심점 조회만 수행
+(api.py --clusters kmeans로 추천 API의 클러스터 라벨을 k-means 결과로 바꿀 수 있음)
+
+사용법:
+    python kmeans.py --k 3 --restarts 8 --jobs 4 [--minibatch]
+'''
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from clustering_recommendation import CLUSTER_NAMES, SCORE_COLUMNS, ClusterModel, get_cluster_model
+from data_store import frame_version, load_catalog
+from similarity import nearest_center
+
+KMEANS_MODEL_PATH = './kmeans_model.arrow'
+
+# 이 행 수 이상이면 기본으로 미니배치 학습
+MINIBATCH_MIN_ROWS = 100_000
+
+# 학습 설정: 최대 반복 횟수, 중심점 이동 허용치, 미니배치 크기, k-means++ 표본 크기
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-6
+BATCH_SIZE = 4096
+SEEDING_SAMPLE = 100_000
+
+
+def assign(vectors: np.ndarray, centers: np.ndarray):
+    '''행별 (가장 가까운 중심점 번호, 제곱 거리)'''
+    labels = nearest_center(vectors, centers)
+    return labels, ((vectors - centers[labels]) ** 2).sum(axis=1)
+
+
+def kmeans_plus_plus(vectors: np.ndarray, k: int, rng) -> np.ndarray:
+    '''k-means++ 초기 중심점 (이미 고른 중심점과의 거리 제곱에 비례해 다음 중심점 추첨)'''
+    if len(vectors) > SEEDING_SAMPLE:
+        vectors = vectors[rng.choice(len(vectors), SEEDING_SAMPLE, replace=False)]
+    centers = [vectors[rng.integers(len(vectors))]]
+    distances = ((vectors - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = distances.sum()
+        # 모든 점이 중심점과 겹치면 무작위로 선택
+        index = rng.choice(len(vectors), p=distances / total) if total > 0 else rng.integers(len(vectors))
+        centers.append(vectors[index])
+        distances = np.minimum(distances, ((vectors - vectors[index]) ** 2).sum(axis=1))
+    return np.array(centers, dtype=float)
+
+
+def lloyd(vectors: np.ndarray, centers: np.ndarray, max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE):
+    '''전체 데이터 Lloyd 반복 (중심점 이동이 tolerance 이하이면 종료)'''
+    k = len(centers)
+    for _ in range(max_iterations):
+        labels = nearest_center(vectors, centers)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=vectors[:, j], minlength=k)
+                         for j in range(vectors.shape[1])], axis=1)
+        # 빈 클러스터는 이전 중심점 유지
+        moved = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        shift = ((moved - centers) ** 2).sum()
+        centers = moved
+        if shift <= tolerance:
+            break
+    return centers
+
+
+def minibatch(vectors: np.ndarray, centers: np.ndarray, rng, batch_size=BATCH_SIZE,
+              max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE):
+    '''
+    미니배치 k-means (Sculley 2010)
+    배치마다 중심점별 누적 개수에 반비례하는 학습률로 중심점을 이동
+    '''
+    k = len(centers)
+    centers = centers.copy()
+    seen = np.zeros(k)
+    for _ in range(max_iterations):
+        batch = vectors[rng.integers(0, len(vectors), batch_size)]
+        labels = nearest_center(batch, centers)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=batch[:, j], minlength=k)
+                         for j in range(batch.shape[1])], axis=1)
+        seen += counts
+        filled = counts > 0
+        # 배치 평균 쪽으로 counts / seen 만큼 이동 (점 하나씩 갱신한 것과 같은 결과)
+        rate = counts[filled] / seen[filled]
+        moved = centers.copy()
+        moved[filled] += rate[:, None] * (sums[filled] / counts[filled, None] - centers[filled])
+        shift = ((moved - centers) ** 2).sum()
+        centers = moved
+        if shift <= tolerance:
+            break
+    return centers
+
+
+# 재시작 워커 프로세스가 공유하는 학습 데이터 (initializer로 한 번만 전달)
+_vectors = None
+
+
+def _init_worker(vectors):
+    global _vectors
+    _vectors = vectors
+
+
+def _restart(k: int, seed: int, use_minibatch: bool, batch_size: int):
+    '''재시작 한 번: (관성, 중심점)'''
+    rng = np.random.default_rng(seed)
+    centers = kmeans_plus_plus(_vectors, k, rng)
+    if use_minibatch:
+        centers = minibatch(_vectors, centers, rng, batch_size)
+    else:
+        centers = lloyd(_vectors, centers)
+    _, distances = assign(_vectors, centers)
+    return float(distances.sum()), centers
+
+
+def fit(vectors: np.ndarray, k=3, restarts=8, jobs=1, use_minibatch=None, batch_size=BATCH_SIZE, seed=0):
+    '''
+    재시작 중 관성(중심점까지 거리 제곱 합)이 가장 작은 중심점 반환
+    jobs > 1이면 재시작을 프로세스 풀에서 병렬 실행, use_minibatch=None이면 행 수로 결정
+    '''
+    vectors = np.ascontiguousarray(vectors, dtype=float)
+    if use_minibatch is None:
+        use_minibatch = len(vectors) >= MINIBATCH_MIN_ROWS
+    seeds = np.random.SeedSequence(seed).generate_state(restarts)
+    args = [(k, int(restart_seed), use_minibatch, batch_size) for restart_seed in seeds]
+    if jobs <= 1:
+        _init_worker(vectors)
+        results = [_restart(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(vectors,)) as executor:
+            results = list(executor.map(_restart, *zip(*args)))
+    # 관성이 같으면 앞 재시작 우선 (결과가 jobs 수와 무관하게 같도록)
+    inertia, centers = min(results, key=lambda result: result[0])
+    return centers, inertia
+
+
+def agreement(labels: np.ndarray, rule_codes: np.ndarray, k: int):
+    '''
+    k-means 라벨과 규칙 라벨(CLUSTER_NAMES 코드)의 일치율
+    k가 규칙 클러스터 수와 같으면 일치 수가 가장 큰 순열, 아니면 클러스터별 다수결로 대응
+    (일치율, k-means 클러스터 번호 → 규칙 클러스터 이름 목록)
+    '''
+    n_rules = len(CLUSTER_NAMES)
+    contingency = np.bincount(labels * n_rules + rule_codes, minlength=k * n_rules).reshape(k, n_rules)
+    if k == n_rules:
+        mapping = max(itertools.permutations(range(n_rules)),
+                      key=lambda perm: contingency[np.arange(k), perm].sum())
+    else:
+        mapping = contingency.argmax(axis=1)
+    matched = contingency[np.arange(k), mapping].sum()
+    rate = float(matched / len(labels)) if len(labels) else float('nan')
+    return rate, [str(CLUSTER_NAMES[code]) for code in mapping]
+
+
+def score_vectors(cluster_model) -> np.ndarray:
+    '''클러스터 모델의 점수를 0-1 범위 (n, 3) 행렬로'''
+    return np.column_stack([cluster_model.data[col].to_numpy(dtype=float) for col in SCORE_COLUMNS]) / 100
+
+
+class KMeansModel:
+    '''
+    학습된 중심점과 규칙 클러스터 대응표
+    서빙에서는 가장 가까운 중심점 조회(predict)만 수행
+    '''
+    def __init__(self, centers, names, version=None, inertia=None, agreement=None):
+        self.centers = np.asarray(centers, dtype=float)
+        self.names = list(names)
+        self.version = version
+        self.inertia = inertia
+        self.agreement = agreement
+
+    def predict(self, vectors) -> np.ndarray:
+        '''(n, 3) 점수(0-1) → k-means 클러스터 번호'''
+        vectors = np.asarray(vectors, dtype=float).reshape(-1, self.centers.shape[1])
+        return nearest_center(vectors, self.centers)
+
+    def predict_names(self, vectors) -> np.ndarray:
+        '''(n, 3) 점수(0-1) → 대응하는 규칙 클러스터 이름'''
+        return np.array(self.names, dtype=object)[self.predict(vectors)]
+
+    def save(self, path=KMEANS_MODEL_PATH):
+        '''중심점을 Arrow 파일로 저장 (대응표, 관성, 일치율은 메타데이터)'''
+        table = pa.table({col: self.centers[:, j] for j, col in enumerate(SCORE_COLUMNS)})
+        table = table.replace_schema_metadata({
+            'dataset_version': self.version or '',
+            'names': json.dumps(self.names),
+            'inertia': json.dumps(self.inertia),
+            'agreement': json.dumps(self.agreement),
+        })
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with ipc.new_file(tmp_path, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, version=None, path=KMEANS_MODEL_PATH):
+        '''저장된 중심점 읽기 (파일이 없거나 version이 다르면 None)'''
+        try:
+            table = ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        metadata = table.schema.metadata or {}
+        stored = metadata.get(b'dataset_version', b'').decode()
+        if version is not None and stored != version:
+            return None
+        centers = np.column_stack([table[col].to_numpy() for col in SCORE_COLUMNS])
+        return cls(centers, json.loads(metadata[b'names']), stored,
+                   json.loads(metadata[b'inertia']), json.loads(metadata[b'agreement']))
+
+
+def build_kmeans_model(df, k=3, restarts=8, jobs=1, use_minibatch=None, seed=0) -> KMeansModel:
+    '''카탈로그 점수로 k-means 학습 후 규칙 라벨과의 일치율 계산'''
+    cluster_model = get_cluster_model(df)
+    vectors = score_vectors(cluster_model)
+    centers, inertia = fit(vectors, k, restarts, jobs, use_minibatch, seed=seed)
+    labels = nearest_center(vectors, centers)
+    rule_codes = pd.Categorical(cluster_model.data['cluster'], categories=CLUSTER_NAMES).codes
+    rate, names = agreement(labels, rule_codes, k)
+    return KMeansModel(centers, names, frame_version(df), inertia, rate)
+
+
+def kmeans_cluster_model(df, path=KMEANS_MODEL_PATH):
+    '''
+    규칙 라벨 대신 저장된 k-means 중심점으로 라벨(대응하는 규칙 클러스터 이름)을 붙인 ClusterModel
+    점수와 순위 기준은 규칙 모델과 같고 클러스터 소속만 다름
+    중심점 파일이 없거나 데이터셋 버전이 다르면 None
+    '''
+    model = KMeansModel.load(frame_version(df), path)
+    if model is None:
+        return None
+    rule_model = get_cluster_model(df)
+    data = rule_model.data.copy()
+    data['cluster'] = model.predict_names(score_vectors(rule_model))
+    return ClusterModel(data, rule_model.version, rule_model.cutoffs, key_index=rule_model.key_index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='점수 공간 k-means 학습 및 중심점 저장')
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--restarts', type=int, default=8)
+    parser.add_argument('--jobs', type=int, default=1, help='재시작을 나눠 실행할 프로세스 수')
+    parser.add_argument('--minibatch', action='store_true', default=None, help='미니배치 학습 (기본: 행 수로 결정)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=KMEANS_MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    model = build_kmeans_model(load_catalog(), args.k, args.restarts, args.jobs, args.minibatch, args.seed)
+    model.save(args.output)
+    print(json.dumps({
+        'dataset_version': model.version,
+        'inertia': round(model.inertia, 6),
+        'agreement': round(model.agreement, 6),
+        'centers': [{'rule_cluster': name, **{col: round(float(value), 4) for col, value in zip(SCORE_COLUMNS, center)}}
+                    for name, center in zip(model.names, model.centers)],
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+'''
+로컬 부하 테스트
+기본 모드: 워커 수를 늘려 가며 serve.py(라우터 + Streamlit 워커)를 띄우고, 실제 세션 여러 개가 라우터를 거쳐
+웹소켓으로 '찾기' 페이지를 무작위 필터/축/브랜드로 리런하면서 초당 리런 수가 워커 수에 따라 늘어나는지 확인
+(리런마다 화면의 /media 이미지도 브라우저처럼 별도 연결로 받음. 세션을 실행하지 않은 워커로 가면 404가 날 수 있음)
+--url 모드: 이미 떠 있는 라우터에 같은 세션 부하
+--in-process 모드: Streamlit 없이 리런 한 번 분량의 작업(필터 → 추천 → 산점도 직렬화)만 워커 프로세스에서 반복
+
+라우터는 클라이언트 IP로 워커를 고르므로, 로컬 라우터에는 세션마다 다른 루프백 주소(127.0.0.x)에서 접속함
+
+사용법:
+    python load_test.py --workers 1,2,4 --sessions 16 --duration 10
+    python load_test.py --url http://127.0.0.1:8501/ --sessions 16 --duration 10
+    python load_test.py --in-process --workers 1,2,4 --duration 10
+'''
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import resource
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import urljoin, urlparse
+
+import numpy as np
+
+# 부하 테스트에서 쓰는 축 조합
+AXES = [('range_km', 'top_speed_kmh'), ('battery_capacity_kWh', 'efficiency_wh_per_km'),
+        ('acceleration_0_100_s', 'fast_charging_power_kw_dc')]
+
+# 세션이 여는 페이지 (main.py 사이드바 메뉴)
+SESSION_PAGE = '찾기'
+# 필터 multiselect 라벨
+FILTER_LABELS = ('car_size', 'drivetrain', 'car_body_type')
+# 축 selectbox 위젯 키
+AXIS_KEYS = ('x_axis', 'y_axis')
+BRAND_PREFIX = 'brand_'
+
+# 라우터/워커 준비를 기다리는 최대 시간(초)
+STARTUP_TIMEOUT = 60.0
+
+
+def _random_request(rng, options):
+    '''사용자 한 명의 리런에 해당하는 무작위 필터/브랜드/축 선택'''
+    filters = [(col, rng.sample(values, rng.randint(0, min(2, len(values))))) for col, values in options['filters']]
+    brands = rng.sample(options['brands'], rng.randint(1, min(8, len(options['brands']))))
+    return filters, brands, rng.choice(AXES)
+
+
+def _worker(worker_id, duration, start_at, results):
+    '''카탈로그와 클러스터 모델을 메모리 맵으로 읽고 duration초 동안 요청 반복'''
+    from clustering_recommendation import CLUSTER_NAMES, get_cluster_model
+    from data_store import load_catalog
+    from figures import scatter_figure
+    from filtering import FILTER_COLUMNS, get_filter_index
+
+    df = load_catalog()
+    model = get_cluster_model(df)
+    index = get_filter_index(df)
+    options = {
+        'filters': [(col, sorted(df[col].dropna().unique().tolist())) for col in FILTER_COLUMNS],
+        'brands': sorted(df['brand'].dropna().unique().tolist()),
+    }
+    rng = random.Random(worker_id)
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + duration
+    latencies = []
+    while time.time() < deadline:
+        filters, brands, (x, y) = _random_request(rng, options)
+        start = time.perf_counter()
+        mask = index.mask(filters)
+        brand_df = index.take(df, mask & index.values_mask('brand', brands))
+        for name in CLUSTER_NAMES:
+            model.top_models(name, 5, mask=mask)
+        if len(brand_df):
+            fig, _ = scatter_figure(brand_df, x, y, hover_data=['brand', 'model'])
+            fig.to_json()
+        latencies.append(time.perf_counter() - start)
+    results.put({
+        'requests': len(latencies),
+        'latencies': latencies,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def run_in_process(n_workers: int, duration: float) -> dict:
+    '''Streamlit 없이 워커 프로세스 n개로 부하를 주고 합산 결과 반환'''
+    from clustering_recommendation import build_cluster_model
+    from data_store import frame_version, load_catalog
+
+    # 워커들이 계산 없이 읽을 수 있도록 클러스터 모델 파일을 미리 준비
+    df = load_catalog()
+    build_cluster_model(df, frame_version(df)).save()
+
+    results = multiprocessing.Queue()
+    start_at = time.time() + 3.0
+    processes = [multiprocessing.Process(target=_worker, args=(i, duration, start_at, results))
+                 for i in range(n_workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    latencies = np.concatenate([r['latencies'] for r in reports])
+    total = sum(r['requests'] for r in reports)
+    return {
+        'mode': 'in-process',
+        'workers': n_workers,
+        'requests': total,
+        'rps': round(total / duration, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2) if total else None,
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 2) if total else None,
+        'max_rss_mb_per_worker': round(max(r['max_rss_mb'] for r in reports), 1),
+    }
+
+
+def session_address(host: str, i: int):
+    '''i번째 세션의 출발 주소 (로컬 라우터면 세션마다 다른 루프백 주소, 아니면 None)'''
+    if host in ('127.0.0.1', 'localhost'):
+        return f'127.0.{1 + i // 250}.{2 + i % 250}'
+    return None
+
+
+def _widget_key(widget_id: str) -> str:
+    '''위젯 id("$$ID-<해시>-<키>")의 키 부분'''
+    return widget_id.split('-', 2)[2]
+
+
+class Session:
+    '''
+    브라우저 대신 웹소켓으로 리런을 요청하는 Streamlit 세션 한 개
+    리런마다 위젯 상태 전체를 BackMsg로 보내고 script_finished까지 받은 요소를 돌려줌
+    '''
+    def __init__(self, url: str, address=None):
+        self.url = url
+        self.address = address
+        self.connection = None
+        self.menu = None
+        self.filters = []
+        self.axes = {}
+        self.brands = []
+        self.media_requests = 0
+        self.media_errors = 0
+
+    async def connect(self):
+        '''웹소켓 연결 후 메뉴로 페이지를 열고 필터/축/브랜드 위젯 id 수집'''
+        from tornado import httpclient, websocket
+
+        stream_url = 'ws' + urljoin(self.url, '_stcore/stream')[4:]
+        request = httpclient.HTTPRequest(stream_url, network_interface=self.address)
+        self.connection = await websocket.websocket_connect(request, subprotocols=['streamlit'])
+        elements = await self.rerun([])
+        self.menu = next(e.component_instance.id for e in elements if e.WhichOneof('type') == 'component_instance')
+        for element in await self.rerun([(self.menu, 'json_value', json.dumps(SESSION_PAGE))]):
+            kind = element.WhichOneof('type')
+            if kind == 'multiselect' and element.multiselect.label in FILTER_LABELS:
+                self.filters.append((element.multiselect.id, list(element.multiselect.options)))
+            elif kind == 'selectbox' and _widget_key(element.selectbox.id) in AXIS_KEYS:
+                self.axes[_widget_key(element.selectbox.id)] = element.selectbox.id
+            elif kind == 'checkbox' and _widget_key(element.checkbox.id).startswith(BRAND_PREFIX):
+                self.brands.append(element.checkbox.id)
+
+    def random_states(self, rng) -> list:
+        '''사용자 한 명의 리런에 해당하는 무작위 필터/축/브랜드 위젯 상태'''
+        states = [(self.menu, 'json_value', json.dumps(SESSION_PAGE))]
+        for widget_id, options in self.filters:
+            states.append((widget_id, 'string_array_value', rng.sample(options, rng.randint(0, min(2, len(options))))))
+        for key, column in zip(AXIS_KEYS, rng.choice(AXES)):
+            if key in self.axes:
+                states.append((self.axes[key], 'string_value', column))
+        checked = set(rng.sample(self.brands, rng.randint(1, min(8, len(self.brands))))) if self.brands else set()
+        states.extend((widget_id, 'bool_value', widget_id in checked) for widget_id in self.brands)
+        return states
+
+    async def rerun(self, states) -> list:
+        '''위젯 상태 [(id, 필드, 값)]로 리런하고 새로 그려진 요소 목록 반환 (스크립트 오류면 RuntimeError)'''
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        for widget_id, field, value in states:
+            widget = message.rerun_script.widget_states.widgets.add()
+            widget.id = widget_id
+            if field == 'string_array_value':
+                widget.string_array_value.data.extend(value)
+            else:
+                setattr(widget, field, value)
+        await self.connection.write_message(message.SerializeToString(), binary=True)
+        elements = []
+        while True:
+            data = await self.connection.read_message()
+            if data is None:
+                raise ConnectionError('세션 연결 끊김')
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                if element.WhichOneof('type') == 'exception':
+                    raise RuntimeError(element.exception.message)
+                elements.append(element)
+            elif kind == 'script_finished':
+                return elements
+
+    async def fetch_media(self, elements):
+        '''화면의 /media 이미지를 같은 출발 주소로 받음 (실패 수는 media_errors)'''
+        from tornado import httpclient
+
+        client = httpclient.AsyncHTTPClient()
+        for element in elements:
+            if element.WhichOneof('type') != 'imgs':
+                continue
+            for image in element.imgs.imgs:
+                if not image.url.startswith('/media/'):
+                    continue
+                self.media_requests += 1
+                try:
+                    await client.fetch(httpclient.HTTPRequest(urljoin(self.url, image.url),
+                                                              network_interface=self.address))
+                except (httpclient.HTTPClientError, OSError):
+                    self.media_errors += 1
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+async def _session_loop(session: Session, rng, deadline: float, latencies: list, errors: list):
+    '''deadline까지 무작위 위젯 상태로 리런 반복'''
+    while time.time() < deadline:
+        start = time.perf_counter()
+        try:
+            elements = await session.rerun(session.random_states(rng))
+        except RuntimeError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+        await session.fetch_media(elements)
+
+
+async def _run_sessions(url: str, n_sessions: int, duration: float, seed: int) -> dict:
+    host = urlparse(url).hostname
+    sessions = [Session(url, session_address(host, i)) for i in range(n_sessions)]
+    # 연결과 위젯 수집(첫 리런)은 측정에서 제외
+    await asyncio.gather(*(session.connect() for session in sessions))
+    deadline = time.time() + duration
+    latencies, errors = [], []
+    try:
+        await asyncio.gather(*(_session_loop(session, random.Random(seed + i), deadline, latencies, errors)
+                               for i, session in enumerate(sessions)))
+    finally:
+        for session in sessions:
+            session.close()
+    return {
+        'sessions': n_sessions,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / duration, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 2) if latencies else None,
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 2) if latencies else None,
+        'media_requests': sum(session.media_requests for session in sessions),
+        'media_errors': sum(session.media_errors for session in sessions),
+    }
+
+
+def run_sessions(url: str, n_sessions: int, duration: float, seed=0) -> dict:
+    '''라우터 주소 url에 세션 n_sessions개로 duration초 동안 리런 부하'''
+    return {'mode': 'sessions', 'url': url, **asyncio.run(_run_sessions(url, n_sessions, duration, seed))}
+
+
+def wait_ready(ports, timeout=STARTUP_TIMEOUT):
+    '''모든 포트의 Streamlit 헬스 체크가 응답할 때까지 대기'''
+    deadline = time.time() + timeout
+    for port in ports:
+        while True:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+                    response.read()
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError(f'포트 {port}가 {timeout}초 안에 준비되지 않음')
+                time.sleep(0.5)
+
+
+def run_cluster(n_workers: int, n_sessions: int, duration: float, port: int, worker_base_port: int) -> dict:
+    '''serve.py로 라우터 + 워커 n개를 띄우고 세션 부하를 준 뒤 종료'''
+    process = subprocess.Popen([sys.executable, 'serve.py', '--workers', str(n_workers), '--host', '127.0.0.1',
+                                '--port', str(port), '--worker-base-port', str(worker_base_port)])
+    try:
+        wait_ready([worker_base_port + i for i in range(n_workers)] + [port])
+        result = run_sessions(f'http://127.0.0.1:{port}/', n_sessions, duration)
+    finally:
+        # serve.py가 워커를 정리하도록 SIGINT로 종료
+        process.send_signal(signal.SIGINT)
+        process.wait()
+    return {**result, 'workers': n_workers}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='전기차 추천 앱 로컬 부하 테스트')
+    parser.add_argument('--workers', default='1,2,4', help='쉼표로 구분한 워커 수 목록')
+    parser.add_argument('--duration', type=float, default=10.0, help='측정 시간(초)')
+    parser.add_argument('--sessions', type=int, default=16, help='동시 세션 수')
+    parser.add_argument('--url', help='이미 떠 있는 라우터 주소 (주면 워커를 직접 띄우지 않음)')
+    parser.add_argument('--port', type=int, default=8701, help='부하 테스트용 라우터 포트')
+    parser.add_argument('--worker-base-port', type=int, default=8800, help='부하 테스트용 워커 포트 시작 번호')
+    parser.add_argument('--in-process', action='store_true', help='Streamlit 없이 리런 작업만 반복')
+    args = parser.parse_args(argv)
+
+    if args.url:
+        print(json.dumps(run_sessions(args.url, args.sessions, args.duration), ensure_ascii=False))
+        return
+    baseline = None
+    for n_workers in map(int, args.workers.split(',')):
+        if args.in_process:
+            result = run_in_process(n_workers, args.duration)
+        else:
+            result = run_cluster(n_workers, args.sessions, args.duration, args.port, args.worker_base_port)
+        baseline = baseline or result['rps']
+        result['speedup'] = round(result['rps'] / baseline, 2) if baseline else None
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,30 +2,28 @@ import streamlit as st
 import home, about 
 from streamlit_option_menu import option_menu
 import pandas as pd
+import perf
+from data_store import load_catalog
 
-@st.cache_data
+# 파생 데이터프레임이 공유 데이터를 수정하지 않도록 copy-on-write 사용
+pd.set_option('mode.copy_on_write', True)
+
+@st.cache_resource
 def read_data() -> pd.DataFrame:
     '''
-    세션 실행 시 초기 데이터 읽기 1번
+    프로세스 전체에서 한 번만 데이터 읽기
+    원본 CSV를 컴파일한 Arrow 카탈로그를 메모리 맵으로 읽고,
+    모든 세션이 복사본 없이 같은 읽기 전용 데이터프레임을 공유함
+    (세션은 필터 비트맵으로 필요한 행만 골라 씀)
     '''
-    df = pd.read_csv('./dropped_df_processed_encoded.csv')
-    df.fillna('', inplace=True)
-
-    hover_df = pd.read_csv('./hover_df_processed_encoded_ver2.csv')
-    hover_df.fillna('', inplace=True)
-    hover_df = hover_df[hover_df.columns[:-1]]
-    df = df.join(hover_df)
-    image_df = pd.read_csv('./이미지주소.csv')
-    image_df.fillna('', inplace=True)
-    df = pd.merge(df, image_df, how='left', on='model')
-    df.fillna('', inplace=True)
-    return df
+    perf.count('read_data', hit=False)
+    return load_catalog()
     
 
 class MultiApp:
     def __init__(self):
         self.apps = []
-        self.df = read_data()
+        self.df = perf.cached_call('read_data', read_data)
 
     def add_app(self, title, func):
         self.apps.append({"title": title, "function": func})
@@ -62,12 +60,40 @@ class MultiApp:
             )
             
         if app == "찾기":
-            home.app(self.df)
+            with perf.span('home.app'):
+                home.app(self.df)
         # if app == "기타 시각화":
         #     test.app(self.df)
         if app == "정보":
-            about.app(self.df)
+            with perf.span('about.app'):
+                about.app(self.df)
+        return app
+
+
+def show_perf_panel(profile):
+    '''
+    사이드바 디버그 섹션에 이번 리런의 구간 시간과 캐시 hit/miss 표시
+    '''
+    with st.sidebar.expander("⏱️ 성능 측정 (debug)", expanded=False):
+        record = profile.to_record()
+        st.markdown(f"**페이지**: {record['page']} / **총 {record['total_ms']:.1f}ms**")
+        st.dataframe(
+            pd.DataFrame([
+                {"구간": "  " * span["depth"] + span["name"], "ms": span["ms"]}
+                for span in record["spans"]
+            ]),
+            use_container_width=True,
+            hide_index=True,
+        )
+        if record["counters"]:
+            st.json(record["counters"])
+        st.caption(f"기록 파일: {perf.PERF_LOG_PATH}")
 
 if __name__ == "__main__":
-    multi_app = MultiApp()
-    multi_app.run()
\ No newline at end of file
+    profile = perf.start_rerun(perf.requested(st.query_params))
+    with perf.span('MultiApp.run'):
+        multi_app = MultiApp()
+        page = multi_app.run()
+    if profile is not None:
+        profile.page = page
+        show_perf_panel(perf.finish_rerun())
\ No newline at end of file
@@ -0,0 +1,109 @@
+'''
+리런(rerun) 단위 구간 시간 측정과 캐시 hit/miss 집계
+EV_PROFILE=1 환경변수 또는 ?debug=1 쿼리로 켤 때만 기록하며, 꺼져 있으면 아무것도 하지 않음
+Streamlit에 의존하지 않으므로 엔진 모듈에서도 사용 가능
+'''
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# 기본 활성화 여부와 JSONL 내보내기 경로
+ENABLED = os.environ.get('EV_PROFILE') == '1'
+PERF_LOG_PATH = os.environ.get('EV_PROFILE_LOG', './perf_log.jsonl')
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+class RerunProfile:
+    '''리런 한 번의 구간 기록과 캐시 카운터'''
+    def __init__(self, page=None):
+        self.page = page
+        self.started = time.time()
+        self.spans = []
+        self.counters = Counter()
+        self._depth = 0
+
+    def to_record(self) -> dict:
+        return {
+            'ts': round(self.started, 3),
+            'page': self.page,
+            'total_ms': round(sum(s['ms'] for s in self.spans if s['depth'] == 0), 3),
+            'spans': self.spans,
+            'counters': dict(self.counters),
+        }
+
+
+def requested(query_params=None) -> bool:
+    '''환경변수 또는 쿼리 파라미터로 측정이 요청되었는지 확인'''
+    if ENABLED:
+        return True
+    return bool(query_params) and query_params.get('debug') == '1'
+
+
+def start_rerun(enabled: bool, page=None):
+    '''현재 스레드(리런)의 측정 시작, 꺼져 있으면 None'''
+    _local.profile = RerunProfile(page) if enabled else None
+    return _local.profile
+
+
+def current():
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def span(name: str):
+    '''구간 시간 측정 (측정이 꺼져 있으면 그대로 통과)'''
+    profile = current()
+    if profile is None:
+        yield
+        return
+    entry = {'name': name, 'depth': profile._depth, 'ms': None}
+    profile.spans.append(entry)
+    profile._depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry['ms'] = round((time.perf_counter() - start) * 1000, 3)
+        profile._depth -= 1
+
+
+def count(name: str, hit: bool):
+    '''캐시 조회 결과 기록'''
+    profile = current()
+    if profile is not None:
+        profile.counters[f'{name}.{"hit" if hit else "miss"}'] += 1
+
+
+def cached_call(name: str, func, *args, **kwargs):
+    '''
+    캐시 데코레이터가 붙은 함수 호출
+    함수 본문에서 count(name, hit=False)가 기록되지 않았으면 hit로 기록
+    '''
+    profile = current()
+    misses = profile.counters[f'{name}.miss'] if profile is not None else 0
+    with span(name):
+        value = func(*args, **kwargs)
+    if profile is not None and profile.counters[f'{name}.miss'] == misses:
+        count(name, hit=True)
+    return value
+
+
+def finish_rerun(path=PERF_LOG_PATH):
+    '''
+    현재 리런 측정을 끝내고 JSONL 파일에 한 줄로 추가
+    기록된 프로파일 반환 (측정이 꺼져 있으면 None)
+    '''
+    profile = current()
+    _local.profile = None
+    if profile is None:
+        return None
+    if path:
+        line = json.dumps(profile.to_record(), ensure_ascii=False)
+        with _log_lock, open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+    return profile
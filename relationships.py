@@ -0,0 +1,172 @@
+'''
+축 조합별 관계 설명과 상관계수
+관계 설명(RELATIONSHIP_TIPS)은 모듈 로드 시 한 번만 만들고,
+축 컬럼 전체 쌍의 상관계수 행렬은 데이터셋 버전별로 한 번 계산해 캐시
+'''
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_store import frame_version
+
+DEFAULT_TIP = "해당 조합에 대한 정보가 없습니다."
+
+# 두 축의 조합(순서 무관) → 관계 설명
+RELATIONSHIP_TIPS = {
+    frozenset(["top_speed_kmh", "acceleration_0_100_s"]):
+        "일반적으로 최고 속도가 높은 차량은 고출력 모터를 탑재해 정지 상태에서의 가속 성능도 뛰어납니다. 특히 스포츠 성향의 전기차는 이 두 지표에서 모두 높은 수치를 보입니다. 빠른 출발과 고속 주행이 모두 필요하다면 두 지표를 함께 확인하세요.",
+
+    frozenset(["top_speed_kmh", "range_km"]):
+        "고속 주행이 가능한 차량은 일반적으로 대형 배터리를 탑재한 경우가 많아 장거리 운행도 가능하지만, 고속 주행 시 전비 저하로 실 주행거리는 줄어들 수 있습니다. 고속 주행 빈도에 따라 이 둘의 균형을 보는 것이 중요합니다.",
+
+    frozenset(["top_speed_kmh", "efficiency_wh_per_km"]):
+        "고속 주행은 전력 소모가 커서 일반적으로 전비는 낮아지지만, 최신 고성능 EV 중에는 에너지 회생 제동과 고효율 모터 설계를 통해 고속 + 고효율을 동시에 갖춘 모델도 존재합니다.",
+
+    frozenset(["top_speed_kmh", "fast_charging_power_kw_dc"]):
+        "고성능 차량일수록 대형 배터리를 빠르게 충전하기 위해 높은 출력의 급속 충전 기능을 탑재하는 경우가 많습니다. 주행 성능과 충전 효율을 동시에 고려한 결과입니다.",
+
+    frozenset(["top_speed_kmh", "cargo_volume_l"]):
+        "최고 속도가 높은 차량은 보통 낮고 슬림한 형태로 적재 공간이 제한적인 경우가 많습니다. 실용성과 퍼포먼스를 동시에 원한다면 중형 SUV 계열의 EV를 추천합니다.",
+
+    frozenset(["top_speed_kmh", "fast_charge_port"]):
+        "고속 주행 성능을 가진 차량이라도 DC 급속 충전 포트가 없다면 장거리 운행 시 불편함을 겪을 수 있습니다. 차량의 성능과 더불어 충전 인프라 호환성도 함께 확인하세요.",
+
+    frozenset(["efficiency_wh_per_km", "range_km"]):
+        "높은 효율성을 가진 차량이라도 배터리 용량이 작다면 주행거리는 제한적일 수 있습니다. 전비와 함께 배터리 용량 또는 주행거리를 함께 고려해야 정확한 차량 성능을 이해할 수 있습니다.",
+
+    frozenset(["efficiency_wh_per_km", "acceleration_0_100_s"]):
+        "일반적으로 빠른 가속을 위해 강한 출력을 사용하는 차량은 더 많은 전기를 소비하게 되어 전비가 낮아집니다. 효율 중심의 주행을 원한다면 가속 스펙은 어느 정도 타협이 필요합니다.",
+
+    frozenset(["efficiency_wh_per_km", "cargo_volume_l"]):
+        "크고 무거운 차량일수록 에너지 소비가 많아 전비가 낮아질 가능성이 큽니다. 하지만 최신 경량화 기술로 이러한 트렌드를 극복한 EV도 일부 존재합니다.",
+
+    frozenset(["efficiency_wh_per_km", "fast_charging_power_kw_dc"]):
+        "전비와 충전 속도는 직접적인 상관관계는 없습니다. 다만 프리미엄 전기차의 경우 두 항목 모두 우수한 스펙을 갖추는 경향이 있어 가격 대비 성능 비교가 필요합니다.",
+
+    frozenset(["efficiency_wh_per_km", "fast_charge_port"]):
+        "에너지 효율이 좋은 차량이라도 구형 모델의 경우 DC 급속 충전이 안 될 수 있습니다. 충전 편의성을 고려한다면 전비뿐만 아니라 포트 지원 여부도 확인해야 합니다.",
+
+    frozenset(["range_km", "acceleration_0_100_s"]):
+        "퍼포먼스 중심의 차량은 전력 소모가 커서 동일 배터리 용량 대비 주행거리가 짧을 수 있습니다. 고성능과 긴 거리 모두를 원할 경우 대용량 배터리 탑재 여부를 확인하세요.",
+
+    frozenset(["range_km", "cargo_volume_l"]):
+        "차량 무게가 증가하면 주행거리는 줄어들 수 있습니다. 실사용 조건에서의 테스트 결과나 WLTP 인증거리 외에 소비자 리뷰도 함께 참고하는 것이 좋습니다.",
+
+    frozenset(["range_km", "fast_charging_power_kw_dc"]):
+        "장거리용 차량은 급속충전 성능도 중요한 요소입니다. 배터리 용량이 크기 때문에 고출력 충전이 없으면 충전 시간이 길어져 실용성이 떨어질 수 있습니다.",
+
+    frozenset(["range_km", "fast_charge_port"]):
+        "주행거리가 길어도 충전 인프라 호환성이 낮다면 장거리 운행에서 치명적입니다. DC 급속 충전 지원 여부는 꼭 확인해야 할 체크포인트입니다.",
+
+    frozenset(["acceleration_0_100_s", "cargo_volume_l"]):
+        "적재 공간이 넓은 차량은 일반적으로 무거워서 가속 성능이 떨어지는 경향이 있지만, 전기차는 토크가 즉각 전달되어 무게 대비 빠른 반응성을 보이는 경우도 있습니다.",
+
+    frozenset(["acceleration_0_100_s", "fast_charging_power_kw_dc"]):
+        "퍼포먼스 EV는 보통 대용량 배터리 탑재로 고속충전을 지원합니다. 다만 엔트리급 모델 중엔 가속력은 빠르지만 충전 속도가 느린 모델도 있으니 사양을 꼭 확인하세요.",
+
+    frozenset(["acceleration_0_100_s", "fast_charge_port"]):
+        "일부 고성능 차량도 DC 포트를 생략한 경우가 있으며, 이는 여행이나 외부 이동이 잦은 사용자에겐 불편할 수 있습니다.",
+
+    frozenset(["fast_charging_power_kw_dc", "fast_charge_port"]):
+        "출력이 높아도 차량에 DC 포트가 없다면 해당 속도로 충전할 수 없습니다. 출력과 포트 지원 여부를 함께 확인하세요.",
+
+    frozenset(["fast_charging_power_kw_dc", "cargo_volume_l"]):
+        "화물이나 다인승 모델은 충전 효율이 중요해 고속 충전 기능을 갖춘 경우가 많습니다. 이는 실사용 효율성과 연결됩니다.",
+
+    frozenset(["fast_charge_port", "cargo_volume_l"]):
+        "넓은 실내를 가진 전기 밴이나 SUV 중에서도 DC 급속 포트가 없는 모델이 존재합니다. 외부 활동이나 여행 시 꼭 필요한 기능이므로 꼼꼼히 확인해야 합니다.",
+
+    frozenset(["battery_capacity_kWh", "range_km"]):
+        "일반적으로 배터리 용량이 큰 차량은 더 긴 주행거리를 자랑합니다. 하지만 모터 효율, 공기저항, 차량 무게 등의 요소도 주행거리에 영향을 미치므로, 같은 배터리 용량에서도 주행 가능 거리에 차이가 발생할 수 있습니다.",
+
+    frozenset(["battery_capacity_kWh", "efficiency_wh_per_km"]):
+        "큰 배터리를 탑재한 차량은 일반적으로 무겁고 고출력인 경우가 많아 전비(Wh/km)는 낮을 수 있습니다. 하지만 고효율 플랫폼을 적용한 일부 고급 전기차는 높은 효율과 큰 배터리를 동시에 갖추고 있어, 효율성은 모델별로 반드시 비교가 필요합니다.",
+
+    frozenset(["battery_capacity_kWh", "acceleration_0_100_s"]):
+        "배터리 용량이 크면 전압과 출력이 안정적으로 공급되어 가속 성능이 우수할 가능성이 있습니다. 하지만 고성능 구성이 부족한 대용량 저가 차량은 빠른 가속을 보장하지 않을 수 있어, 실제 성능을 확인하는 것이 중요합니다.",
+
+    frozenset(["battery_capacity_kWh", "fast_charging_power_kw_dc"]):
+        "고용량 배터리를 가진 차량은 일반적으로 더 높은 급속 충전 성능을 갖추는 경향이 있습니다. 다만 충전 속도는 배터리 자체뿐 아니라 배터리 관리 시스템(BMS)의 설계에도 좌우되므로 스펙을 꼼꼼히 살펴야 합니다.",
+
+    frozenset(["battery_capacity_kWh", "fast_charge_port"]):
+        "배터리 용량이 크더라도 DC 급속 충전 포트를 지원하지 않으면 충전 시간이 상당히 길어집니다. 장거리 주행을 고려한다면 단순한 배터리 크기보다 충전 포트 유무가 더 핵심적인 조건이 될 수 있습니다.",
+
+    frozenset(["battery_capacity_kWh", "cargo_volume_l"]):
+        "SUV나 밴처럼 실내 공간이 넓은 차량은 종종 대형 배터리도 함께 장착하지만, 소형 차량도 바닥 공간을 활용해 중형급 배터리를 탑재할 수 있습니다. 따라서 적재 공간과 배터리 용량은 차량 유형에 따라 유연하게 설계됩니다.",
+
+    frozenset(["battery_capacity_kWh", "top_speed_kmh"]):
+        "대용량 배터리는 고속에서도 지속적으로 높은 출력을 공급할 수 있어 최고 속도 성능 향상에 기여합니다. 하지만 최고속도는 차량 설계 철학에 따라 제한될 수 있어, 빠른 속도를 중시한다면 별도 확인이 필요합니다.",
+}
+
+# 상관계수 크기별 표현 (절댓값 하한, 설명)
+CORRELATION_LEVELS = [(0.7, '강한'), (0.4, '뚜렷한'), (0.2, '약한')]
+
+
+def relationship_tip(x_axis: str, y_axis: str) -> str:
+    '''두 축 조합의 관계 설명 (순서 무관)'''
+    return RELATIONSHIP_TIPS.get(frozenset([x_axis, y_axis]), DEFAULT_TIP)
+
+
+def describe_correlation(r: float) -> str:
+    '''상관계수 → "강한 양의 상관" 같은 설명'''
+    if np.isnan(r):
+        return '상관 없음'
+    for threshold, strength in CORRELATION_LEVELS:
+        if abs(r) >= threshold:
+            return f"{strength} {'양' if r > 0 else '음'}의 상관"
+    return '상관 거의 없음'
+
+
+def correlation_matrix(values: np.ndarray) -> np.ndarray:
+    '''(n, 컬럼 수) → 컬럼 간 피어슨 상관계수 행렬 (값이 모두 같은 컬럼은 NaN)'''
+    n_columns = values.shape[1]
+    if len(values) < 2:
+        return np.full((n_columns, n_columns), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.corrcoef(values, rowvar=False).reshape(n_columns, n_columns)
+
+
+class RelationshipStats:
+    '''
+    축 컬럼 전체 쌍의 피어슨/스피어만 상관계수 행렬
+    범주형 컬럼(예: fast_charge_port)은 상관계수를 계산하지 않음
+    '''
+    def __init__(self, df: pd.DataFrame, columns):
+        self.columns = [col for col in columns if pd.api.types.is_numeric_dtype(df[col])]
+        self.position = {col: i for i, col in enumerate(self.columns)}
+        # 결측치가 있는 행은 제외 (모든 쌍이 같은 표본 사용)
+        values = df[self.columns].dropna()
+        self.n = len(values)
+        self.pearson = correlation_matrix(values.to_numpy(dtype=float))
+        # 스피어만 = 순위(동점은 평균 순위)의 피어슨 상관
+        self.spearman = correlation_matrix(values.rank().to_numpy(dtype=float))
+
+    def pair(self, x_axis: str, y_axis: str):
+        '''두 축의 {'pearson', 'spearman', 'n'} (범주형 축이면 None)'''
+        if x_axis not in self.position or y_axis not in self.position:
+            return None
+        i, j = self.position[x_axis], self.position[y_axis]
+        return {'pearson': float(self.pearson[i, j]), 'spearman': float(self.spearman[i, j]), 'n': self.n}
+
+    def frame(self, method='pearson') -> pd.DataFrame:
+        '''상관계수 행렬 DataFrame'''
+        return pd.DataFrame(getattr(self, method), index=self.columns, columns=self.columns)
+
+
+_stats_cache = {}
+_stats_lock = threading.Lock()
+
+
+def get_relationship_stats(df: pd.DataFrame, columns) -> RelationshipStats:
+    '''데이터셋 버전 기준으로 메모이즈된 상관계수 행렬 반환'''
+    key = (frame_version(df), tuple(columns))
+    with _stats_lock:
+        stats = _stats_cache.get(key)
+        if stats is None:
+            # 데이터셋이 바뀌면 이전 버전 행렬은 버림
+            for old in [old for old in _stats_cache if old[0] != key[0]]:
+                del _stats_cache[old]
+            stats = RelationshipStats(df, columns)
+            _stats_cache[key] = stats
+    return stats
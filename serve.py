@@ -0,0 +1,134 @@
+'''
+멀티 프로세스 서빙 모드
+카탈로그와 클러스터 모델을 디스크에 한 번 만들어 두고, Streamlit 워커 N개를 띄운 뒤
+로컬 라우터가 들어오는 연결을 클라이언트 IP별로 정해진 워커에 넘김
+워커들은 같은 Arrow 파일을 읽기 전용 메모리 맵으로 공유하므로 워커를 늘려도 데이터 메모리는 늘지 않음
+
+사용법:
+    python serve.py --workers 4 --port 8501
+'''
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import zlib
+
+from clustering_recommendation import CLUSTER_MODEL_PATH, build_cluster_model
+from data_store import CATALOG_PATH, frame_version, load_catalog
+
+
+def prepare_artifacts(catalog_path=CATALOG_PATH, model_path=CLUSTER_MODEL_PATH) -> str:
+    '''
+    워커를 띄우기 전에 카탈로그와 클러스터 모델 파일을 준비
+    워커들은 계산 없이 두 파일을 메모리 맵으로 읽기만 함
+    '''
+    df = load_catalog(catalog_path)
+    version = frame_version(df)
+    build_cluster_model(df, version).save(model_path)
+    return version
+
+
+def worker_command(port: int) -> list:
+    '''Streamlit 워커 한 개의 실행 명령'''
+    return [
+        sys.executable, '-m', 'streamlit', 'run', 'main.py',
+        '--server.port', str(port),
+        '--server.address', '127.0.0.1',
+        '--server.headless', 'true',
+    ]
+
+
+def start_workers(n_workers: int, base_port: int, command=worker_command) -> list:
+    '''워커 프로세스 N개 실행, (포트, 프로세스) 목록 반환'''
+    workers = []
+    for i in range(n_workers):
+        port = base_port + i
+        workers.append((port, subprocess.Popen(command(port))))
+    return workers
+
+
+async def _pipe(reader, writer):
+    '''한 방향으로 바이트를 그대로 전달하고, 끝나면 상대편에 EOF 전달'''
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+
+
+class Router:
+    '''
+    TCP 수준 라우터 (클라이언트 IP 해시로 워커 고정)
+    Streamlit 세션은 웹소켓 외에 /media, 파일 업로드 요청을 별도 연결로 보내는데
+    이 파일들은 세션을 실행한 워커 메모리에만 있으므로, 같은 클라이언트의 연결은 항상 같은 워커로 보냄
+    '''
+    def __init__(self, ports):
+        self.ports = list(ports)
+
+    def candidates(self, host: str) -> list:
+        '''host의 연결을 넘길 워커 포트 순서 (해시로 정한 워커 → 연결이 안 되면 다음 워커)'''
+        start = zlib.crc32(host.encode()) % len(self.ports)
+        return self.ports[start:] + self.ports[:start]
+
+    async def handle(self, client_reader, client_writer):
+        peer = client_writer.get_extra_info('peername')
+        host = peer[0] if peer else ''
+        # 연결이 안 되는 워커(아직 시작 중 등)는 건너뜀
+        for port in self.candidates(host):
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection('127.0.0.1', port)
+                break
+            except OSError:
+                continue
+        else:
+            client_writer.close()
+            return
+        await asyncio.gather(
+            _pipe(client_reader, upstream_writer),
+            _pipe(upstream_reader, client_writer),
+        )
+        upstream_writer.close()
+        client_writer.close()
+
+    async def serve(self, host: str, port: int):
+        '''SIGINT/SIGTERM을 받을 때까지 연결을 받아 워커로 전달'''
+        server = await asyncio.start_server(self.handle, host, port)
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopped.set)
+        async with server:
+            await stopped.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='전기차 추천 앱 멀티 프로세스 서빙')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8501, help='라우터 포트')
+    parser.add_argument('--worker-base-port', type=int, default=8600, help='워커 포트 시작 번호')
+    args = parser.parse_args(argv)
+
+    version = prepare_artifacts()
+    print(f'데이터셋 버전 {version}: 워커 {args.workers}개 시작')
+    workers = start_workers(args.workers, args.worker_base_port)
+
+    try:
+        asyncio.run(Router([port for port, _ in workers]).serve(args.host, args.port))
+    finally:
+        for _, process in workers:
+            process.terminate()
+        for _, process in workers:
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+'''
+비슷한 차량 찾기 (스펙 벡터 최근접 이웃)
+클러스터링에 쓰는 스펙 컬럼(선택적으로 hover의 크기/토크 컬럼 포함)을 0-1로 정규화한 벡터 사이의 유클리드 거리 기준
+작은 카탈로그는 전체 거리를 한 번에 계산(정확), 큰 카탈로그는 IVF(거친 중심점별 역색인) 근사 검색
+같은 차량에 대한 결과는 LRU 캐시에서 돌려줌
+'''
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from clustering_recommendation import FEATURES, normalize
+from data_store import frame_version
+
+# hover_df_processed_encoded_ver2.csv에서 가져온 수치 컬럼
+HOVER_FEATURES = ['length_mm', 'width_mm', 'height_mm', 'torque_nm']
+
+# 이 행 수 이상이면 기본으로 근사 색인 사용
+APPROX_MIN_ROWS = 50_000
+
+# IVF 설정: 탐색할 리스트 수, 학습용 리스트당 표본 수, Lloyd 반복 횟수, 청크당 거리 행렬 원소 수
+IVF_PROBES = 8
+IVF_SAMPLE_PER_LIST = 64
+IVF_TRAIN_ITERATIONS = 10
+DISTANCE_CHUNK = 1 << 18
+
+# 차량별 결과 캐시 크기
+SIMILAR_CACHE_SIZE = 256
+
+# 필터 조합별 기준 차량 선택지 캐시 크기
+OPTIONS_CACHE_SIZE = 32
+
+
+def squared_distances(vectors: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    '''(n, d) × (m, d) → (n, m) 제곱 거리 (||x||² - 2x·c + ||c||²)'''
+    distances = (vectors ** 2).sum(axis=1)[:, None] - 2 * vectors @ centers.T + (centers ** 2).sum(axis=1)
+    return np.maximum(distances, 0)
+
+
+def nearest_center(vectors: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    '''
+    행별 가장 가까운 중심점 번호
+    비교에는 ||x||²가 필요 없으므로 ||c||² - 2x·c만 계산하고, 거리 행렬이 캐시에 들어가도록 청크 단위로 처리
+    '''
+    center_norms = (centers ** 2).sum(axis=1)
+    chunk = max(1, DISTANCE_CHUNK // len(centers))
+    return np.concatenate([
+        (center_norms - 2 * vectors[start:start + chunk] @ centers.T).argmin(axis=1)
+        for start in range(0, len(vectors), chunk)
+    ]) if len(vectors) else np.empty(0, dtype=int)
+
+
+def closest(candidates: np.ndarray, distances: np.ndarray, k: int):
+    '''후보 중 거리가 가장 가까운 k개 (거리가 같으면 행 위치 순)'''
+    if len(candidates) > k:
+        # k번째 거리 이하인 후보만 남긴 뒤 정렬 (동점 후보가 잘리지 않도록)
+        limit = np.partition(distances, k - 1)[k - 1]
+        keep = distances <= limit
+        candidates, distances = candidates[keep], distances[keep]
+    order = np.lexsort((candidates, distances))[:k]
+    return candidates[order], distances[order]
+
+
+class IVFIndex:
+    '''
+    IVF 근사 최근접 이웃 색인
+    표본으로 학습한 거친 중심점(Lloyd)마다 소속 행 목록을 두고,
+    질의와 가까운 n_probe개 목록 안에서만 정확한 거리를 계산
+    '''
+    def __init__(self, vectors: np.ndarray, n_lists=None, seed=0):
+        rng = np.random.default_rng(seed)
+        n_lists = n_lists or int(np.clip(np.sqrt(len(vectors)), 16, 4096))
+        n_lists = max(1, min(n_lists, len(vectors)))
+        sample_size = min(len(vectors), n_lists * IVF_SAMPLE_PER_LIST)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centers = sample[rng.choice(len(sample), n_lists, replace=False)]
+        for _ in range(IVF_TRAIN_ITERATIONS):
+            labels = nearest_center(sample, centers)
+            counts = np.bincount(labels, minlength=n_lists)
+            sums = np.zeros_like(centers)
+            np.add.at(sums, labels, sample)
+            # 빈 목록은 이전 중심점 유지
+            filled = counts > 0
+            centers[filled] = sums[filled] / counts[filled, None]
+        self.centers = centers
+        labels = nearest_center(vectors, centers)
+        # 목록별 행 위치를 하나의 배열에 이어 붙이고 시작/끝 오프셋으로 구분
+        self.members = np.argsort(labels, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+
+    def candidates(self, query: np.ndarray, n_probe=IVF_PROBES) -> np.ndarray:
+        '''질의와 가까운 n_probe개 목록에 속한 행 위치'''
+        distances = squared_distances(query[None, :], self.centers)[0]
+        n_probe = min(n_probe, len(self.centers))
+        lists = np.argpartition(distances, n_probe - 1)[:n_probe]
+        return np.concatenate([self.members[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+
+
+class SimilarityEngine:
+    '''
+    데이터셋 버전별로 한 번 만드는 유사 차량 검색기
+    approx=None이면 행 수(APPROX_MIN_ROWS)로 정확/근사 방식 결정
+    '''
+    def __init__(self, df: pd.DataFrame, include_hover=False, approx=None, n_probe=IVF_PROBES, seed=0):
+        self.df = df
+        self.columns = FEATURES + (HOVER_FEATURES if include_hover else [])
+        # 결측치가 있는 차량은 제외 (prepare_clustering_data와 같은 기준)
+        complete = df[self.columns].notna().all(axis=1).to_numpy()
+        self.rows = np.flatnonzero(complete)
+        clean = df.iloc[self.rows]
+        self.vectors = np.column_stack([normalize(clean[col].to_numpy()) for col in self.columns]) \
+            if len(clean) else np.empty((0, len(self.columns)))
+        # 값이 모두 같은 컬럼은 거리에 영향이 없도록 0으로
+        self.vectors = np.nan_to_num(self.vectors)
+        self.key_index = pd.MultiIndex.from_arrays([clean['brand'], clean['model']])
+        approx = len(self.rows) >= APPROX_MIN_ROWS if approx is None else approx
+        self.index = IVFIndex(self.vectors, seed=seed) if approx and len(self.rows) else None
+        self.n_probe = n_probe
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def neighbors(self, position: int, k: int):
+        '''벡터 위치 position과 가장 가까운 k개 (자기 자신 제외) → (위치, 거리)'''
+        query = self.vectors[position]
+        if self.index is None:
+            candidates = np.arange(len(self.vectors))
+        else:
+            candidates = self.index.candidates(query, self.n_probe)
+        candidates = candidates[candidates != position]
+        distances = ((self.vectors[candidates] - query) ** 2).sum(axis=1)
+        candidates, distances = closest(candidates, distances, k)
+        return candidates, np.sqrt(distances)
+
+    def similar(self, brand, model, k=5) -> pd.DataFrame:
+        '''
+        (brand, model)과 스펙이 비슷한 차량 k대 (가까운 순, distance 컬럼 포함)
+        카탈로그에 없거나 스펙이 비어 있는 차량이면 KeyError
+        '''
+        key = (brand, model, k)
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                return result
+        position = self.key_index.get_indexer_for(pd.MultiIndex.from_tuples([(brand, model)]))
+        if len(position) == 0 or position[0] < 0:
+            raise KeyError((brand, model))
+        positions, distances = self.neighbors(int(position[0]), k)
+        result = self.df.iloc[self.rows[positions]].assign(distance=distances)
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > SIMILAR_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+
+_engine_cache = {}
+_engine_lock = threading.Lock()
+
+
+def get_similarity_engine(df: pd.DataFrame, include_hover=False) -> SimilarityEngine:
+    '''데이터셋 버전 기준으로 메모이즈된 유사 차량 검색기 반환'''
+    key = (frame_version(df), include_hover)
+    with _engine_lock:
+        engine = _engine_cache.get(key)
+        if engine is None:
+            # 데이터셋이 바뀌면 이전 버전 검색기는 버림
+            for old in [old for old in _engine_cache if old[0] != key[0]]:
+                del _engine_cache[old]
+            engine = SimilarityEngine(df, include_hover)
+            _engine_cache[key] = engine
+    return engine
+
+
+_options_cache = OrderedDict()
+_options_lock = threading.Lock()
+
+
+def similar_options(view: tuple, candidates: pd.DataFrame) -> tuple:
+    '''
+    기준 차량 선택지 ((brand, model) 키 목록, 키 → 목록 위치)
+    같은 화면 상태(view: 데이터셋 버전 + 필터)면 리런마다 후보 전체를 다시 훑지 않고 캐시에서 돌려줌
+    '''
+    with _options_lock:
+        options = _options_cache.get(view)
+        if options is not None:
+            _options_cache.move_to_end(view)
+            return options
+    keys = list(zip(candidates['brand'].astype(object), candidates['model'].astype(object)))
+    options = (keys, {key: i for i, key in enumerate(keys)})
+    with _options_lock:
+        _options_cache[view] = options
+        while len(_options_cache) > OPTIONS_CACHE_SIZE:
+            _options_cache.popitem(last=False)
+    return options
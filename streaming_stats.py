@@ -0,0 +1,294 @@
+'''
+스트리밍 통계 (청크/분산 데이터용)
+정확한 최소/최대와 합칠 수 있는 근사 분위수 스케치(KLL)
+청크나 워커별로 따로 만든 뒤 merge로 합쳐 전체 데이터 기준 정규화 범위와 임계값을 계산
+증분 갱신용으로 정렬 배열 + 델타 구조(SortedDelta)도 제공
+'''
+import math
+
+import numpy as np
+
+# KLL 단계별 용량 감소 비율과 기본 순위 오차
+KLL_CAPACITY_RATIO = 2 / 3
+DEFAULT_EPSILON = 0.01
+
+
+class MinMax:
+    '''컬럼별 정확한 최소/최대 (NaN 무시, 합치기 가능)'''
+    def __init__(self, n_columns: int):
+        self.count = 0
+        self.low = np.full(n_columns, np.inf)
+        self.high = np.full(n_columns, -np.inf)
+
+    def update(self, values):
+        '''(n, 컬럼 수) 배열 반영'''
+        values = np.asarray(values, dtype=float).reshape(-1, len(self.low))
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.low = np.fmin(self.low, np.nanmin(values, axis=0))
+        self.high = np.fmax(self.high, np.nanmax(values, axis=0))
+        return self
+
+    def merge(self, other: 'MinMax'):
+        self.count += other.count
+        self.low = np.fmin(self.low, other.low)
+        self.high = np.fmax(self.high, other.high)
+        return self
+
+    def bounds(self, columns) -> dict:
+        '''컬럼명 → (최소, 최대)'''
+        return {col: (float(low), float(high)) for col, low, high in zip(columns, self.low, self.high)}
+
+
+def kll_k_for(epsilon: float) -> int:
+    '''
+    목표 순위 오차(전체 대비 비율)에 맞는 KLL k 값
+    (k=200일 때 약 1.65% - 단일 분위수 기준 경험식)
+    '''
+    return max(8, math.ceil((2.296 / epsilon) ** (1 / 0.9723)))
+
+
+class KLLSketch:
+    '''
+    KLL 분위수 스케치
+    단계 h의 값은 가중치 2^h를 가지며, 단계가 용량을 넘으면 정렬 후 하나 걸러 하나씩 위 단계로 올림
+    메모리는 데이터 크기와 무관하게 O(k), 서로 다른 스케치를 merge로 합칠 수 있음
+    '''
+    def __init__(self, epsilon=DEFAULT_EPSILON, k=None, seed=0):
+        self.k = k or kll_k_for(epsilon)
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * KLL_CAPACITY_RATIO ** depth))
+
+    def _compress(self):
+        '''용량을 넘은 단계를 아래부터 차례로 압축'''
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # 홀수 개면 하나는 현재 단계에 남김
+                keep = items[:len(items) % 2]
+                promoted = items[len(keep):][self._rng.integers(2)::2]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        '''값 배열 반영 (NaN 제외)'''
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch'):
+        '''다른 스케치를 합침 (단계별로 이어 붙인 뒤 압축)'''
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _weighted(self):
+        '''(정렬된 값, 누적 가중치)'''
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0**level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def quantile(self, q: float) -> float:
+        '''q(0~1) 분위수 근사값'''
+        if self.count == 0:
+            return float('nan')
+        values, cumulative = self._weighted()
+        target = q * cumulative[-1]
+        return float(values[min(np.searchsorted(cumulative, target, side='left'), len(values) - 1)])
+
+    def rank(self, value: float) -> float:
+        '''value 이하 값의 비율 근사값'''
+        if self.count == 0:
+            return float('nan')
+        values, cumulative = self._weighted()
+        position = np.searchsorted(values, value, side='right')
+        return float(cumulative[position - 1] / cumulative[-1]) if position else 0.0
+
+    def size(self) -> int:
+        '''스케치에 남아 있는 값 개수'''
+        return sum(len(items) for items in self.levels)
+
+
+def sketch_cutoffs(sketches, percentile=70) -> np.ndarray:
+    '''점수별 스케치로 클러스터 임계값 계산 (compute_cutoffs의 근사 버전)'''
+    return np.array([sketch.quantile(percentile / 100) for sketch in sketches])
+
+
+def lerp(a, b, t):
+    '''np.percentile(linear)과 같은 방식의 보간 (결과를 비트 단위로 일치시키기 위함)'''
+    diff = b - a
+    return b - diff * (1 - t) if t >= 0.5 else a + diff * t
+
+
+def sorted_percentile(sorted_values, percentile: float) -> float:
+    '''오름차순 정렬된 배열의 백분위수 (np.percentile과 같은 값, 정렬 없이 O(1))'''
+    n = len(sorted_values)
+    position = (n - 1) * (percentile / 100)
+    k = int(np.floor(position))
+    return lerp(sorted_values[k], sorted_values[min(k + 1, n - 1)], position - k)
+
+
+class SortedDelta:
+    '''
+    정렬된 기본 배열 + 추가/삭제 델타로 된 정확한 순서 통계 구조
+    값 추가/삭제는 델타에만 기록하고 k번째 값, 백분위수, 값 구간 조회는 이진 탐색으로 계산
+    (조회 비용은 델타 크기와 log N에 비례), 델타가 커지면 기본 배열을 다시 정렬
+    기본 배열은 (값, 행 위치) 순으로 정렬하며 수정하지 않으므로 메모리 맵 배열을 그대로 쓸 수 있음
+    '''
+    def __init__(self, values, positions=None, compact_ratio=0.1, presorted=False):
+        values = np.asarray(values, dtype=float)
+        positions = np.arange(len(values)) if positions is None else np.asarray(positions)
+        if not presorted:
+            order = np.lexsort((positions, values))
+            values, positions = values[order], positions[order]
+        self.base = values
+        self.base_positions = positions
+        self.compact_ratio = compact_ratio
+        # 행 위치 → 값
+        self.added = {}
+        self.removed = {}
+        self._sorted = None
+
+    def __len__(self):
+        return len(self.base) - len(self.removed) + len(self.added)
+
+    def _in_base(self, position, value) -> bool:
+        '''기본 배열에 (value, position)이 있는지 (같은 값 구간만 확인)'''
+        start, stop = np.searchsorted(self.base, value, side='left'), np.searchsorted(self.base, value, side='right')
+        return position in self.base_positions[start:stop]
+
+    def add(self, values, positions):
+        for value, position in zip(np.asarray(values, dtype=float).tolist(), np.asarray(positions).tolist()):
+            if position in self.removed and self.removed[position] == value:
+                del self.removed[position]
+            else:
+                self.added[position] = value
+        self._changed()
+
+    def remove(self, values, positions):
+        for value, position in zip(np.asarray(values, dtype=float).tolist(), np.asarray(positions).tolist()):
+            if position in self.added:
+                del self.added[position]
+            elif self._in_base(position, value):
+                self.removed[position] = value
+        self._changed()
+
+    def _changed(self):
+        self._sorted = None
+        if len(self.added) + len(self.removed) > max(64, self.compact_ratio * len(self.base)):
+            self.compact()
+
+    def compact(self):
+        '''델타를 기본 배열에 합침 (추가 값이 적으면 정렬된 기본 배열에 끼워 넣고, 많으면 다시 정렬)'''
+        if not self.added and not self.removed:
+            return
+        values, positions = self.base, self.base_positions
+        if self.removed:
+            keep = ~np.isin(positions, np.fromiter(self.removed, dtype=positions.dtype))
+            values, positions = values[keep], positions[keep]
+        added_values = np.fromiter(self.added.values(), dtype=float)
+        added_positions = np.fromiter(self.added, dtype=positions.dtype)
+        if len(added_values) ** 2 < len(values):
+            order = np.lexsort((added_positions, added_values))
+            added_values, added_positions = added_values[order], added_positions[order]
+            index = []
+            for value, position in zip(added_values.tolist(), added_positions.tolist()):
+                start, stop = np.searchsorted(values, value, side='left'), np.searchsorted(values, value, side='right')
+                index.append(start + np.searchsorted(positions[start:stop], position))
+            values, positions = np.insert(values, index, added_values), np.insert(positions, index, added_positions)
+        else:
+            values, positions = np.concatenate([values, added_values]), np.concatenate([positions, added_positions])
+            order = np.lexsort((positions, values))
+            values, positions = values[order], positions[order]
+        self.base, self.base_positions = values, positions
+        self.added, self.removed = {}, {}
+        self._sorted = None
+
+    def _delta_sorted(self):
+        if self._sorted is None:
+            self._sorted = (np.sort(np.fromiter(self.added.values(), dtype=float)),
+                            np.sort(np.fromiter(self.removed.values(), dtype=float)))
+        return self._sorted
+
+    def count_le(self, value) -> int:
+        '''value 이하 값 개수'''
+        added, removed = self._delta_sorted()
+        return int(np.searchsorted(self.base, value, side='right') - np.searchsorted(removed, value, side='right')
+                   + np.searchsorted(added, value, side='right'))
+
+    def kth(self, k: int) -> float:
+        '''k번째(0부터) 작은 값'''
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        added, _ = self._delta_sorted()
+        best = np.inf
+        # 답은 기본 배열 또는 추가 값 중 count_le(v) > k를 만족하는 가장 작은 값
+        for candidates in (self.base, added):
+            low, high = 0, len(candidates)
+            while low < high:
+                mid = (low + high) // 2
+                if self.count_le(candidates[mid]) > k:
+                    high = mid
+                else:
+                    low = mid + 1
+            if low < len(candidates):
+                best = min(best, float(candidates[low]))
+        return best
+
+    def min(self) -> float:
+        return self.kth(0)
+
+    def max(self) -> float:
+        return self.kth(len(self) - 1)
+
+    def percentile(self, percentile: float) -> float:
+        '''np.percentile(values, percentile)과 같은 값'''
+        n = len(self)
+        position = (n - 1) * (percentile / 100)
+        k = int(np.floor(position))
+        return lerp(self.kth(k), self.kth(min(k + 1, n - 1)), position - k)
+
+    def smallest(self, n: int) -> np.ndarray:
+        '''(값, 행 위치) 순으로 가장 작은 n개의 행 위치'''
+        # 기본 배열 앞쪽에서 삭제된 것을 빼도 n개가 남도록 삭제 수만큼 더 읽음
+        head = slice(0, n + len(self.removed))
+        values, positions = self.base[head], self.base_positions[head]
+        if self.removed:
+            keep = ~np.isin(positions, np.fromiter(self.removed, dtype=positions.dtype))
+            values, positions = values[keep], positions[keep]
+        if self.added:
+            values = np.concatenate([values, np.fromiter(self.added.values(), dtype=float)])
+            positions = np.concatenate([positions, np.fromiter(self.added, dtype=positions.dtype)])
+            order = np.lexsort((positions, values))
+            positions = positions[order]
+        return positions[:n]
+
+    def positions_between(self, low: float, high: float) -> np.ndarray:
+        '''값이 low 이상 high 이하인 행 위치'''
+        start, stop = np.searchsorted(self.base, low, side='left'), np.searchsorted(self.base, high, side='right')
+        positions = self.base_positions[start:stop]
+        if self.removed:
+            positions = positions[~np.isin(positions, np.fromiter(self.removed, dtype=positions.dtype))]
+        extra = [position for position, value in self.added.items() if low <= value <= high]
+        return np.concatenate([positions, np.array(extra, dtype=positions.dtype)])
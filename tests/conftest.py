@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 저장소 최상위 모듈(clustering_recommendation 등)을 테스트에서 바로 import
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
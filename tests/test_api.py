@@ -0,0 +1,87 @@
+'''헤드리스 추천 API: 응답이 UI 경로(return_filtered_df + top_models)와 같은지, 캐시/검증/메트릭 확인'''
+import json
+
+import numpy as np
+from tornado.testing import AsyncHTTPTestCase
+
+from api import MAX_TOP_N, RecommendationService, make_app
+from clustering_recommendation import CLUSTER_NAMES, SCORE_COLUMNS
+from filtering import FILTER_COLUMNS, return_filtered_df
+from test_clustering import shipped_catalog
+from test_filtering import random_filters
+
+CATALOG = shipped_catalog()
+
+
+def expected_clusters(service, filters, brands, top_n):
+    '''Streamlit 화면과 같은 경로로 계산한 클러스터별 (brand, model, score)'''
+    filtered_df = return_filtered_df(CATALOG, [(col, filters.get(col, [])) for col in FILTER_COLUMNS])
+    if brands:
+        filtered_df = filtered_df[filtered_df['brand'].isin(brands)]
+    result = {}
+    for name, score_col in zip(CLUSTER_NAMES, SCORE_COLUMNS):
+        top = service.model.top_models(name, top_n, filtered_df=filtered_df) if len(filtered_df) else []
+        result[name] = [(str(row['brand']), row['model'], round(float(row[score_col]), 2))
+                        for _, row in (top.iterrows() if len(top) else [])]
+    return len(filtered_df), result
+
+
+def test_recommend_matches_ui_path():
+    service = RecommendationService(CATALOG)
+    rng = np.random.default_rng(0)
+    brand_values = CATALOG['brand'].dropna().unique().tolist()
+    for _ in range(30):
+        filters = dict(random_filters(CATALOG, rng))
+        brands = [brand for brand in brand_values if rng.random() < 0.2]
+        top_n = int(rng.integers(1, 10))
+        body = json.loads(service.recommend(filters, brands, top_n))
+        matched, clusters = expected_clusters(service, filters, brands, top_n)
+        assert body['matched'] == matched
+        for name in CLUSTER_NAMES:
+            assert [(car['brand'], car['model'], car['score']) for car in body['clusters'][name]] == clusters[name]
+            assert [car['rank'] for car in body['clusters'][name]] == list(range(1, len(clusters[name]) + 1))
+
+
+def test_cache_ignores_value_order():
+    service = RecommendationService(CATALOG)
+    sizes = CATALOG['car_size'].dropna().unique().tolist()[:2]
+    first = service.recommend({'car_size': sizes}, ['Kia', 'BMW'], 3)
+    # 값 순서/중복만 다른 요청은 같은 캐시 항목
+    assert service.recommend({'car_size': sizes[::-1]}, ['BMW', 'Kia', 'Kia'], 3) == first
+    service.recommend({'car_size': sizes}, ['Kia', 'BMW'], 4)
+    metrics = service.metrics()
+    assert (metrics['requests'], metrics['cache_hit'], metrics['cache_miss'], metrics['cache_entries']) == (3, 1, 2, 2)
+    assert metrics['p50_ms'] <= metrics['p99_ms']
+
+
+class RecommendationHandlerTest(AsyncHTTPTestCase):
+    def get_app(self):
+        self.service = RecommendationService(CATALOG)
+        return make_app(self.service)
+
+    def get_json(self, path):
+        response = self.fetch(path)
+        return response, json.loads(response.body) if response.code == 200 else None
+
+    def test_recommendations(self):
+        size = CATALOG['car_size'].dropna().iloc[0]
+        response, body = self.get_json(f'/recommendations?car_size={size}&brand=Kia&brand=BMW&top_n=3')
+        assert response.code == 200
+        assert response.headers['Content-Type'].startswith('application/json')
+        matched, clusters = expected_clusters(self.service, {'car_size': [size]}, ['Kia', 'BMW'], 3)
+        assert body['matched'] == matched and body['filters'] == {'car_size': [size]}
+        for name in CLUSTER_NAMES:
+            assert [(car['brand'], car['model'], car['score']) for car in body['clusters'][name]] == clusters[name]
+
+    def test_top_n_validation(self):
+        for top_n in ('0', str(MAX_TOP_N + 1), 'abc'):
+            assert self.fetch(f'/recommendations?top_n={top_n}').code == 400
+        assert self.fetch(f'/recommendations?top_n={MAX_TOP_N}').code == 200
+
+    def test_metrics(self):
+        for _ in range(2):
+            assert self.fetch('/recommendations?top_n=2').code == 200
+        response, metrics = self.get_json('/metrics')
+        assert response.code == 200
+        assert metrics['dataset_version'] == self.service.version
+        assert (metrics['requests'], metrics['cache_hit'], metrics['cache_miss']) == (2, 1, 1)
@@ -0,0 +1,59 @@
+'''청크마다 컬럼 타입이 달라도 배치 점수 계산이 끝까지 가는지 확인'''
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import batch_score
+from batch_score import batch_score as run_batch_score
+from clustering_recommendation import prepare_clustering_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK_SIZE = 100
+
+
+def mixed_csv(directory):
+    '''첫 청크에는 정수만, 뒤 청크에는 실수/결측이 있는 컬럼이 섞인 CSV'''
+    df = pd.read_csv(os.path.join(ROOT, 'dropped_df_processed_encoded.csv'))
+    head, tail = df.iloc[:CHUNK_SIZE], df.iloc[CHUNK_SIZE:].copy()
+    tail['seats'] = tail['seats'] + 0.5
+    tail['top_speed_kmh'] = tail['top_speed_kmh'].astype(float)
+    tail.iloc[0, tail.columns.get_loc('top_speed_kmh')] += 0.5
+    tail.iloc[CHUNK_SIZE, tail.columns.get_loc('cargo_volume_l')] = None
+    path = str(directory / 'mixed.csv')
+    head.to_csv(path, index=False)
+    tail.to_csv(path, mode='a', header=False, index=False)
+    return path, pd.concat([head, tail])
+
+
+def test_mixed_int_float_chunks(tmp_path):
+    path, df = mixed_csv(tmp_path)
+    output = str(tmp_path / 'scored.parquet')
+    summary = run_batch_score(path, output, chunk_size=CHUNK_SIZE)
+
+    result = pq.read_table(output).to_pandas()
+    expected = prepare_clustering_data(df)
+    assert summary['scored'] == len(expected) == len(result)
+    assert result['seats'].tolist() == df.loc[expected.index, 'seats'].tolist()
+    assert result['top_speed_kmh'].tolist() == expected['top_speed_kmh'].tolist()
+    assert result['cluster'].tolist() == expected['cluster'].tolist()
+    assert sorted(os.listdir(tmp_path)) == ['mixed.csv', 'scored.parquet']
+
+
+def test_failed_write_removes_tmp_file(tmp_path, monkeypatch):
+    path, _ = mixed_csv(tmp_path)
+    output = str(tmp_path / 'scored.parquet')
+    original = batch_score._chunk_output
+    calls = []
+
+    def failing(chunk, *args):
+        calls.append(len(chunk))
+        if len(calls) == 3:
+            raise RuntimeError('boom')
+        return original(chunk, *args)
+
+    monkeypatch.setattr(batch_score, '_chunk_output', failing)
+    with pytest.raises(RuntimeError):
+        run_batch_score(path, output, chunk_size=CHUNK_SIZE)
+    assert sorted(os.listdir(tmp_path)) == ['mixed.csv']
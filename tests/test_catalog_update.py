@@ -0,0 +1,126 @@
+'''증분 갱신(upsert) 결과가 카탈로그 전체를 다시 계산한 결과와 같은지, 저장이 바뀐 행만 기록하는지 확인'''
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import catalog_update
+from catalog_update import CatalogUpdater, KeyIndex
+from clustering_recommendation import CLUSTER_NAMES, SCORE_COLUMNS, ClusterModel, prepare_clustering_data
+from data_store import load_catalog, segment_paths
+from test_data_store import copy_sources
+
+
+@pytest.fixture
+def paths(tmp_path):
+    sources = copy_sources(tmp_path)
+    return {
+        'catalog_path': str(tmp_path / 'catalog.arrow'),
+        'sources': sources,
+        'delta_path': str(tmp_path / 'delta.arrow'),
+        'state_path': str(tmp_path / 'state.arrow'),
+        'model_path': str(tmp_path / 'model.arrow'),
+    }
+
+
+def open_updater(paths):
+    return CatalogUpdater.open(paths['catalog_path'], paths['sources'], paths['delta_path'], paths['state_path'])
+
+
+def reload(paths):
+    return load_catalog(paths['catalog_path'], paths['sources'], paths['delta_path'])
+
+
+def assert_matches_rebuild(updater, df):
+    '''updater 상태 == 델타를 적용한 카탈로그로 처음부터 계산한 점수/라벨/순위'''
+    expected = prepare_clustering_data(df)
+    model = ClusterModel(expected)
+    rows = expected.index.to_numpy()
+    valid = updater.valid.full(updater.n)[:, 0].astype(bool)
+    assert np.array_equal(np.flatnonzero(valid), rows)
+    np.testing.assert_array_equal(updater.scores.get(rows), expected[SCORE_COLUMNS].to_numpy())
+    assert (CLUSTER_NAMES[updater.labels.get(rows)[:, 0]] == expected['cluster'].to_numpy()).all()
+    data_position = np.cumsum(valid) - 1
+    for name, ranking in zip(CLUSTER_NAMES, updater.rankings):
+        assert np.array_equal(data_position[ranking.smallest(len(ranking))], model.ranked[name]), name
+    return model
+
+
+def make_rows(df, brand, model, **values):
+    rows = df.iloc[[10]].copy().astype({'brand': object})
+    rows['brand'], rows['model'] = brand, model
+    for column, value in values.items():
+        rows[column] = value
+    return rows
+
+
+def test_upsert_matches_full_recompute(paths, monkeypatch):
+    updater = open_updater(paths)
+    base = reload(paths)
+    assert_matches_rebuild(updater, base)
+    top_speed = base['top_speed_kmh'].max()
+    cases = [
+        ('incremental', make_rows(base, 'Kia', 'EV Test 1', top_speed_kmh=200, acceleration_0_100_s=5.0)),
+        ('incremental', pd.concat([make_rows(base, 'Kia', 'EV Test 1', top_speed_kmh=210),
+                                   make_rows(base, 'Hyundai', 'EV Test 2')])),
+        # 스펙 최대값이 늘어나면 전체 재계산
+        ('full', make_rows(base, 'Kia', 'EV Test 3', top_speed_kmh=top_speed + 100)),
+        # 기존 차량이 스펙 결측으로 빠짐
+        ('incremental', make_rows(base, base['brand'].iloc[5], base['model'].iloc[5], range_km=np.nan)),
+        ('incremental', make_rows(base, base['brand'].iloc[7], base['model'].iloc[7], battery_capacity_kWh=90.0)),
+        # 최대값이 다시 줄어들면 전체 재계산
+        ('full', make_rows(base, 'Kia', 'EV Test 3', top_speed_kmh=180)),
+        ('incremental', make_rows(base, 'Hyundai', 'EV Test 4', fast_charging_power_kw_dc=200)),
+    ]
+    for mode, rows in cases:
+        assert updater.upsert(rows)['mode'] == mode
+        version = updater.save(model_path=paths['model_path'])
+        df = reload(paths)
+        assert df.attrs['dataset_version'] == version
+        model = assert_matches_rebuild(updater, df)
+        # 세그먼트를 이어 붙인 모델 파일도 같은 결과
+        loaded = ClusterModel.load(df, paths['model_path'])
+        assert loaded is not None
+        for name in CLUSTER_NAMES:
+            assert np.array_equal(loaded.ranked[name], model.ranked[name]), name
+        np.testing.assert_array_equal(loaded.data[SCORE_COLUMNS].to_numpy(), model.data[SCORE_COLUMNS].to_numpy())
+
+    # 상태 파일 + 그 뒤 세그먼트로 다시 열어도 같은 상태 (카탈로그 전체는 읽지 않음)
+    def fail(*args, **kwargs):
+        raise AssertionError('load_catalog called')
+    monkeypatch.setattr(catalog_update, 'load_catalog', fail)
+    reopened = open_updater(paths)
+    assert reopened.version == version
+    assert_matches_rebuild(reopened, reload(paths))
+    assert reopened.top() == updater.top()
+    # 새 키를 끼워 넣은 키 순서 == 처음부터 정렬한 순서
+    assert np.array_equal(reopened.keys.merged_order(), KeyIndex.sort_order(*reopened.keys.arrays()))
+
+
+def test_incremental_save_writes_only_changed_rows(paths):
+    updater = open_updater(paths)
+    base = reload(paths)
+    # 처음 저장할 때 델타/모델/상태 파일 전체 기록
+    updater.upsert(make_rows(base, 'Kia', 'EV Test 1'))
+    updater.save(model_path=paths['model_path'])
+    model_inode = os.stat(paths['model_path']).st_ino
+    state_inode = os.stat(paths['state_path']).st_ino
+
+    reopened = open_updater(paths)
+    report = reopened.upsert(make_rows(base, 'Kia', 'EV Test 2', top_speed_kmh=150))
+    assert report['mode'] == 'incremental'
+    version = reopened.save(model_path=paths['model_path'])
+
+    # 기존 파일은 그대로 두고 바뀐 행만 세그먼트로 덧붙임
+    assert os.stat(paths['model_path']).st_ino == model_inode
+    assert os.stat(paths['state_path']).st_ino == state_inode
+    assert len(segment_paths(paths['delta_path'])) == 1
+    [model_segment] = segment_paths(paths['model_path'])
+    segment = pd.read_feather(model_segment)
+    assert len(segment) == 1 + report['relabeled_count']
+
+    df = reload(paths)
+    assert df.attrs['dataset_version'] == version
+    assert df['model'].iloc[-1] == 'EV Test 2'
+    assert_matches_rebuild(open_updater(paths), df)
@@ -0,0 +1,69 @@
+'''assign_clusters 벡터화 버전이 기존 iterrows 구현과 같은 라벨을 내는지 확인'''
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clustering_recommendation import SCORE_COLUMNS, assign_clusters, prepare_clustering_data
+from data_store import HOVER_CSV, IMAGE_CSV, MAIN_CSV, load_sources
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_assign_clusters(data):
+    '''벡터화 이전 구현 (행 단위 iterrows, 기준 결과로 사용)'''
+    speed_cutoff = np.percentile(data['speed_score'], 70)
+    battery_cutoff = np.percentile(data['battery_score'], 70)
+    charging_cutoff = np.percentile(data['charging_score'], 70)
+
+    clusters = []
+    for _, row in data.iterrows():
+        candidates = []
+        if row['speed_score'] >= speed_cutoff:
+            candidates.append(('speed', row['speed_score']))
+        if row['battery_score'] >= battery_cutoff:
+            candidates.append(('battery', row['battery_score']))
+        if row['charging_score'] >= charging_cutoff:
+            candidates.append(('charging', row['charging_score']))
+
+        if len(candidates) == 0:
+            max_score = max(row['speed_score'], row['battery_score'], row['charging_score'])
+            if max_score == row['speed_score']:
+                clusters.append('speed')
+            elif max_score == row['battery_score']:
+                clusters.append('battery')
+            else:
+                clusters.append('charging')
+        else:
+            candidates.sort(key=lambda x: x[1], reverse=True)
+            clusters.append(candidates[0][0])
+
+    return clusters
+
+
+def shipped_catalog():
+    return load_sources(*(os.path.join(ROOT, path) for path in (MAIN_CSV, HOVER_CSV, IMAGE_CSV)))
+
+
+def test_matches_legacy_on_shipped_csv():
+    scored = prepare_clustering_data(shipped_catalog())
+    expected = legacy_assign_clusters(scored)
+    assert list(assign_clusters(scored)) == expected
+    assert list(scored['cluster']) == expected
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('high', [3, 10])
+def test_matches_legacy_on_random_ties(seed, high):
+    # 작은 정수 점수로 임계값 동점과 점수 간 동점을 많이 만듦
+    rng = np.random.default_rng(seed)
+    n_rows = int(rng.integers(1, 200))
+    scored = pd.DataFrame(rng.integers(0, high, (n_rows, len(SCORE_COLUMNS))).astype(float), columns=SCORE_COLUMNS)
+    assert list(assign_clusters(scored)) == legacy_assign_clusters(scored)
+
+
+def test_matches_legacy_on_random_scores():
+    rng = np.random.default_rng(0)
+    scored = pd.DataFrame(rng.uniform(0, 100, (1000, len(SCORE_COLUMNS))), columns=SCORE_COLUMNS)
+    assert list(assign_clusters(scored)) == legacy_assign_clusters(scored)
@@ -0,0 +1,63 @@
+'''카탈로그 재빌드 조건과, 재빌드가 메모리 맵으로 읽고 있는 기존 파일을 건드리지 않는지 확인'''
+import os
+import shutil
+
+import pandas as pd
+
+import data_store
+from data_store import HOVER_CSV, IMAGE_CSV, MAIN_CSV, build_catalog, load_catalog, load_report, open_catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def copy_sources(directory):
+    paths = []
+    for name in (MAIN_CSV, HOVER_CSV, IMAGE_CSV):
+        path = os.path.join(directory, os.path.basename(name))
+        shutil.copy(os.path.join(ROOT, name), path)
+        paths.append(path)
+    return paths
+
+
+def test_rebuild_replaces_file_instead_of_rewriting(tmp_path):
+    sources = copy_sources(tmp_path)
+    catalog_path = str(tmp_path / 'catalog.arrow')
+    old_version = build_catalog(catalog_path, sources)
+    # 다른 워커가 열어 둔 메모리 맵
+    mapped = open_catalog(catalog_path)
+    old_inode = os.stat(catalog_path).st_ino
+
+    main = pd.read_csv(sources[0])
+    main.loc[0, 'range_km'] += 1
+    main.to_csv(sources[0], index=False)
+    new_version = build_catalog(catalog_path, sources)
+
+    assert new_version != old_version
+    assert os.stat(catalog_path).st_ino != old_inode
+    assert mapped.schema.metadata[b'dataset_version'].decode() == old_version
+    assert mapped.column('range_km')[0].as_py() == main.loc[0, 'range_km'] - 1
+    assert open_catalog(catalog_path).column('range_km')[0].as_py() == main.loc[0, 'range_km']
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+    assert load_catalog(catalog_path, sources, delta_path=str(tmp_path / 'none.arrow')).attrs['dataset_version'] == new_version
+
+
+def test_format_version_change_rebuilds_catalog(tmp_path, monkeypatch):
+    sources = copy_sources(tmp_path)
+    catalog_path = str(tmp_path / 'catalog.arrow')
+    delta_path = str(tmp_path / 'none.arrow')
+    current = data_store.CATALOG_FORMAT_VERSION
+    monkeypatch.setattr(data_store, 'CATALOG_FORMAT_VERSION', current - 1)
+    old_version = build_catalog(catalog_path, sources)
+    old_inode = os.stat(catalog_path).st_ino
+
+    # 같은 CSV라도 생성 방식이 바뀌면 버전이 달라져 다시 빌드
+    monkeypatch.setattr(data_store, 'CATALOG_FORMAT_VERSION', current)
+    df = load_catalog(catalog_path, sources, delta_path=delta_path)
+    assert df.attrs['dataset_version'] != old_version
+    assert os.stat(catalog_path).st_ino != old_inode
+    assert load_report(catalog_path)['main_rows'] == len(df)
+
+    # 그대로면 재빌드하지 않음
+    inode = os.stat(catalog_path).st_ino
+    load_catalog(catalog_path, sources, delta_path=delta_path)
+    assert os.stat(catalog_path).st_ino == inode
@@ -0,0 +1,85 @@
+'''브랜드 히스토그램 구간 경계가 브랜드 선택과 무관하게 전체 카탈로그 기준인지 확인'''
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+import figures
+from data_store import HOVER_CSV, IMAGE_CSV, MAIN_CSV, frame_version, load_sources
+from figures import bin_edges, binned_counts, brand_histogram
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLUMNS = ['range_km', 'top_speed_kmh', 'battery_capacity_kWh']
+
+
+@pytest.fixture(scope='module')
+def sources():
+    return load_sources(*(os.path.join(ROOT, path) for path in (MAIN_CSV, HOVER_CSV, IMAGE_CSV)))
+
+
+@pytest.fixture
+def catalog(sources):
+    # 테스트마다 새 데이터셋 버전 (구간 캐시가 다른 테스트 결과에 기대지 않도록)
+    df = sources.copy()
+    df.attrs['dataset_version'] = uuid.uuid4().hex
+    return df
+
+
+def brand_subset(df, brand):
+    # home.py와 같이 iloc으로 골라 데이터셋 버전을 물려받은 부분 집합
+    return df.iloc[np.flatnonzero(df['brand'] == brand)]
+
+
+@pytest.mark.parametrize('column', COLUMNS)
+def test_brand_subsets_share_catalog_edges(catalog, column):
+    edges = bin_edges(catalog, column)
+    for brand in ['Abarth', 'Tesla', 'Porsche']:
+        subset = brand_subset(catalog, brand)
+        counts = binned_counts(subset, column, edges)
+        assert len(counts) > 0
+        assert counts['count'].sum() == len(subset)
+    # 부분 집합을 먼저 넘겨도 전체 카탈로그 구간이 오염되지 않음
+    assert np.array_equal(bin_edges(catalog, column), edges)
+
+
+@pytest.mark.parametrize('column', COLUMNS)
+def test_histograms_for_different_brands_have_data(catalog, column):
+    # 브랜드를 바꿔 가며 그린 뒤(홈 화면 순서) 전체 카탈로그 구간으로도 그려 봄
+    for use_catalog_edges in (False, True):
+        for brand in ['Abarth', 'Tesla']:
+            subset = brand_subset(catalog, brand)
+            edges = bin_edges(catalog, column) if use_catalog_edges else None
+            fig = brand_histogram(subset, column, column, edges=edges)
+            assert sum(len(trace.y) for trace in fig.data) > 0
+
+
+@pytest.mark.parametrize('n_rows', [50, 478])
+def test_cache_size_estimate_without_serializing(catalog, monkeypatch, n_rows):
+    import plotly.io as pio
+
+    from figures import FigureCache, _figure_bytes, scatter_figure
+    subset = catalog.iloc[:n_rows]
+    fig, info = scatter_figure(subset, 'range_km', 'top_speed_kmh',
+                               hover_data=['brand', 'model', 'length_mm', 'width_mm', 'seats'])
+    actual = len(pio.to_json(fig, validate=False))
+    # 추정값은 실제 JSON 크기와 같은 규모
+    assert actual / 2 <= _figure_bytes((fig, info)) <= actual * 2
+
+    def fail(*args, **kwargs):
+        raise AssertionError('cache miss serialized the figure')
+    monkeypatch.setattr(pio, 'to_json', fail)
+    cache = FigureCache()
+    assert cache.get_or_build('key', lambda: (fig, info))[0] is fig
+    assert cache.total_bytes > 0
+
+
+def test_edges_cache_is_bounded(sources, monkeypatch):
+    monkeypatch.setattr(figures, 'EDGES_CACHE_SIZE', 4)
+    for _ in range(10):
+        df = sources.copy()
+        df.attrs['dataset_version'] = uuid.uuid4().hex
+        bin_edges(df, 'range_km')
+    assert len(figures._edges_cache) == 4
+    # 가장 최근 버전의 경계는 남아 있음
+    assert (frame_version(df), len(df), 'range_km', 6) in figures._edges_cache
@@ -0,0 +1,62 @@
+'''비트맵 필터 인덱스(FilterIndex)가 기존 return_filtered_df와 같은 행을 고르는지 확인'''
+import numpy as np
+import pandas as pd
+import pytest
+
+from filtering import FILTER_COLUMNS, FilterIndex, bitmap_contains, return_filtered_df
+from test_clustering import shipped_catalog
+
+
+def random_filters(df, rng, columns=FILTER_COLUMNS):
+    '''컬럼별로 빈 선택, 일부 값, 없는 값을 섞은 필터 조합'''
+    filter_zip = []
+    for col in columns:
+        values = df[col].dropna().unique().tolist()
+        selected = [value for value in values if rng.random() < 0.4] if rng.random() < 0.7 else []
+        if rng.random() < 0.1:
+            selected.append('없는 값')
+        filter_zip.append((col, selected))
+    return filter_zip
+
+
+def assert_same_rows(df, filter_zip, index):
+    expected = return_filtered_df(df, filter_zip)
+    actual = index.take(df, index.mask(filter_zip))
+    assert actual.index.equals(expected.index)
+    pd.testing.assert_frame_equal(actual, expected)
+
+
+@pytest.mark.parametrize('categorical', [False, True])
+def test_matches_return_filtered_df_on_shipped_csv(categorical):
+    df = shipped_catalog()
+    if categorical:
+        df = df.astype({col: 'category' for col in FILTER_COLUMNS + ['brand']})
+    index = FilterIndex(df)
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        assert_same_rows(df, random_filters(df, rng), index)
+    # 선택이 하나도 없으면 전체
+    assert_same_rows(df, [(col, []) for col in FILTER_COLUMNS], index)
+
+
+@pytest.mark.parametrize('n_rows', [0, 1, 7, 8, 9, 63, 100])
+def test_matches_on_row_counts_not_multiple_of_eight(n_rows):
+    rng = np.random.default_rng(n_rows)
+    values = np.array(['a', 'b', 'c', None], dtype=object)
+    df = pd.DataFrame({col: values[rng.integers(0, len(values), n_rows)] for col in FILTER_COLUMNS + ['brand']})
+    index = FilterIndex(df)
+    for _ in range(50):
+        assert_same_rows(df, random_filters(df, rng), index)
+        # 브랜드 선택은 사이드 필터와 AND
+        brands = [value for value in ('a', 'c') if rng.random() < 0.5]
+        mask = index.mask(random_filters(df, rng)) & index.values_mask('brand', brands)
+        assert set(index.positions(mask)) <= set(np.flatnonzero(df['brand'].isin(brands)))
+
+
+def test_bitmap_contains_matches_unpacked_bits():
+    rng = np.random.default_rng(1)
+    for n_rows in (1, 13, 1000):
+        selected = rng.random(n_rows) < 0.3
+        mask = np.packbits(selected)
+        rows = rng.integers(0, n_rows, 200)
+        assert np.array_equal(bitmap_contains(mask, rows), selected[rows])
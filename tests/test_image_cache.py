@@ -0,0 +1,95 @@
+'''썸네일 캐시: fixture 적재, WebP 축소, 용량 상한 삭제, 실패 URL 재시도 대기 확인'''
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from image_cache import RETRY_BACKOFF, THUMB_SIZE, ImageCache, fixture_name
+
+# 파일명이 같은 서로 다른 차량 이미지 (실제 카탈로그에서도 흔함)
+URLS = [f'https://cdn.example.com/{brand}/thumb.png' for brand in ('kia', 'tesla', 'bmw')]
+COLORS = [(200, 30, 30), (30, 200, 30), (30, 30, 200)]
+
+
+def write_png(path, color, size=(1600, 1000)):
+    with open(path, 'wb') as f:
+        Image.new('RGB', size, color).save(f, format='PNG')
+
+
+@pytest.fixture
+def fixture_dir(tmp_path):
+    directory = tmp_path / 'fixtures'
+    directory.mkdir()
+    for url, color in zip(URLS, COLORS):
+        write_png(directory / fixture_name(url), color)
+    return str(directory)
+
+
+def make_cache(tmp_path, fixture_dir, max_bytes=2**20):
+    return ImageCache(str(tmp_path / 'thumbs'), max_bytes, fixture_dir, url_prefix='/static/')
+
+
+def test_ingest_resizes_to_webp(tmp_path, fixture_dir):
+    cache = make_cache(tmp_path, fixture_dir)
+    names = [cache.ingest(url) for url in URLS]
+    # 파일명이 같아도 URL마다 다른 이미지
+    assert len(set(names)) == len(URLS)
+    for url, name, color in zip(URLS, names, COLORS):
+        assert name.endswith('.webp')
+        assert cache.lookup(url) == '/static/' + name
+        with Image.open(os.path.join(cache.directory, name)) as image:
+            assert image.format == 'WEBP'
+            # 1600x1000 → 비율을 유지한 채 표시 크기로 축소
+            assert image.size == THUMB_SIZE
+            assert max(abs(a - b) for a, b in zip(image.convert('RGB').getpixel((0, 0)), color)) < 10
+    # 같은 내용이면 파일 하나를 공유하고, 다시 열어도 인덱스 유지
+    with open(os.path.join(fixture_dir, fixture_name(URLS[0])), 'rb') as f:
+        same = cache.ingest('https://other.example.com/copy.png', f.read())
+    assert same == names[0]
+    assert make_cache(tmp_path, fixture_dir).lookup(URLS[1]) == '/static/' + names[1]
+
+
+def test_byte_cap_evicts_least_recently_used(tmp_path, fixture_dir):
+    cache = make_cache(tmp_path, fixture_dir)
+    names = [cache.ingest(url) for url in URLS[:2]]
+    # 첫 번째 파일을 가장 오래 쓰지 않은 것으로 두고, 두 번째와 세 번째까지만 들어가는 상한으로 세 번째를 넣음
+    os.utime(os.path.join(cache.directory, names[0]), (1, 1))
+    os.utime(os.path.join(cache.directory, names[1]), (2, 2))
+    with open(os.path.join(fixture_dir, fixture_name(URLS[2])), 'rb') as f:
+        third_size = len(ImageCache.encode(f.read()))
+    cache.max_bytes = os.path.getsize(os.path.join(cache.directory, names[1])) + third_size
+    third = cache.ingest(URLS[2])
+
+    assert cache.lookup(URLS[0]) is None
+    assert not os.path.exists(os.path.join(cache.directory, names[0]))
+    assert cache.lookup(URLS[1]) is not None and cache.lookup(URLS[2]) == '/static/' + third
+    total = sum(os.path.getsize(os.path.join(cache.directory, name)) for name in (names[1], third))
+    assert total <= cache.max_bytes
+
+
+def test_failed_fetch_backs_off(tmp_path, fixture_dir):
+    cache = make_cache(tmp_path, fixture_dir)
+    missing = 'https://cdn.example.com/missing/thumb.png'
+    assert cache.ingest_all([missing, URLS[0]]) == {'ingested': 1, 'failed': 1, 'backing_off': 0}
+
+    # 대기 시간 동안은 리런마다 다시 요청하지 않음 (다른 프로세스도 인덱스로 공유)
+    reopened = make_cache(tmp_path, fixture_dir)
+    assert reopened.backing_off(missing)
+    assert reopened.proxy_url(missing) == missing
+    assert reopened._executor is None and not reopened._pending
+    assert reopened.ingest_all([missing]) == {'ingested': 0, 'failed': 0, 'backing_off': 1}
+
+    # 다시 실패하면 대기 시간이 두 배
+    reopened._failed[missing]['retry_at'] = 0
+    assert reopened.ingest_all([missing])['failed'] == 1
+    second = reopened._failed[missing]
+    assert second['count'] == 2
+    assert 1.5 * RETRY_BACKOFF < second['retry_at'] - time.time() <= 2 * RETRY_BACKOFF
+
+    # 이미지가 생기면 대기 시간이 지난 뒤 받고 실패 기록 삭제
+    write_png(os.path.join(fixture_dir, fixture_name(missing)), (0, 0, 0))
+    reopened._failed[missing] = dict(second, retry_at=0)
+    assert reopened.ingest_all([missing])['ingested'] == 1
+    assert missing not in reopened._failed
+    assert reopened.lookup(missing) is not None
@@ -0,0 +1,94 @@
+'''이미지 CSV를 (brand, model) 키로 메인 행에 연결하는 조인과 조인 검증 결과(load report) 확인'''
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_store import build_catalog, image_brands, join_images, load_report, load_sources
+from test_data_store import copy_sources
+
+
+def image_url(brand, model):
+    slug = f'{brand}_{model}'.replace(' ', '_')
+    return f'https://ev-database.org//img/auto/{slug}/{slug}-01-thumb.jpg'
+
+
+def test_image_brands_from_url_path():
+    brands = ['Kia', 'BMW', 'Mercedes-Benz', 'Mercedes-AMG', 'Lynk & Co']
+    urls = pd.Series([image_url('kia', 'EV6'), image_url('BMW', 'i4'), image_url('Mercedes', 'EQS'),
+                      image_url('Lynk', '01'), 'https://example.com/other.jpg'])
+    # 대소문자 무시, 여러 브랜드에 해당하는 토큰과 경로가 다른 URL은 결측
+    assert image_brands(urls, brands).tolist() == ['Kia', 'BMW', np.nan, 'Lynk & Co', np.nan]
+
+
+def test_join_images_by_key_then_unique_model():
+    df = pd.DataFrame({
+        'brand': ['Kia', 'Hyundai', 'Kia', 'BMW'],
+        'model': ['EV Shared', 'EV Shared', 'EV6', 'i4'],
+    })
+    image_df = pd.DataFrame({
+        'model': ['EV Shared', 'EV Shared', 'EV6', 'EV Shared', 'EV6', 'Unknown'],
+        'image_url': [
+            image_url('Hyundai', 'EV Shared'),
+            image_url('Kia', 'EV Shared'),
+            # 브랜드를 추정할 수 없으면 메인에서 유일한 model일 때만 연결
+            'https://example.com/ev6.jpg',
+            'https://example.com/shared.jpg',
+            # 같은 메인 행에 두 번째로 연결된 이미지
+            image_url('Kia', 'EV6'),
+            image_url('Kia', 'Unknown'),
+        ],
+    })
+    report = {}
+    urls = join_images(df, image_df, report)
+
+    # 모델명이 같은 다른 브랜드 차량이 서로의 이미지를 받지 않음
+    assert urls.tolist() == [image_df['image_url'][1], image_df['image_url'][0], 'https://example.com/ev6.jpg', np.nan]
+    assert report == {
+        'image_rows': 6,
+        'image_matched_by_key': 2,
+        'image_matched_by_model': 1,
+        'image_unmatched': 2,
+        'image_duplicates': 1,
+        'image_examples': ['EV Shared', 'EV6', 'Unknown'],
+        'rows_without_image': 1,
+    }
+
+
+def test_load_sources_report_on_shipped_csv(tmp_path):
+    sources = copy_sources(tmp_path)
+    report = {}
+    df = load_sources(*sources, report=report)
+    main = pd.read_csv(sources[0])
+
+    # 조인으로 행 수/순서가 바뀌지 않음
+    assert len(df) == report['main_rows'] == report['hover_rows'] == len(main)
+    assert (df['model'].to_numpy() == main['model'].to_numpy()).all()
+    assert report['image_rows'] == len(pd.read_csv(sources[2]))
+    assert report['image_rows'] == (report['image_matched_by_key'] + report['image_matched_by_model']
+                                    + report['image_unmatched'] + report['image_duplicates'])
+    assert report['image_matched_by_key'] > 0.9 * report['image_rows']
+    assert report['rows_without_image'] == int((df['image_url'] == '').sum())
+
+    # 키로 연결된 이미지는 URL 경로의 브랜드가 그 행의 브랜드
+    has_image = df['image_url'] != ''
+    inferred = image_brands(df.loc[has_image, 'image_url'], df['brand'].unique())
+    known = inferred.notna()
+    assert (inferred[known].astype(str) == df.loc[has_image, 'brand'][known].astype(str)).all()
+
+    # 빌드한 카탈로그 파일에도 같은 결과 기록
+    catalog_path = str(tmp_path / 'catalog.arrow')
+    build_catalog(catalog_path, sources)
+    assert load_report(catalog_path) == report
+
+
+def test_hover_rows_must_line_up(tmp_path):
+    sources = copy_sources(tmp_path)
+    hover = pd.read_csv(sources[1])
+    hover.iloc[:-1].to_csv(sources[1], index=False)
+    with pytest.raises(ValueError, match='행 수'):
+        load_sources(*sources)
+
+    # 행 수가 같아도 seats가 다르면 순서가 어긋난 것
+    hover.iloc[::-1].to_csv(sources[1], index=False)
+    with pytest.raises(ValueError, match='seats'):
+        load_sources(*sources)
@@ -0,0 +1,51 @@
+'''저장한 k-means 중심점으로 추천 API의 클러스터 라벨을 바꿨을 때의 결과 확인'''
+import json
+
+import numpy as np
+import pytest
+
+from api import RecommendationService
+from clustering_recommendation import CLUSTER_NAMES, SCORE_COLUMNS, get_cluster_model
+from kmeans import build_kmeans_model, kmeans_cluster_model, score_vectors
+from test_clustering import shipped_catalog
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return shipped_catalog()
+
+
+def test_kmeans_engine_relabels_recommendations(catalog, tmp_path):
+    path = str(tmp_path / 'kmeans.arrow')
+    model = build_kmeans_model(catalog, k=3, restarts=2)
+    model.save(path)
+    clustered = kmeans_cluster_model(catalog, path)
+    rule = get_cluster_model(catalog)
+
+    # 점수는 규칙 모델 그대로, 소속은 가장 가까운 중심점의 대응 클러스터
+    labels = model.predict_names(score_vectors(rule))
+    assert (clustered.data['cluster'].to_numpy() == labels).all()
+    np.testing.assert_array_equal(clustered.data[SCORE_COLUMNS].to_numpy(), rule.data[SCORE_COLUMNS].to_numpy())
+    assert (labels != rule.data['cluster'].to_numpy()).any()
+
+    service = RecommendationService(catalog, 'kmeans', path)
+    body = json.loads(service.recommend({}, [], 5))
+    assert body['cluster_engine'] == 'kmeans'
+    for name, score_col in zip(CLUSTER_NAMES, SCORE_COLUMNS):
+        members = clustered.data[clustered.data['cluster'] == name]
+        expected = members[score_col].nlargest(5)
+        assert [car['score'] for car in body['clusters'][name]] == [round(float(v), 2) for v in expected]
+        assert [(car['brand'], car['model']) for car in body['clusters'][name]] == \
+            list(zip(members.loc[expected.index, 'brand'].astype(str), members.loc[expected.index, 'model']))
+
+
+def test_kmeans_engine_requires_matching_centers(catalog, tmp_path):
+    with pytest.raises(ValueError):
+        RecommendationService(catalog, 'kmeans', str(tmp_path / 'missing.arrow'))
+    # 다른 데이터셋 버전으로 학습한 중심점은 쓰지 않음
+    path = str(tmp_path / 'kmeans.arrow')
+    model = build_kmeans_model(catalog, k=3, restarts=1)
+    model.version = 'other-version'
+    model.save(path)
+    assert kmeans_cluster_model(catalog, path) is None
+    assert json.loads(RecommendationService(catalog).recommend({}, [], 1))['cluster_engine'] == 'rule'
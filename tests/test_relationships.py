@@ -0,0 +1,74 @@
+'''축 조합별 관계 설명과, 한 번에 계산한 상관계수 행렬이 pandas 상관계수와 같은지 확인'''
+import numpy as np
+import pandas as pd
+import pytest
+
+import relationships
+from relationships import (DEFAULT_TIP, RELATIONSHIP_TIPS, RelationshipStats, describe_correlation,
+                           get_relationship_stats, relationship_tip)
+from test_clustering import shipped_catalog
+
+CATALOG = shipped_catalog()
+# 관계 설명이 있는 축 컬럼 전체
+AXES = sorted(set().union(*RELATIONSHIP_TIPS))
+
+
+def test_tips_cover_catalog_columns_in_either_order():
+    assert set(AXES) <= set(CATALOG.columns)
+    for pair, tip in RELATIONSHIP_TIPS.items():
+        x_axis, y_axis = sorted(pair)
+        assert relationship_tip(x_axis, y_axis) == relationship_tip(y_axis, x_axis) == tip
+    assert relationship_tip('range_km', 'range_km') == DEFAULT_TIP
+    assert relationship_tip('seats', 'range_km') == DEFAULT_TIP
+
+
+@pytest.mark.parametrize('r, expected', [
+    (0.95, '강한 양의 상관'), (-0.7, '강한 음의 상관'), (0.5, '뚜렷한 양의 상관'),
+    (-0.25, '약한 음의 상관'), (0.1, '상관 거의 없음'), (0.0, '상관 거의 없음'), (np.nan, '상관 없음'),
+])
+def test_describe_correlation(r, expected):
+    assert describe_correlation(r) == expected
+
+
+def test_matrix_matches_pandas_corr():
+    stats = RelationshipStats(CATALOG, AXES)
+    # 범주형 축은 상관계수 대상에서 제외
+    assert 'fast_charge_port' in AXES and 'fast_charge_port' not in stats.columns
+    assert stats.pair('range_km', 'fast_charge_port') is None
+
+    values = CATALOG[stats.columns].dropna()
+    assert stats.n == len(values)
+    for method in ('pearson', 'spearman'):
+        expected = values.corr(method=method)
+        pd.testing.assert_frame_equal(stats.frame(method), expected, check_exact=False, rtol=1e-12, atol=1e-12)
+        for x_axis in stats.columns:
+            for y_axis in stats.columns:
+                pair = stats.pair(x_axis, y_axis)
+                assert pair[method] == pytest.approx(expected.loc[x_axis, y_axis], abs=1e-12)
+                assert pair['n'] == len(values)
+
+
+def test_constant_column_and_small_sample():
+    df = pd.DataFrame({'a': [1.0, 2.0, 3.0, np.nan], 'b': [2.0, 2.0, 2.0, 5.0], 'c': [3.0, 1.0, 2.0, 4.0]})
+    stats = RelationshipStats(df, ['a', 'b', 'c'])
+    # 결측 행은 모든 쌍에서 제외, 값이 모두 같은 컬럼은 NaN
+    assert stats.n == 3
+    assert np.isnan(stats.pair('a', 'b')['pearson'])
+    assert stats.pair('a', 'c')['pearson'] == pytest.approx(df.iloc[:3]['a'].corr(df.iloc[:3]['c']))
+    assert np.isnan(RelationshipStats(df.iloc[:1], ['a', 'c']).pair('a', 'c')['spearman'])
+
+
+def test_stats_cached_per_dataset_version(monkeypatch):
+    monkeypatch.setattr(relationships, '_stats_cache', {})
+    first = get_relationship_stats(CATALOG, AXES)
+    assert get_relationship_stats(CATALOG.copy(), AXES) is first
+    assert get_relationship_stats(CATALOG, AXES[:3]) is not first
+
+    # 데이터가 바뀌면 새로 계산하고 이전 버전 행렬은 버림
+    changed = CATALOG.copy()
+    changed.loc[0, 'range_km'] += 100
+    stats = get_relationship_stats(changed, AXES)
+    assert stats is not first
+    assert len(relationships._stats_cache) == 1
+    assert stats.pair('range_km', 'battery_capacity_kWh') == RelationshipStats(changed, AXES).pair(
+        'range_km', 'battery_capacity_kWh')
@@ -0,0 +1,46 @@
+'''라우터가 같은 클라이언트의 연결을 항상 같은 워커로 보내는지 확인'''
+import asyncio
+
+from serve import Router
+
+HOSTS = [f'127.0.0.{i}' for i in range(2, 12)]
+
+
+def test_candidates_cover_all_workers():
+    router = Router([8600, 8601, 8602])
+    for host in HOSTS:
+        order = router.candidates(host)
+        assert sorted(order) == router.ports
+        assert router.candidates(host) == order
+    assert len({router.candidates(host)[0] for host in HOSTS}) > 1
+
+
+async def _worker_ports_seen(connections_per_host=3):
+    '''포트 번호로 응답하는 가짜 워커 3개 + 라우터에 여러 출발 주소로 접속해 응답한 워커 기록'''
+    async def start_worker():
+        async def reply(reader, writer):
+            writer.write(str(writer.get_extra_info('sockname')[1]).encode())
+            await writer.drain()
+            writer.close()
+        return await asyncio.start_server(reply, '127.0.0.1', 0)
+
+    workers = [await start_worker() for _ in range(3)]
+    router = Router([worker.sockets[0].getsockname()[1] for worker in workers])
+    server = await asyncio.start_server(router.handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    seen = {}
+    for host in HOSTS:
+        for _ in range(connections_per_host):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port, local_addr=(host, 0))
+            seen.setdefault(host, set()).add(int(await reader.read()))
+            writer.close()
+    server.close()
+    for worker in workers:
+        worker.close()
+    return router, seen
+
+
+def test_router_is_sticky_per_client_address():
+    router, seen = asyncio.run(_worker_ports_seen())
+    for host, ports in seen.items():
+        assert ports == {router.candidates(host)[0]}
@@ -0,0 +1,102 @@
+'''스트리밍 통계: KLL 스케치 임계값의 정확도와 정확한 순서 통계 구조 확인'''
+import numpy as np
+import pandas as pd
+import pytest
+
+from clustering_recommendation import SCORE_COLUMNS, assign_clusters, compute_cutoffs
+from streaming_stats import KLLSketch, MinMax, SortedDelta, sketch_cutoffs, sorted_percentile
+
+EPSILON = 0.01
+N_CHUNKS = 16
+
+
+def merged_sketches(values, n_chunks=N_CHUNKS, epsilon=EPSILON):
+    '''청크별 스케치를 만들어 합침 (워커 분산 처리와 같은 순서)'''
+    merged = None
+    for seed, chunk in enumerate(np.array_split(values, n_chunks)):
+        sketches = [KLLSketch(epsilon, seed=seed).update(chunk[:, i]) for i in range(values.shape[1])]
+        merged = sketches if merged is None else [a.merge(b) for a, b in zip(merged, sketches)]
+    return merged
+
+
+def rank_error(values, estimate, q):
+    '''추정값의 실제 순위 구간(동점 포함)과 목표 q 사이의 거리'''
+    low, high = np.mean(values < estimate), np.mean(values <= estimate)
+    return max(0.0, low - q, q - high)
+
+
+@pytest.fixture(scope='module')
+def scored():
+    rng = np.random.default_rng(0)
+    n_rows = 200_000
+    # 치우친 분포와 동점이 많은 분포를 섞음
+    return pd.DataFrame({
+        'speed_score': rng.beta(2, 5, n_rows) * 100,
+        'battery_score': rng.normal(50, 15, n_rows).clip(0, 100),
+        'charging_score': rng.integers(0, 40, n_rows) * 2.5,
+    })
+
+
+def test_sketch_cutoffs_match_exact(scored):
+    values = scored[SCORE_COLUMNS].to_numpy()
+    cutoffs = sketch_cutoffs(merged_sketches(values))
+    exact = compute_cutoffs(scored)
+    for i, cutoff in enumerate(cutoffs):
+        assert rank_error(values[:, i], cutoff, 0.7) <= EPSILON
+    # 라벨이 바뀔 수 있는 행은 점수 하나가 두 임계값 사이에 있는 행뿐
+    changed = assign_clusters(scored, cutoffs) != assign_clusters(scored, exact)
+    between = ((values >= np.minimum(cutoffs, exact)) & (values <= np.maximum(cutoffs, exact))).any(axis=1)
+    assert not (changed & ~between).any()
+    # 임계값마다 순위 오차 epsilon 이내이므로 일치율은 1 - 3 * epsilon 이상 (동점 값 하나의 비중이 작을 때)
+    assert 1 - changed.mean() >= 1 - len(SCORE_COLUMNS) * EPSILON
+
+
+@pytest.mark.parametrize('epsilon', [0.05, 0.01])
+def test_kll_rank_error_within_epsilon(epsilon):
+    values = np.random.default_rng(1).lognormal(size=300_000)
+    sketch = merged_sketches(values[:, None], n_chunks=37, epsilon=epsilon)[0]
+    assert sketch.count == len(values)
+    # 스케치 크기는 데이터 크기와 무관
+    assert sketch.size() < len(values) / 50
+    for q in np.linspace(0.01, 0.99, 99):
+        assert rank_error(values, sketch.quantile(q), q) <= epsilon
+
+
+def test_minmax_merge_ignores_nan():
+    merged = MinMax(2).update(np.array([[1, np.nan], [3, 4]])).merge(MinMax(2).update([[0, 9]]))
+    assert merged.bounds(['a', 'b']) == {'a': (0.0, 3.0), 'b': (4.0, 9.0)}
+    assert merged.count == 3
+
+
+@pytest.mark.parametrize('percentile', [0, 12.5, 50, 70, 99.9, 100])
+def test_sorted_delta_percentile_matches_numpy(percentile):
+    rng = np.random.default_rng(2)
+    values = rng.integers(0, 50, 2_000).astype(float)
+    current = dict(enumerate(values))
+    stats = SortedDelta(values, compact_ratio=0.5)
+    next_position = len(values)
+    for _ in range(300):
+        # 삭제, 값 변경(삭제 후 추가), 새 행 추가를 섞어 델타에 쌓음
+        position = int(rng.choice(list(current)))
+        stats.remove([current.pop(position)], [position])
+        if rng.random() < 0.5:
+            value = float(rng.integers(0, 60))
+            current[position] = value
+            stats.add([value], [position])
+        value = float(rng.integers(-10, 50))
+        current[next_position] = value
+        stats.add([value], [next_position])
+        next_position += 1
+        expected = np.fromiter(current.values(), dtype=float)
+        assert len(stats) == len(expected)
+        assert stats.percentile(percentile) == np.percentile(expected, percentile)
+    expected = np.sort(np.fromiter(current.values(), dtype=float))
+    assert sorted_percentile(expected, percentile) == np.percentile(expected, percentile)
+    assert (stats.min(), stats.max()) == (expected[0], expected[-1])
+    between = stats.positions_between(10, 20)
+    assert sorted(between.tolist()) == sorted(p for p, v in current.items() if 10 <= v <= 20)
+    ordered = [p for v, p in sorted((v, p) for p, v in current.items())]
+    assert stats.smallest(25).tolist() == ordered[:25]
+    # 남은 델타를 합쳐도 같은 (값, 행 위치) 순서
+    stats.compact()
+    assert stats.base_positions.tolist() == ordered
@@ -0,0 +1,58 @@
+'''비트맵 조기 종료 TOP-K(top_models(mask=))가 필터링된 데이터프레임 경로와 같은 차량을 고르는지 확인'''
+import numpy as np
+import pandas as pd
+import pytest
+
+import clustering_recommendation
+from clustering_recommendation import CLUSTER_NAMES, ClusterModel, prepare_clustering_data
+from filtering import FILTER_COLUMNS, FilterIndex, return_filtered_df
+from test_clustering import shipped_catalog
+from test_filtering import random_filters
+
+
+def catalog_with_dropped_rows():
+    '''스펙 결측 행이 빠져 모델 행 위치와 카탈로그 행 위치가 어긋난 카탈로그'''
+    df = shipped_catalog()
+    df.loc[df.index[::7], 'range_km'] = np.nan
+    return df
+
+
+def assert_same_top(df, model, index, filter_zip, brands, top_n):
+    mask = index.mask(filter_zip)
+    filtered_df = return_filtered_df(df, filter_zip)
+    if brands:
+        mask = mask & index.values_mask('brand', brands)
+        filtered_df = filtered_df[filtered_df['brand'].isin(brands)]
+    for name in CLUSTER_NAMES:
+        expected = model.top_models(name, top_n, filtered_df=filtered_df)
+        actual = model.top_models(name, top_n, mask=mask)
+        assert actual.index.equals(expected.index), (name, filter_zip, brands, top_n)
+
+
+@pytest.mark.parametrize('make_catalog', [shipped_catalog, catalog_with_dropped_rows])
+@pytest.mark.parametrize('block', [clustering_recommendation.TOPK_BLOCK, 2])
+def test_mask_path_matches_filtered_df_path(make_catalog, block, monkeypatch):
+    # 블록이 작으면 한 번의 탐색이 여러 블록에 걸침
+    monkeypatch.setattr(clustering_recommendation, 'TOPK_BLOCK', block)
+    df = make_catalog()
+    model = ClusterModel(prepare_clustering_data(df))
+    index = FilterIndex(df)
+    brand_values = df['brand'].dropna().unique().tolist()
+    rng = np.random.default_rng(block)
+    for _ in range(100):
+        brands = [brand for brand in brand_values if rng.random() < 0.1] if rng.random() < 0.5 else []
+        top_n = int(rng.choice([1, 3, 5, 10, 50, 1000]))
+        assert_same_top(df, model, index, random_filters(df, rng), brands, top_n)
+
+
+def test_mask_path_with_no_match():
+    df = shipped_catalog()
+    model = ClusterModel(prepare_clustering_data(df))
+    index = FilterIndex(df)
+    filter_zip = [(col, ['없는 값']) for col in FILTER_COLUMNS]
+    for name in CLUSTER_NAMES:
+        assert model.top_models(name, 5, mask=index.mask(filter_zip)).empty
+    # 필터가 없으면 전체 순위 그대로
+    everything = index.mask([])
+    for name in CLUSTER_NAMES:
+        pd.testing.assert_frame_equal(model.top_models(name, 5, mask=everything), model.top_models(name, 5))
@@ -0,0 +1,59 @@
+'''가중치 정규화와, WeightScorer(행렬 곱)가 score() 배치 계산과 같은 점수/라벨/순위를 내는지 확인'''
+import numpy as np
+import pytest
+
+from clustering_recommendation import (CLUSTER_NAMES, DEFAULT_WEIGHTS, FEATURES, SCORE_COLUMNS, ClusterModel,
+                                       WeightScorer, build_cluster_model, normalize_weights, score)
+from test_clustering import shipped_catalog
+
+
+@pytest.fixture(scope='module')
+def scorer():
+    return WeightScorer(build_cluster_model(shipped_catalog()))
+
+
+def test_normalize_weights_sums_to_one():
+    weights = {score_col: {feature: 2.0 * (i + 1) for i, feature in enumerate(features)}
+               for score_col, features in DEFAULT_WEIGHTS.items()}
+    normalized = normalize_weights(weights)
+    for score_col, features in normalized.items():
+        assert sum(features.values()) == pytest.approx(1.0)
+        # 비율은 그대로
+        values = list(features.values())
+        assert values[-1] / values[0] == pytest.approx(len(values))
+    # 이미 합이 1이면 그대로
+    again = normalize_weights(normalized)
+    for score_col, features in normalized.items():
+        assert again[score_col] == pytest.approx(features)
+
+
+def test_normalize_weights_all_zero_falls_back_to_defaults():
+    weights = {score_col: dict.fromkeys(features, 0.0) for score_col, features in DEFAULT_WEIGHTS.items()}
+    weights['speed_score'] = dict(DEFAULT_WEIGHTS['speed_score'])
+    normalized = normalize_weights(weights)
+    for score_col in ('battery_score', 'charging_score'):
+        assert normalized[score_col] == DEFAULT_WEIGHTS[score_col]
+        assert normalized[score_col] is not DEFAULT_WEIGHTS[score_col]
+    assert normalized['speed_score'] == pytest.approx(DEFAULT_WEIGHTS['speed_score'])
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('percentile', [50, 70, 90])
+def test_weight_scorer_matches_score(scorer, seed, percentile):
+    rng = np.random.default_rng(seed)
+    weights = {score_col: {feature: float(rng.integers(0, 21)) * 0.05 for feature in features}
+               for score_col, features in DEFAULT_WEIGHTS.items()}
+    model = scorer.model(weights, percentile)
+    expected = score(scorer.base.data[FEATURES + ['brand', 'model']], normalize_weights(weights), percentile)
+
+    np.testing.assert_allclose(model.data[SCORE_COLUMNS].to_numpy(), expected[SCORE_COLUMNS].to_numpy(),
+                               rtol=0, atol=1e-9)
+    assert (model.data['cluster'].to_numpy() == expected['cluster'].to_numpy()).all()
+    reference = ClusterModel(expected)
+    for name in CLUSTER_NAMES:
+        assert np.array_equal(model.ranked[name], reference.ranked[name]), name
+
+
+def test_default_weights_return_base_model(scorer):
+    assert scorer.model(None, 70) is scorer.base
+    assert scorer.model(DEFAULT_WEIGHTS, 70) is scorer.base